@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# archiver.py
+# Move promos expiradas para promocoes_backup em lotes pequenos: cada lote é
+# um único DELETE ... RETURNING alimentando o INSERT do backup (nada é apagado
+# sem backup) e uma transação curta (a API e o scraper nunca esperam muito).
+# promocoes_backup é particionada por mês de deleted_at (migrate.py 0008) e
+# guarda o HTML comprimido de promocoes_content como está; a retenção apaga
+# partições inteiras.
+#
+# Uso:
+#   python archiver.py              # arquiva expiradas e limpa backups antigos
+#   python archiver.py --dry-run    # executa os mesmos lotes com ROLLBACK e mostra o que sairia
+#   python archiver.py --chunk-size 1000
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from content_store import CONTENT_HTML_SQL
+from url_store import IMAGES_JSON_SQL, LINKS_JSON_SQL
+
+# -------- CONFIG --------
+TZ = ZoneInfo("America/Sao_Paulo")
+CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "500"))  # linhas por transação
+CHUNK_PAUSE_SECONDS = float(os.getenv("ARCHIVE_CHUNK_PAUSE_SECONDS", "0"))  # respiro entre lotes
+BACKUP_RETENTION_DAYS = 30  # tempo para manter backup
+DRY_RUN_SHOW = 500  # linhas listadas no dry-run
+# ------------------------
+
+BACKUP_COLUMNS = (
+    "url, title, date_published, author, content_text, html, "
+    "images_json, links_json, scraped_at, valid_until"
+)
+# o backup guarda imagens/links como JSON e o HTML já comprimido: as linhas
+# de post_links/post_images/promocoes_content saem junto (ON DELETE CASCADE),
+# mas o comando inteiro enxerga o estado de antes do DELETE
+BACKUP_VALUES = (
+    "moved.url, moved.title, moved.date_published, moved.author, moved.content_text, "
+    + CONTENT_HTML_SQL.format(t="moved") + ", "
+    + IMAGES_JSON_SQL.format(t="moved") + ", " + LINKS_JSON_SQL.format(t="moved") + ", "
+    "moved.scraped_at, moved.valid_until"
+)
+
+# lote seguinte em (valid_until, id) > cursor; SKIP LOCKED pula linhas que o
+# scraper está atualizando agora (ficam para a próxima execução)
+ARCHIVE_SQL = f"""
+    WITH batch AS (
+        SELECT id FROM promocoes
+        WHERE valid_until IS NOT NULL
+          AND valid_until < %(cutoff)s
+          AND valid_until >= %(after_valid_until)s
+          AND (valid_until, id) > (%(after_valid_until)s, %(after_id)s)
+        ORDER BY valid_until, id
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    ),
+    moved AS (
+        DELETE FROM promocoes p USING batch
+        WHERE p.id = batch.id
+        RETURNING p.*
+    ),
+    saved AS (
+        INSERT INTO promocoes_backup ({BACKUP_COLUMNS}, deleted_at)
+        SELECT {BACKUP_VALUES}, NOW() FROM moved
+    )
+    SELECT id, url, title, valid_until FROM moved
+"""
+
+# resto da retenção, dentro da partição do mês do corte
+PURGE_SQL = """
+    DELETE FROM promocoes_backup
+    WHERE deleted_at < %(cutoff)s
+      AND (id, deleted_at) IN (
+        SELECT id, deleted_at FROM promocoes_backup
+        WHERE deleted_at < %(cutoff)s
+        LIMIT %(limit)s
+    )
+"""
+
+BACKUP_PARTITIONS_SQL = """
+    SELECT c.relname FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'promocoes_backup'::regclass
+    ORDER BY c.relname
+"""
+
+
+class ArchiveStats:
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.seconds = 0.0
+        self.slowest_chunk = 0.0
+        self.sample = []  # (id, url, title, valid_until) das primeiras linhas
+
+    def add_chunk(self, rows, elapsed, keep=0):
+        self.rows += len(rows)
+        self.chunks += 1
+        self.seconds += elapsed
+        self.slowest_chunk = max(self.slowest_chunk, elapsed)
+        if len(self.sample) < keep:
+            self.sample.extend(rows[: keep - len(self.sample)])
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def ensure_backup_partitions(conn, now):
+    """
+    Partições do mês de `now` e do seguinte (o lote pode virar o mês no
+    meio). Criadas também no dry-run: sem elas o INSERT do backup falha.
+    """
+    from migrate import backup_partition_sql
+
+    cur = conn.cursor()
+    for dt in (now, now + timedelta(days=1)):
+        cur.execute(backup_partition_sql(dt)[1])
+    conn.commit()
+    cur.close()
+
+
+def drop_old_partitions(conn, cutoff):
+    """Apaga (DROP) as partições inteiramente anteriores a `cutoff`. Devolve quantas linhas saíram."""
+    cur = conn.cursor()
+    cur.execute(BACKUP_PARTITIONS_SQL)
+    removed = 0
+    for (name,) in cur.fetchall():
+        try:
+            month = datetime.strptime(name, "promocoes_backup_p%Y%m").replace(tzinfo=TZ)
+        except ValueError:
+            continue  # criada à mão: fica para o DELETE em lotes
+        # a partição vai até o primeiro instante do mês seguinte (migrate.backup_partition_sql)
+        if (month + timedelta(days=32)).replace(day=1) > cutoff:
+            continue
+        cur.execute(f"SELECT count(*) FROM {name}")
+        (n,) = cur.fetchone()
+        cur.execute(f"DROP TABLE {name}")
+        conn.commit()
+        removed += n
+    cur.close()
+    return removed
+
+
+def archive_expired(conn, chunk_size=CHUNK_SIZE, dry_run=False, keep=0, pause=CHUNK_PAUSE_SECONDS):
+    """
+    Arquiva as promos com valid_until < agora (instante fixado no início), um
+    lote por transação. Em dry_run cada lote roda de verdade e é desfeito com
+    ROLLBACK: os números de tempo refletem o custo real. Devolve ArchiveStats.
+    """
+    now = datetime.now(TZ)
+    ensure_backup_partitions(conn, now)
+    params = {
+        "cutoff": now,
+        "after_valid_until": "-infinity",
+        "after_id": 0,
+        "limit": chunk_size,
+    }
+    stats = ArchiveStats()
+    cur = conn.cursor()
+    try:
+        while True:
+            t0 = time.perf_counter()
+            cur.execute(ARCHIVE_SQL, params)
+            rows = cur.fetchall()
+            if dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+            if not rows:
+                break
+            stats.add_chunk(rows, time.perf_counter() - t0, keep)
+            last = max(rows, key=lambda r: (r[3], r[0]))
+            params["after_valid_until"], params["after_id"] = last[3], last[0]
+            if pause:
+                time.sleep(pause)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return stats
+
+
+def purge_old_backups(conn, retention_days=BACKUP_RETENTION_DAYS, chunk_size=CHUNK_SIZE, dry_run=False):
+    """Remove backups com mais de `retention_days` dias, em lotes. Devolve quantos saíram."""
+    cur = conn.cursor()
+    if dry_run:
+        cur.execute(
+            "SELECT count(*) FROM promocoes_backup WHERE deleted_at < NOW() - make_interval(days => %s)",
+            (retention_days,),
+        )
+        (removed,) = cur.fetchone()
+        conn.rollback()
+        cur.close()
+        return removed
+
+    cur.execute("SELECT NOW() - make_interval(days => %s)", (retention_days,))
+    (cutoff,) = cur.fetchone()
+    conn.commit()
+    # meses inteiros antes do corte: DROP da partição (sem varrer nem inchar a tabela)
+    removed = drop_old_partitions(conn, cutoff)
+    try:
+        while True:
+            cur.execute(PURGE_SQL, {"cutoff": cutoff, "limit": chunk_size})
+            n = cur.rowcount
+            conn.commit()
+            removed += n
+            if n < chunk_size:
+                break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return removed
+
+
+def print_stats(stats, dry_run):
+    verb = "Seriam movidos" if dry_run else "Movidos"
+    print(
+        f"➡️  {verb} {stats.rows} posts para backup em {stats.chunks} lote(s), "
+        f"{stats.seconds:.2f}s ({stats.rows_per_second:.0f} linhas/s, lote mais lento {stats.slowest_chunk * 1000:.0f} ms)."
+    )
+
+
+def main():
+    import psycopg2
+    from dotenv import load_dotenv
+
+    from migrate import PostgresBackend, check_schema
+    from promo_version import bump_version
+
+    ap = argparse.ArgumentParser(description="Arquiva promos expiradas em promocoes_backup.")
+    ap.add_argument("--dry-run", action="store_true", help="executa com ROLLBACK e lista o que seria arquivado")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"linhas por transação (padrão {CHUNK_SIZE})")
+    args = ap.parse_args()
+
+    load_dotenv()
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise SystemExit("DATABASE_URL não encontrada no .env")
+    conn = psycopg2.connect(db_url)
+    # backup particionado, HTML em promocoes_content, promocoes_version (migrate.py)
+    check_schema(PostgresBackend(conn))
+
+    if args.dry_run:
+        print("🔎 [dry-run] Nada será alterado.")
+        stats = archive_expired(conn, args.chunk_size, dry_run=True, keep=DRY_RUN_SHOW)
+        print(f"[dry-run] Encontrados {stats.rows} registros expirados (mostrando até {DRY_RUN_SHOW}):\n")
+        for promo_id, url, title, valid_until in stats.sample:
+            print(f"ID: {promo_id}  valid_until: {valid_until}  url: {url}\n  título: {title}\n")
+        print_stats(stats, dry_run=True)
+        removed = purge_old_backups(conn, dry_run=True)
+        print(f"🗑️  Seriam removidos {removed} backups antigos (>{BACKUP_RETENTION_DAYS} dias).")
+        conn.close()
+        return
+
+    print("🧹 Arquivando posts expirados...")
+    stats = archive_expired(conn, args.chunk_size)
+    if stats.rows:
+        bump_version(conn)
+    print_stats(stats, dry_run=False)
+    removed = purge_old_backups(conn, chunk_size=args.chunk_size)
+    print(f"🗑️  Removidos {removed} backups antigos (>{BACKUP_RETENTION_DAYS} dias).")
+    conn.close()
+    print("✅ Limpeza concluída.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# backend/app/cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+# TTL máximo de uma resposta em cache (segundos)
+CACHE_TTL = float(os.getenv("PROMO_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("PROMO_CACHE_MAX_ENTRIES", "256"))
+# de quanto em quanto tempo reler promocoes_version no banco
+VERSION_CHECK_SECONDS = float(os.getenv("PROMO_CACHE_VERSION_CHECK", "2"))
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers", "expires_at")
+
+    def __init__(self, body: bytes, headers: dict, expires_at: float):
+        self.body = body
+        self.etag = 'W/"%s"' % hashlib.sha1(body).hexdigest()
+        self.headers = headers
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    Cache em memória de respostas já serializadas (bytes), por chave de query.
+
+    Uma entrada expira no TTL ou antes, em `expires_at` (o próximo valid_until
+    entre as linhas da resposta, quando a lista muda sozinha). Tudo é
+    descartado quando a versão em promocoes_version muda (scraper/limpeza).
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, version_check=VERSION_CHECK_SECONDS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_check = version_check
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+
+    async def sync_version(self, db):
+        """
+        Relê a versão (no máximo a cada `version_check` s), limpa o cache se
+        mudou e devolve a versão vigente, que deve ser passada ao `put`.
+        """
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check:
+            return self._version
+        try:
+            version = (await db.execute(text("SELECT version FROM promocoes_version WHERE id = 1"))).scalar()
+        except Exception:
+            # sem tabela de versão: fica só o TTL
+            await db.rollback()
+            version = None
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+        return version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body: bytes, headers=None, expires_at=None, version=None):
+        limit = time.time() + self.ttl
+        entry = CachedResponse(body, headers or {}, min(limit, expires_at) if expires_at else limit)
+        with self._lock:
+            # resposta montada com uma versão que já mudou: não guarda
+            if version != self._version:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _opaque(tag):
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match, etag):
+    """Comparação fraca (RFC 9110) do If-None-Match com o ETag da entrada."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or _opaque(etag) in {_opaque(t) for t in tags}
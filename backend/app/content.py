@@ -0,0 +1,27 @@
+# backend/app/content.py
+# HTML dos posts: no Postgres fica comprimido em promocoes_content
+# (content_store.py / migrate.py 0008) e só o detalhe (GET /{id}) e o
+# export com fields=content_html leem. zstd precisa do pacote zstandard;
+# dados gravados sem ele estão em zlib. No SQLite o HTML vem como texto.
+# Única cópia da leitura: export.py importa daqui (a gravação fica em
+# content_store.py).
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # sem zstandard: só lê o que foi gravado com zlib
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def decompress_html(value):
+    """bytes comprimidos -> str; texto (SQLite) e None passam direto."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value[:4] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("HTML comprimido com zstd: instale o pacote zstandard")
+        return zstandard.ZstdDecompressor().decompress(value).decode("utf-8")
+    return zlib.decompress(value).decode("utf-8")
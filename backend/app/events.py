@@ -0,0 +1,231 @@
+# backend/app/events.py
+# Eventos de promocoes para o SSE (/api/v1/promotions/events). Uma única
+# conexão faz LISTEN no canal dos triggers (migrate.py 0006) e o broker
+# repassa cada NOTIFY para as filas em memória dos assinantes. Sem Postgres
+# (SQLite, testes) o broker funciona igual, alimentado só por publish().
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+
+from .models import Promotion
+from .serialization import dumps
+
+log = logging.getLogger(__name__)
+
+# -------- CONFIG --------
+EVENTS_CHANNEL = "promocoes_events"  # mesmo nome do pg_notify nos triggers
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))  # eventos pendentes por assinante
+EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", "1000"))  # eventos guardados para Last-Event-ID
+EVENTS_RECONNECT_MAX_SECONDS = 30.0
+# ------------------------
+
+
+class Event:
+    __slots__ = ("seq", "id", "type", "encoded")
+
+    def __init__(self, seq: int, event_id: str, event_type: str, data: dict):
+        self.seq = seq
+        self.id = event_id
+        self.type = event_type
+        # já no formato do SSE: serializado uma vez para todos os assinantes
+        self.encoded = b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), event_type.encode(), dumps(data))
+
+
+class Subscription:
+    """Fila de um cliente. `get()` devolve None quando ele ficou para trás e foi desligado."""
+
+    def __init__(self, broker, size):
+        self._broker = broker
+        self.queue = asyncio.Queue(maxsize=size)
+        self.dropped = False
+
+    def push(self, event) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def get(self) -> Optional[Event]:
+        if self.dropped and self.queue.empty():
+            return None
+        event = await self.queue.get()
+        return event
+
+    def close(self):
+        self._broker._subscribers.discard(self)
+
+
+class EventBroker:
+    """
+    Fan-out em memória: `publish` entrega a todos os assinantes sem esperar
+    (cliente lento com a fila cheia é desligado e reconecta com
+    Last-Event-ID). Também emite "expire" quando um valid_until conhecido
+    passa, antes de o archiver apagar a linha.
+    """
+
+    def __init__(self, queue_size=EVENTS_QUEUE_SIZE, history=EVENTS_HISTORY):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._seq = itertools.count(1)
+        # ids são "<boot>-<n>": Last-Event-ID de outro processo/boot não casa
+        self._boot = uuid.uuid4().hex[:8]
+        self._tasks = []
+        self._expiry = {}  # id -> valid_until (timestamp) vigente
+        self._expiry_heap = []  # (timestamp, id); entradas velhas são ignoradas
+        self._expiry_wakeup = asyncio.Event()
+        self.listening = False
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    # -------- assinantes --------
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """Novo assinante; com Last-Event-ID reenvia o que ele perdeu (ou um "resync")."""
+        sub = Subscription(self, self.queue_size)
+        if last_event_id:
+            missed = self._since(last_event_id)
+            if missed is None:
+                sub.push(self._event("resync", {"reason": "history"}))
+            else:
+                for event in missed[-self.queue_size:]:
+                    sub.push(event)
+        self._subscribers.add(sub)
+        return sub
+
+    def _since(self, last_event_id):
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self._boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if self._history and self._history[0].seq > seq + 1:
+            return None  # o histórico já não cobre o intervalo
+        return [e for e in self._history if e.seq > seq]
+
+    # -------- publicação --------
+
+    def _event(self, event_type, data):
+        seq = next(self._seq)
+        return Event(seq, f"{self._boot}-{seq}", event_type, data)
+
+    def publish(self, event_type: str, data: dict) -> Event:
+        """Entrega um evento a todos os assinantes (também é a entrada do modo sem Postgres)."""
+        if event_type in ("insert", "update"):
+            self.track_expiry(data.get("id"), data.get("valid_until"))
+        elif event_type == "delete":
+            self._expiry.pop(data.get("id"), None)
+        event = self._event(event_type, data)
+        self._history.append(event)
+        for sub in list(self._subscribers):
+            if not sub.push(event):
+                sub.dropped = True
+                self._subscribers.discard(sub)
+        return event
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            data = json.loads(payload)
+            op = data.pop("op")
+        except (ValueError, KeyError):
+            log.warning("payload de NOTIFY inválido: %r", payload[:200])
+            return
+        self.publish(op, data)
+
+    # -------- expiração --------
+
+    def track_expiry(self, promo_id, valid_until):
+        if promo_id is None:
+            return
+        if isinstance(valid_until, str):
+            valid_until = datetime.fromisoformat(valid_until)
+        if valid_until is None:
+            self._expiry.pop(promo_id, None)
+            return
+        ts = valid_until.timestamp()
+        self._expiry[promo_id] = ts
+        heapq.heappush(self._expiry_heap, (ts, promo_id))
+        self._expiry_wakeup.set()
+
+    async def _expiry_loop(self):
+        while True:
+            self._expiry_wakeup.clear()
+            now = time.time()
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                ts, promo_id = heapq.heappop(self._expiry_heap)
+                if self._expiry.get(promo_id) == ts:
+                    del self._expiry[promo_id]
+                    self.publish("expire", {"id": promo_id, "valid_until": datetime.fromtimestamp(ts).astimezone()})
+            timeout = self._expiry_heap[0][0] - now if self._expiry_heap else None
+            try:
+                await asyncio.wait_for(self._expiry_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _load_upcoming(self, engine):
+        """valid_until futuros já gravados (o "expire" vale também para linhas antigas)."""
+        now = datetime.now().astimezone()
+        async with engine.connect() as conn:
+            rows = await conn.execute(
+                select(Promotion.id, Promotion.valid_until).where(Promotion.valid_until > now)
+            )
+            for promo_id, valid_until in rows:
+                self.track_expiry(promo_id, valid_until)
+
+    # -------- LISTEN --------
+
+    async def _listen(self, engine):
+        """Mantém uma conexão em LISTEN; reconecta com backoff e avisa "resync" (NOTIFY perdidos)."""
+        delay = 1.0
+        first = True
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    raw = (await conn.get_raw_connection()).driver_connection
+                    lost = asyncio.Event()
+                    raw.add_termination_listener(lambda c: lost.set())
+                    await raw.add_listener(EVENTS_CHANNEL, self._on_notify)
+                    self.listening = True
+                    delay = 1.0
+                    if not first:
+                        self.publish("resync", {"reason": "reconnect"})
+                    first = False
+                    await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("LISTEN %s falhou: %s", EVENTS_CHANNEL, e)
+            self.listening = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, EVENTS_RECONNECT_MAX_SECONDS)
+
+    async def start(self, engine):
+        try:
+            await self._load_upcoming(engine)
+        except Exception as e:
+            log.warning("não foi possível carregar valid_until futuros: %s", e)
+        self._tasks.append(asyncio.create_task(self._expiry_loop()))
+        if engine.dialect.name == "postgresql":
+            self._tasks.append(asyncio.create_task(self._listen(engine)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.listening = False
+
+
+broker = EventBroker()
@@ -1,11 +1,33 @@
 # backend/app/main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from .db import async_engine
+from .events import broker
+from .metrics import MetricsMiddleware, render
 from .routers import promotions
 
-app = FastAPI(title="Fly Wise - Backend (MVP)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # uma conexão em LISTEN por worker alimenta todos os clientes do SSE
+    await broker.start(async_engine)
+    yield
+    await broker.stop()
+    # fecha as conexões do pool assíncrono ao desligar o worker
+    await async_engine.dispose()
+
+app = FastAPI(title="Fly Wise - Backend (MVP)", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(promotions.router)
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Fly Wise API rodando 🚀"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    rendered = render()
+    if rendered is None:
+        return Response("prometheus_client não instalado\n", status_code=503, media_type="text/plain")
+    body, content_type = rendered
+    return Response(body, media_type=content_type)
@@ -0,0 +1,143 @@
+# backend/app/metrics.py
+# Métricas Prometheus da API (GET /metrics): latência por rota, linhas lidas
+# do banco por endpoint, acertos do cache de respostas e o pool do
+# SQLAlchemy (conexões em uso e espera no checkout). Sem prometheus_client
+# instalado tudo vira no-op e o /metrics responde 503.
+#
+# Com vários workers do uvicorn defina PROMETHEUS_MULTIPROC_DIR (diretório
+# vazio a cada deploy) para o /metrics somar todos os processos; nesse modo
+# os gauges do pool ficam de fora (são lidos do pool deste processo).
+import os
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+    )
+except ImportError:  # sem prometheus_client: métricas desligadas
+    generate_latest = None
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROWS_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 200, 500, 1000, 5000, 10000, 50000)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+
+class _Noop:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, value=1):
+        pass
+
+
+if generate_latest is not None:
+    REQUEST_SECONDS = Histogram(
+        "api_request_seconds", "Latência até o início da resposta", ["method", "route", "status"],
+        buckets=LATENCY_BUCKETS,
+    )
+    ROWS = Histogram("api_rows_read", "Linhas lidas do banco por request", ["endpoint"], buckets=ROWS_BUCKETS)
+    CACHE = Counter("api_response_cache", "Consultas ao cache de respostas", ["cache", "result"])
+    POOL_WAIT = Histogram(
+        "db_pool_checkout_seconds", "Espera para obter uma conexão do pool (inclui abrir uma nova)",
+        buckets=POOL_WAIT_BUCKETS,
+    )
+    POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts", "Checkouts que estouraram DB_POOL_TIMEOUT")
+else:
+    REQUEST_SECONDS = ROWS = CACHE = POOL_WAIT = POOL_TIMEOUTS = _Noop()
+
+
+def observe_rows(endpoint: str, n: int):
+    ROWS.labels(endpoint).observe(n)
+
+
+def cache_result(cache: str, hit: bool):
+    CACHE.labels(cache, "hit" if hit else "miss").inc()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool do engine assíncrono que mede a espera no checkout (fila cheia = pool pequeno)."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - t0)
+
+
+def instrument_pool(engine: AsyncEngine):
+    """Gauges lidos do pool na hora da coleta (conexões em uso, abertas, overflow)."""
+    pool = engine.sync_engine.pool
+    if generate_latest is None or MULTIPROCESS or not isinstance(pool, AsyncAdaptedQueuePool):
+        return
+    Gauge("db_pool_checked_out", "Conexões emprestadas agora").set_function(pool.checkedout)
+    Gauge("db_pool_size", "Tamanho configurado do pool").set_function(pool.size)
+    Gauge("db_pool_overflow", "Conexões além do pool_size (negativo = ainda não abertas)").set_function(pool.overflow)
+
+
+class MetricsMiddleware:
+    """
+    ASGI puro (sem BaseHTTPMiddleware): mede até o http.response.start, então
+    streams (/export, /events) contam o tempo até o primeiro byte, não a
+    conexão inteira. A rota é o template ("/api/v1/promotions/{promo_id}").
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or generate_latest is None:
+            await self.app(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        observed = False
+
+        def observe(status):
+            nonlocal observed
+            observed = True
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - t0)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not observed:
+                observe(500)  # exceção antes de qualquer resposta
+
+
+def render():
+    """(corpo, content-type) do /metrics, ou None sem prometheus_client."""
+    if generate_latest is None:
+        return None
+    registry = REGISTRY
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,5 +1,6 @@
 # backend/app/models.py
-from sqlalchemy import Column, Integer, Text, Date, Boolean, JSON, TIMESTAMP
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, Text, Date, Boolean, JSON, TIMESTAMP
+from sqlalchemy.orm import deferred
 from .db import Base
 
 class Promotion(Base):
@@ -10,26 +11,41 @@ class Promotion(Base):
     title = Column(Text)
     date_published = Column(Date)
     author = Column(Text)
-    content_text = Column(Text)
-    content_html = Column(Text)
+    # colunas pesadas: só carregadas quando pedidas (undefer_group("content"))
+    content_text = deferred(Column(Text), group="content")
+    # no Postgres o HTML fica em PromotionContent; aqui só no SQLite
+    content_html = deferred(Column(Text), group="content")
     images_json = Column(JSON)
     links_json = Column(JSON)
     scraped_at = Column(TIMESTAMP(timezone=True))
     valid_until = Column(TIMESTAMP(timezone=True))
     expired = Column(Boolean, default=False)
+    # última alteração da linha, por qualquer caminho (trigger, migrate.py 0009;
+    # só Postgres): filtro do export incremental
+    updated_at = deferred(Column(TIMESTAMP(timezone=True)))
+    # post quase igual a outro (fingerprint.py); NULL = ele mesmo é o canônico
+    canonical_id = Column(Integer)
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "url": self.url,
-            "title": self.title,
-            "date_published": self.date_published.isoformat() if self.date_published else None,
-            "author": self.author,
-            "content_text": self.content_text,
-            "content_html": self.content_html,
-            "images_json": self.images_json,
-            "links_json": self.links_json,
-            "scraped_at": self.scraped_at.isoformat() if self.scraped_at else None,
-            "valid_until": self.valid_until.isoformat() if self.valid_until else None,
-            "expired": self.expired
-        }
+    FIELDS = (
+        "id", "url", "title", "date_published", "author", "content_text", "content_html",
+        "images_json", "links_json", "scraped_at", "valid_until", "expired", "canonical_id",
+    )
+
+    def to_dict(self, fields=None):
+        data = {}
+        for name in fields or self.FIELDS:
+            value = getattr(self, name)
+            if name in ("date_published", "scraped_at", "valid_until"):
+                value = value.isoformat() if value else None
+            elif name == "canonical_id" and value is None:
+                value = self.id
+            data[name] = value
+        return data
+
+
+class PromotionContent(Base):
+    """HTML comprimido do post (content_store.py; só Postgres). Use content.decompress_html."""
+    __tablename__ = "promocoes_content"
+
+    post_id = Column(Integer, ForeignKey("promocoes.id", ondelete="CASCADE"), primary_key=True)
+    html = Column(LargeBinary, nullable=False)
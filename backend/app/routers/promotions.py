@@ -1,35 +1,387 @@
 # backend/app/routers/promotions.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from datetime import datetime
+import asyncio
+import base64
+import html
+import os
+import zlib
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
+from typing import Optional
 from zoneinfo import ZoneInfo
-from sqlalchemy import or_
+from sqlalchemy import JSON, Text, and_, func, literal_column, or_, select, text, type_coerce
 
-from ..db import SessionLocal
-from ..models import Promotion
+from ..cache import ResponseCache, etag_matches
+from ..db import AsyncSessionLocal, async_engine, get_db
+from ..events import broker
+from ..metrics import cache_result, observe_rows
+from ..content import decompress_html
+from ..models import Promotion, PromotionContent
+from ..serialization import FastJSONResponse, dumps, rows_to_json
 
 router = APIRouter(prefix="/api/v1/promotions", tags=["promotions"])
 TZ = ZoneInfo("America/Sao_Paulo")
 
-def get_db():
-    db = SessionLocal()
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# respostas do /today já serializadas; invalidado por promocoes_version
+today_cache = ResponseCache()
+
+# comentário SSE periódico: mantém a conexão viva em proxies
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+# listas (/today) e export: tudo menos o HTML, que só sai no detalhe (GET /{id})
+# ou no export com fields=content_html
+LIST_FIELDS = tuple(f for f in Promotion.FIELDS if f != "content_html")
+EXPORT_FIELDS = LIST_FIELDS
+EXPORT_BATCH = 500  # linhas por ida ao cursor (e por pedaço da resposta)
+
+SEARCH_FIELDS = ("id", "url", "title", "date_published", "valid_until", "rank", "snippet")
+
+# trecho da busca: o banco marca os termos com caracteres de controle, que
+# não aparecem no texto coletado; highlight_snippet escapa o texto (HTML) e
+# só então troca os marcadores por <mark>
+MARK_START, MARK_STOP = "\x02", "\x03"
+HEADLINE_OPTIONS = f"StartSel={MARK_START}, StopSel={MARK_STOP}, MaxWords=30, MinWords=10, MaxFragments=2"
+
+# busca textual (migrate.py 0003): tsvector pt_unaccent + GIN. O ts_headline
+# (caro) só roda nas linhas da página, depois do LIMIT.
+SEARCH_SQL_POSTGRES = text("""
+    SELECT p.id, p.url, p.title, p.date_published, p.valid_until, hit.rank,
+           ts_headline('pt_unaccent', coalesce(p.content_text, ''), hit.q, :headline)
+    FROM (
+        SELECT id, ts_rank_cd(search_tsv, q) AS rank, q
+        FROM promocoes, websearch_to_tsquery('pt_unaccent', :q) AS q
+        WHERE search_tsv @@ q
+        ORDER BY rank DESC, date_published DESC NULLS LAST, id DESC
+        LIMIT :limit OFFSET :offset
+    ) AS hit
+    JOIN promocoes p ON p.id = hit.id
+    ORDER BY hit.rank DESC, p.date_published DESC NULLS LAST, p.id DESC
+""")
+
+# fallback offline (promocoes.db): FTS5, título com peso 10 no bm25
+SEARCH_SQL_SQLITE = text("""
+    SELECT p.id, p.url, p.title, p.date_published, p.valid_until,
+           -bm25(promocoes_fts, 10.0, 1.0) AS rank,
+           snippet(promocoes_fts, 1, :mark_start, :mark_stop, '…', 30)
+    FROM promocoes_fts
+    JOIN promocoes p ON p.id = promocoes_fts.rowid
+    WHERE promocoes_fts MATCH :q
+    ORDER BY bm25(promocoes_fts, 10.0, 1.0), p.id DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+# imagens/links normalizados (migrate.py 0007) de volta ao formato de
+# images_json/links_json: funções SQL da migrate.py 0010, as mesmas que
+# export.py e archiver.py usam (url_store.IMAGES_JSON_SQL / LINKS_JSON_SQL)
+NORMALIZED_JSON_POSTGRES = {
+    "images_json": "promocoes_images_json(promocoes.id, promocoes.images_json)",
+    "links_json": "promocoes_links_json(promocoes.id, promocoes.url, promocoes.links_json)",
+}
+
+# promos que linkam para um parceiro (host) ou uma URL exata: índice em
+# urls(host)/urls(url) + GIN em post_links.url_ids, sem varrer o JSON
+BY_LINK_SQL_POSTGRES = text("""
+    SELECT p.id, p.url, p.title, p.date_published, p.valid_until
+    FROM promocoes p
+    WHERE p.id IN (
+        SELECT post_id FROM post_links
+        WHERE url_ids && ARRAY(
+            SELECT id FROM urls
+            WHERE (CAST(:host AS TEXT) IS NULL OR host = :host) AND (CAST(:link AS TEXT) IS NULL OR url = :link)
+        )
+    )
+    ORDER BY p.date_published DESC NULLS LAST, p.id DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+# SQLite (sem arrays): uma linha por link, índice em post_links(url_id)
+BY_LINK_SQL_SQLITE = text("""
+    SELECT p.id, p.url, p.title, p.date_published, p.valid_until
+    FROM promocoes p
+    WHERE p.id IN (
+        SELECT pl.post_id FROM post_links pl
+        JOIN urls u ON u.id = pl.url_id
+        WHERE (:host IS NULL OR u.host = :host) AND (:link IS NULL OR u.url = :link)
+    )
+    ORDER BY p.date_published DESC NULLS LAST, p.id DESC
+    LIMIT :limit OFFSET :offset
+""")
+BY_LINK_FIELDS = ("id", "url", "title", "date_published", "valid_until")
+
+def field_column(name: str):
+    """Coluna do select para um campo da API (canonical_id nulo = o próprio id)."""
+    if name == "canonical_id":
+        return func.coalesce(Promotion.canonical_id, Promotion.id).label("canonical_id")
+    if name in NORMALIZED_JSON_POSTGRES and async_engine.dialect.name == "postgresql":
+        return literal_column(NORMALIZED_JSON_POSTGRES[name], type_=JSON).label(name)
+    if name == "content_html" and async_engine.dialect.name == "postgresql":
+        # bytes comprimidos (migrate.py 0008): passe o valor por decompress_html
+        return (
+            select(PromotionContent.html)
+            .where(PromotionContent.post_id == Promotion.id)
+            .scalar_subquery()
+            .label(name)
+        )
+    return getattr(Promotion, name)
+
+def encode_cursor(date_published: Optional[date], promo_id: int) -> str:
+    raw = f"{date_published.isoformat() if date_published else ''}|{promo_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
     try:
-        yield db
-    finally:
-        db.close()
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        d, promo_id = raw.split("|")
+        return (date.fromisoformat(d) if d else None), int(promo_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor inválido")
+
+def parse_fields(fields: Optional[str], available=Promotion.FIELDS):
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in available]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"campos desconhecidos: {', '.join(unknown)} (disponíveis: {', '.join(available)})",
+        )
+    return wanted
+
+def fts5_query(q: str) -> str:
+    """Termos da busca como frases FTS5 (AND implícito), sem expor a sintaxe do MATCH."""
+    terms = [t for t in q.replace('"', " ").split() if any(c.isalnum() for c in t)]
+    return " ".join(f'"{t}"' for t in terms)
+
+def keyset_after(cursor_date: Optional[date], cursor_id: int):
+    """Linhas depois do cursor em (date_published DESC NULLS LAST, id DESC)."""
+    if cursor_date is None:
+        return and_(Promotion.date_published == None, Promotion.id < cursor_id)
+    return or_(
+        Promotion.date_published < cursor_date,
+        and_(Promotion.date_published == cursor_date, Promotion.id < cursor_id),
+        Promotion.date_published == None,
+    )
 
-@router.get("/today")
-def get_today_promotions(db: Session = Depends(get_db)):
+async def build_today_response(db: AsyncSession, limit: int, cursor: Optional[str], wanted, dedup: bool = False):
+    """Consulta + serialização do /today. Devolve (body, headers, expires_at)."""
     now = datetime.now(TZ)
+    names = wanted or LIST_FIELDS
     # traz promos sem valid_until (ambíguo) ou que ainda não expiraram
-    promos = db.query(Promotion).filter(
-        or_(Promotion.valid_until == None, Promotion.valid_until >= now)
-    ).order_by(Promotion.date_published.desc()).all()
-    return [p.to_dict() for p in promos]
-
-@router.get("/{promo_id}")
-def get_promotion(promo_id: int, db: Session = Depends(get_db)):
-    promo = db.query(Promotion).filter(Promotion.id == promo_id).first()
-    if not promo:
+    visible = or_(Promotion.valid_until == None, Promotion.valid_until >= now)
+    # linhas simples (sem objetos ORM): as colunas pedidas e, no fim, id/date_published
+    # para o cursor e valid_until para a expiração do cache
+    query = select(
+        *(field_column(f) for f in names),
+        Promotion.id.label("_id"),
+        Promotion.date_published.label("_date_published"),
+        Promotion.valid_until.label("_valid_until"),
+    ).where(visible)
+    if dedup:
+        # um post por grupo de quase duplicados, escolhido entre os visíveis:
+        # o canônico se ainda vale, senão a republicação mais recente (o
+        # original expirado e ainda não arquivado não esconde o grupo)
+        rank = func.row_number().over(
+            partition_by=func.coalesce(Promotion.canonical_id, Promotion.id),
+            order_by=(
+                Promotion.canonical_id.isnot(None),
+                Promotion.date_published.desc().nullslast(),
+                Promotion.id.desc(),
+            ),
+        )
+        reps = select(Promotion.id, rank.label("rank")).where(visible).subquery()
+        query = query.where(Promotion.id.in_(select(reps.c.id).where(reps.c.rank == 1)))
+    if cursor:
+        query = query.where(keyset_after(*decode_cursor(cursor)))
+    query = query.order_by(
+        Promotion.date_published.desc().nullslast(), Promotion.id.desc()
+    ).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    observe_rows("today", len(rows))
+
+    # a resposta muda sozinha quando a primeira dessas promos expira
+    upcoming = [r[-1] for r in rows if r[-1] is not None]
+    expires_at = min(upcoming).timestamp() if upcoming else None
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1][-2], rows[-1][-3])
+    return rows_to_json(rows, names), headers, expires_at
+
+@router.get("/today", response_class=FastJSONResponse)
+async def get_today_promotions(
+    request: Request,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="ex.: id,title,url,valid_until (content_html só em /{id})"),
+    dedup: bool = Query(False, description="omite posts republicados (mantém o canonical_id)"),
+    db: AsyncSession = Depends(get_db),
+):
+    wanted = parse_fields(fields, LIST_FIELDS)
+    key = (limit, cursor or "", tuple(wanted) if wanted else None, dedup)
+    version = await today_cache.sync_version(db)
+    entry = today_cache.get(key)
+    cache_result("today", entry is not None)
+    if entry is None:
+        body, headers, expires_at = await build_today_response(db, limit, cursor, wanted, dedup)
+        entry = today_cache.put(key, body, headers, expires_at, version=version)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **entry.headers}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(content=entry.body, headers=headers)
+
+def highlight_snippet(snippet):
+    """Trecho marcado pelo banco -> HTML: texto escapado, termos em <mark>."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_STOP, "</mark>")
+
+
+@router.get("/search", response_class=FastJSONResponse)
+async def search_promotions(
+    q: str = Query(..., min_length=1, max_length=200, description='ex.: smiles, "100% bônus"'),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    if db.bind.dialect.name == "sqlite":
+        q = fts5_query(q)
+        if not q:
+            return FastJSONResponse(content=b"[]")
+        query = SEARCH_SQL_SQLITE
+    else:
+        query = SEARCH_SQL_POSTGRES
+    params = {"q": q, "limit": limit, "offset": offset}
+    params.update(headline=HEADLINE_OPTIONS, mark_start=MARK_START, mark_stop=MARK_STOP)
+    rows = (await db.execute(query, params)).all()
+    observe_rows("search", len(rows))
+    rows = [row[:-1] + (highlight_snippet(row[-1]),) for row in rows]
+    return FastJSONResponse(content=rows_to_json(rows, SEARCH_FIELDS))
+
+def export_query(names, date_from: Optional[date], date_to: Optional[date], since: Optional[datetime]):
+    query = select(*(field_column(f) for f in names))
+    if date_from:
+        query = query.where(Promotion.date_published >= date_from)
+    if date_to:
+        query = query.where(Promotion.date_published <= date_to)
+    if since:
+        # incremental: updated_at muda em qualquer UPDATE da linha (upsert,
+        # reprocess, agrupamento de duplicados; migrate.py 0009)
+        if async_engine.dialect.name == "sqlite":
+            # cópia offline: só o upsert escreve; scraped_at em texto ISO (com "T")
+            query = query.where(type_coerce(Promotion.scraped_at, Text) > since.astimezone(TZ).isoformat())
+        else:
+            query = query.where(Promotion.updated_at > since)
+    return query.order_by(Promotion.id)
+
+async def ndjson_stream(query, names, compress: bool):
+    """
+    Uma linha JSON por promo, lida do banco em lotes (cursor do servidor):
+    memória constante. Com compress, cada lote sai como um pedaço gzip
+    completo (sync flush), então o cliente descomprime enquanto recebe.
+    """
+    gz = zlib.compressobj(wbits=31) if compress else None  # wbits=31: formato gzip
+    count = 0
+    # sessão própria: a do Depends fecha antes de o corpo terminar de ser enviado
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH))
+        html = names.index("content_html") if "content_html" in names else None
+        async for part in result.partitions():
+            count += len(part)
+            if html is not None:
+                part = [row[:html] + (decompress_html(row[html]),) + row[html + 1:] for row in part]
+            chunk = b"".join(dumps(dict(zip(names, row))) + b"\n" for row in part)
+            yield gz.compress(chunk) + gz.flush(zlib.Z_SYNC_FLUSH) if gz else chunk
+    observe_rows("export", count)
+    if gz:
+        yield gz.flush()
+
+@router.get("/export")
+async def export_promotions(
+    date_from: Optional[date] = Query(None, description="date_published >= (AAAA-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="date_published <= (AAAA-MM-DD)"),
+    since: Optional[datetime] = Query(None, description="só o que foi gravado/alterado depois (updated_at)"),
+    fields: Optional[str] = Query(None, description="ex.: id,url,title,valid_until"),
+    gzip: bool = Query(False, description="resposta como arquivo .ndjson.gz"),
+):
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from depois de date_to")
+    if since and since.tzinfo is None:
+        since = since.replace(tzinfo=TZ)
+    names = parse_fields(fields) or EXPORT_FIELDS
+    stream = ndjson_stream(export_query(names, date_from, date_to, since), names, gzip)
+    if gzip:
+        return StreamingResponse(
+            stream,
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="promocoes.ndjson.gz"'},
+        )
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+@router.get("/by-link", response_class=FastJSONResponse)
+async def promotions_by_link(
+    host: Optional[str] = Query(None, max_length=255, description="ex.: livelo.com.br"),
+    url: Optional[str] = Query(None, max_length=2048, description="URL exata do link"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    if not host and not url:
+        raise HTTPException(status_code=400, detail="informe host ou url")
+    if host:
+        # mesma normalização do url_store.url_host
+        host = host.strip().lower()
+        host = host[4:] if host.startswith("www.") else host
+    params = {"host": host, "link": url, "limit": limit, "offset": offset}
+    query = BY_LINK_SQL_SQLITE if db.bind.dialect.name == "sqlite" else BY_LINK_SQL_POSTGRES
+    rows = (await db.execute(query, params)).all()
+    observe_rows("by-link", len(rows))
+    return FastJSONResponse(content=rows_to_json(rows, BY_LINK_FIELDS))
+
+@router.get("/events")
+async def promotion_events(last_event_id: Optional[str] = Header(None)):
+    """
+    Server-sent events: insert / update / delete (linha saiu da tabela,
+    ex.: arquivada) / expire (valid_until passou) / resync (eventos podem ter
+    se perdido: recarregue o /today). O EventSource reconecta sozinho
+    mandando Last-Event-ID.
+    """
+    sub = broker.subscribe(last_event_id)
+
+    async def stream():
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.get(), EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if event is None:
+                    return  # ficou para trás: o cliente reconecta com Last-Event-ID
+                yield event.encoded
+        finally:
+            sub.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{promo_id}", response_class=FastJSONResponse)
+async def get_promotion(promo_id: int, db: AsyncSession = Depends(get_db)):
+    query = select(*(field_column(f) for f in Promotion.FIELDS)).where(Promotion.id == promo_id)
+    row = (await db.execute(query)).first()
+    observe_rows("promotion", 1 if row else 0)
+    if not row:
         raise HTTPException(status_code=404, detail="Promoção não encontrada")
-    return promo.to_dict()
+    data = dict(zip(Promotion.FIELDS, row))
+    data["content_html"] = decompress_html(data["content_html"])
+    return FastJSONResponse(content=data)
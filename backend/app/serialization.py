@@ -0,0 +1,48 @@
+# backend/app/serialization.py
+# Serialização direta de linhas (Row / tuplas de colunas) para bytes JSON,
+# sem passar por Promotion.to_dict + jsonable_encoder.
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # sem orjson: mesmo formato via json da stdlib (mais lento)
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"tipo não serializável: {type(value).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """
+    JSON compacto em UTF-8, no mesmo formato do json.dumps(ensure_ascii=False,
+    separators=(",", ":")) usado antes: date/datetime em isoformat.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def rows_to_json(rows, names) -> bytes:
+    """
+    Serializa linhas de um select de colunas. Cada linha vira um objeto com as
+    chaves `names`, na ordem; colunas extras no fim da linha são ignoradas.
+    """
+    return dumps([dict(zip(names, row)) for row in rows])
+
+
+class FastJSONResponse(Response):
+    """JSONResponse que codifica com orjson (quando instalado)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
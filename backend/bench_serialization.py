@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# backend/bench_serialization.py
+# Compara a serialização antiga do /today (objetos ORM -> Promotion.to_dict ->
+# jsonable_encoder -> JSONResponse) com a nova (tuplas de colunas -> rows_to_json).
+#
+# Uso (de dentro de backend/): python bench_serialization.py [linhas ...]
+# Padrão: 1000 e 10000 linhas, em um SQLite em memória populado a partir de
+# ../promocoes.db (as linhas são repetidas até completar o total).
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, undefer_group
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app.models import Promotion
+from app.routers.promotions import field_column
+from app.serialization import orjson, rows_to_json
+
+SOURCE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "promocoes.db")
+REPEAT = 5
+
+
+def sample_rows():
+    """Linhas reais de promocoes.db (ou uma linha sintética se não houver)."""
+    rows = []
+    if os.path.exists(SOURCE_DB):
+        conn = sqlite3.connect(SOURCE_DB)
+        conn.row_factory = sqlite3.Row
+        for r in conn.execute("SELECT title, author, content_text, content_html FROM promocoes"):
+            rows.append(dict(r))
+        conn.close()
+    return rows or [{
+        "title": "Promoção: passagens a partir de R$ 299",
+        "author": "Redação",
+        "content_text": "Válida até 30/11 às 23h59.\n\n" * 20,
+        "content_html": "<p>Válida até 30/11 às 23h59.</p>" * 20,
+    }]
+
+
+def seed(engine, n):
+    samples = sample_rows()
+    now = datetime.now(timezone.utc)
+    values = []
+    for i in range(n):
+        s = samples[i % len(samples)]
+        values.append({
+            "id": i + 1,
+            "url": f"https://example.com/promo-{i}/",
+            "title": s["title"],
+            "date_published": date.today() - timedelta(days=i % 30),
+            "author": s["author"],
+            "content_text": s["content_text"],
+            "content_html": s["content_html"],
+            "images_json": [f"https://example.com/img-{i}.jpg"],
+            "links_json": [{"text": "link", "href": f"https://example.com/{i}"}],
+            "scraped_at": now,
+            "valid_until": now + timedelta(days=i % 7) if i % 3 else None,
+            "expired": False,
+        })
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Promotion.__table__), values)
+
+
+def order(query):
+    return query.order_by(Promotion.date_published.desc(), Promotion.id.desc())
+
+
+def old_path(engine):
+    with Session(engine) as s:
+        promos = s.execute(order(select(Promotion).options(undefer_group("content")))).scalars().all()
+        return JSONResponse(jsonable_encoder([p.to_dict() for p in promos])).body
+
+
+def new_path(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(order(select(*(field_column(f) for f in Promotion.FIELDS)))).all()
+        return rows_to_json(rows, Promotion.FIELDS)
+
+
+def bench(fn, engine):
+    best = None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn(engine)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000]
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'json (stdlib)'}, melhor de {REPEAT} execuções")
+    for n in sizes:
+        seed(engine, n)
+        t_old, body_old = bench(old_path, engine)
+        t_new, body_new = bench(new_path, engine)
+        # confere que as duas saídas têm o mesmo conteúdo
+        same = json.loads(body_old) == json.loads(body_new)
+        print(f"{n} linhas ({len(body_new) / 1024:.0f} KiB)")
+        print(f"  antigo: {t_old * 1000:8.1f} ms")
+        print(f"  novo:   {t_new * 1000:8.1f} ms")
+        print(f"  speedup: {t_old / t_new:.1f}x  {'✅ mesmo JSON' if same else '❌ JSON diferente'}")
+
+
+if __name__ == "__main__":
+    main()
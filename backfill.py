@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# backfill.py
+# Coleta retroativa: percorre /feed/?paged=N e/ou o sitemap para um intervalo
+# de datas e grava pelo mesmo caminho do scrape_passageiro (Fetcher ->
+# build_post em processos -> BatchWriter; ver pipeline.py). URLs já gravadas são puladas e o progresso
+# fica em backfill_checkpoints: rodar de novo continua de onde parou. O job é
+# a fonte + a data inicial; a data final resolvida (padrão: hoje) fica no
+# checkpoint, então retomar no dia seguinte continua o mesmo intervalo.
+#
+# Uso:
+#   python backfill.py 2025-01-01                 # de 01/01 até hoje, feed + sitemap
+#   python backfill.py 2025-01-01 2025-06-30 --source sitemap
+#   python backfill.py 2025-01-01 --restart       # ignora o checkpoint
+
+import argparse
+import json
+import os
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+
+import feedparser
+import requests
+
+import scrape_metrics
+import scrape_passageiro as sp
+from fetcher import Fetcher
+from fingerprint import cluster_duplicates
+from pipeline import PARSE_WORKERS, fetched_jobs, make_pool, parse_post_job, run_pipeline
+from promo_version import bump_version
+
+# -------- CONFIG --------
+SITEMAP_URL = os.getenv("SCRAPER_SITEMAP_URL", sp.SITE + "/sitemap_index.xml")
+SITEMAP_MATCH = os.getenv("SCRAPER_SITEMAP_MATCH", "post-sitemap")  # sitemaps filhos com posts
+SITEMAP_CHUNK = int(os.getenv("BACKFILL_SITEMAP_CHUNK", "100"))  # URLs por checkpoint
+MAX_FEED_PAGES = int(os.getenv("BACKFILL_MAX_FEED_PAGES", "5000"))
+# ------------------------
+
+
+class Checkpoint:
+    """Posição de um job em backfill_checkpoints (posição é um dict JSON)."""
+
+    def __init__(self, conn, job):
+        self.conn = conn
+        self.job = job
+        cur = conn.cursor()
+        cur.execute("SELECT position, seen, saved, done FROM backfill_checkpoints WHERE job = %s", (job,))
+        row = cur.fetchone()
+        conn.commit()
+        cur.close()
+        if row:
+            self.position, self.seen, self.saved, self.done = json.loads(row[0]), row[1], row[2], row[3]
+        else:
+            self.position, self.seen, self.saved, self.done = {}, 0, 0, False
+
+    def save(self, position, seen=0, saved=0, done=False):
+        self.position = position
+        self.seen += seen
+        self.saved += saved
+        self.done = done
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO backfill_checkpoints (job, position, seen, saved, done, updated_at)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+            ON CONFLICT (job) DO UPDATE SET
+                position = EXCLUDED.position,
+                seen = EXCLUDED.seen,
+                saved = EXCLUDED.saved,
+                done = EXCLUDED.done,
+                updated_at = NOW()
+        """,
+            (self.job, json.dumps(position), self.seen, self.saved, done),
+        )
+        self.conn.commit()
+        cur.close()
+
+    def reset(self):
+        self.position, self.seen, self.saved, self.done = {}, 0, 0, False
+
+
+def existing_urls(conn, urls):
+    if not urls:
+        return set()
+    cur = conn.cursor()
+    cur.execute("SELECT url FROM promocoes WHERE url = ANY(%s)", (list(urls),))
+    found = {r[0] for r in cur.fetchall()}
+    conn.commit()
+    cur.close()
+    return found
+
+
+# -------- FONTES --------
+# Cada fonte gera (posição_depois_do_lote, itens) a partir da posição salva;
+# itens no formato de posts_de_hoje: {"link", "feed_title", "published"}.
+
+def feed_batches(fetcher, since, until, start):
+    """Páginas do feed (mais novas primeiro); para na primeira página com post anterior a `since`."""
+    page = start.get("page", 0) + 1
+    while page <= MAX_FEED_PAGES:
+        url = sp.RSS_URL if page == 1 else f"{sp.RSS_URL}?paged={page}"
+        try:
+            resp = fetcher.get(url)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return  # passou da última página
+            raise
+        feed = feedparser.parse(resp.content)
+        if not feed.entries:
+            return
+        items = []
+        oldest = None
+        for entry in feed.entries:
+            pub_dt = sp.entry_published(entry)
+            if pub_dt is not None:
+                oldest = pub_dt if oldest is None else min(oldest, pub_dt)
+                if not since <= pub_dt.date() <= until:
+                    continue
+            items.append({"link": entry.link, "feed_title": entry.get("title"), "published": pub_dt})
+        yield {"page": page}, items
+        if oldest is not None and oldest.date() < since:
+            return
+        page += 1
+
+
+def _xml_entries(content, tag):
+    """(loc, lastmod) de cada <sitemap>/<url> do XML (ignora o namespace)."""
+    root = ET.fromstring(content)
+    for node in root:
+        if not node.tag.endswith(tag):
+            continue
+        loc = lastmod = None
+        for child in node:
+            if child.tag.endswith("loc"):
+                loc = (child.text or "").strip()
+            elif child.tag.endswith("lastmod"):
+                try:
+                    lastmod = date.fromisoformat((child.text or "").strip()[:10])
+                except ValueError:
+                    lastmod = None
+        if loc:
+            yield loc, lastmod
+
+
+def sitemap_batches(fetcher, since, until, start):
+    """
+    URLs dos sitemaps de posts, em lotes de SITEMAP_CHUNK. O lastmod só
+    filtra pelo início do intervalo (um post do intervalo foi modificado
+    depois de publicado); o fim é conferido na data do próprio post.
+
+    A posição guarda os sitemaps filhos pela URL (os concluídos e o atual,
+    com o offset): o índice é relido a cada execução e um filho novo ou
+    reordenado não desloca o que já foi feito.
+    """
+    index = fetcher.get(SITEMAP_URL).content
+    children = [
+        loc for loc, lastmod in _xml_entries(index, "sitemap")
+        if SITEMAP_MATCH in loc and (lastmod is None or lastmod >= since)
+    ] or [SITEMAP_URL]  # sem índice: o próprio arquivo é o urlset
+    done = list(start.get("done", []))
+    current = start.get("sitemap")
+    for child in children:
+        if child in done:
+            continue
+        urls = [
+            loc for loc, lastmod in _xml_entries(fetcher.get(child).content, "url")
+            if lastmod is None or lastmod >= since
+        ]
+        offset = start.get("offset", 0) if child == current else 0
+        for k in range(offset, len(urls), SITEMAP_CHUNK):
+            chunk = urls[k:k + SITEMAP_CHUNK]
+            yield {"sitemap": child, "offset": k + len(chunk), "done": done}, [
+                {"link": u, "feed_title": None, "published": None} for u in chunk
+            ]
+        done = done + [child]
+
+
+SOURCES = {"feed": feed_batches, "sitemap": sitemap_batches}
+# ------------------------
+
+
+def _describe(position):
+    """Posição para o terminal (sem a lista de sitemaps concluídos)."""
+    return {k: v for k, v in position.items() if k not in ("done", "until")}
+
+
+def run_job(conn, fetcher, source, since, until=None, restart=False, pool=None, workers=PARSE_WORKERS):
+    """
+    Roda (ou retoma) o job `source` desde `since`. `until` None: a data final
+    salva no checkpoint, ou hoje num job novo. Devolve quantos posts salvou.
+    """
+    job = f"{source}:{since.isoformat()}"
+    ckpt = Checkpoint(conn, job)
+    if restart:
+        ckpt.reset()
+    if "until" in ckpt.position:
+        saved_until = date.fromisoformat(ckpt.position["until"])
+        if until is not None and until != saved_until:
+            raise SystemExit(f"❌ {job} foi iniciado até {saved_until}; use --restart para outro intervalo.")
+        until = saved_until
+    until = until or datetime.now(sp.TZ).date()
+    print(f"🚀 Backfill {source}: {since} → {until}")
+
+    if ckpt.done:
+        print(f"✅ {job} já concluído ({ckpt.saved} salvos). Use --restart para refazer.")
+        return 0
+    elif ckpt.position:
+        print(f"↪️  Retomando {job} de {_describe(ckpt.position)} ({ckpt.seen} vistos, {ckpt.saved} salvos).")
+
+    failed = 0
+    for position, items in SOURCES[source](fetcher, since, until, ckpt.position):
+        known = existing_urls(conn, [it["link"] for it in items])
+        new = [it for it in items if it["link"] not in known]
+        saved = 0
+
+        def on_saved(data, err):
+            nonlocal saved, failed
+            if err:
+                failed += 1
+                print(f"   ❌ Erro ao gravar {data['url']}: {err}")
+            else:
+                saved += 1
+
+        with sp.batch_writer(conn) as writer:
+            # fetch (threads) -> parse (processos) -> este writer (pipeline.py)
+            def write(job, data, err):
+                nonlocal failed
+                if err:
+                    failed += 1
+                    print(f"   ❌ Erro em {job['url']}: {err}")
+                    return
+                published = data["date_published"]
+                if published is not None and not since <= published <= until:
+                    return
+                writer.add(data, on_done=on_saved)
+
+            run_pipeline(
+                fetched_jobs(fetcher, new), parse_post_job, write, workers=workers, pool=pool, tick=writer.maybe_flush
+            )
+        # lote gravado (o writer fez flush ao sair): só então avança o checkpoint
+        ckpt.save({**position, "until": until.isoformat()}, seen=len(items), saved=saved)
+        print(f"📄 {source} {_describe(position)}: {len(items)} itens, {len(new)} novos, {saved} salvos.")
+
+    ckpt.save({**ckpt.position, "until": until.isoformat()}, done=True)
+    print(f"🏁 {job}: {ckpt.seen} itens vistos, {ckpt.saved} salvos, {failed} falhas.")
+    if failed:
+        print("   Rode com --restart para tentar de novo as falhas (URLs já gravadas são puladas).")
+    return ckpt.saved
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Coleta retroativa pelo feed paginado e pelo sitemap.")
+    ap.add_argument("since", type=date.fromisoformat, help="data inicial (AAAA-MM-DD)")
+    ap.add_argument("until", nargs="?", type=date.fromisoformat, help="data final (padrão: a do checkpoint, ou hoje)")
+    ap.add_argument("--source", choices=["feed", "sitemap", "all"], default="all")
+    ap.add_argument("--restart", action="store_true", help="ignora o checkpoint salvo")
+    ap.add_argument("--workers", type=int, default=PARSE_WORKERS, help="processos de parse (0 = sem processos)")
+    args = ap.parse_args()
+
+    conn = sp.init_db()
+    fetcher = Fetcher(
+        headers={"User-Agent": sp.USER_AGENT, "Referer": sp.SITE},
+        timeout=sp.REQUEST_TIMEOUT,
+        rate_seconds=sp.RATE_SECONDS,
+        concurrency=sp.CONCURRENCY,
+    )
+    sources = ["feed", "sitemap"] if args.source == "all" else [args.source]
+    saved = 0
+    # um pool de parse para o job todo (os lotes são pequenos)
+    pool = make_pool(args.workers)
+    try:
+        for source in sources:
+            saved += run_job(conn, fetcher, source, args.since, args.until, restart=args.restart, pool=pool, workers=args.workers)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        fetcher.close()
+
+    if saved:
+        clustered = cluster_duplicates(conn, window_days=(datetime.now(sp.TZ).date() - args.since).days + 1)
+        if clustered:
+            bump_version(conn)
+            print(f"🔗 {clustered} post(s) agrupados como quase duplicados.")
+    conn.close()
+    scrape_metrics.finish("backfill", saved=saved)
+
+
+if __name__ == "__main__":
+    main()
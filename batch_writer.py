@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# batch_writer.py
+# Acumula posts e grava em lote (um INSERT ... ON CONFLICT multi-linha por flush).
+
+import time
+
+import scrape_metrics
+
+
+class BatchWriter:
+    """
+    Junta linhas e grava com um único `execute_values` + um commit por lote.
+
+    - `sql`: INSERT ... VALUES %s ON CONFLICT ... (formato do execute_values)
+    - `to_row(data)`: converte o dict do post na tupla de valores
+    - `template`: template de linha do execute_values (ex.: "(%s,%s,NOW())")
+    - `on_flush(n)`: chamado após cada flush com o número de linhas gravadas
+    - `key(data)`: chave de conflito; dentro de um lote só a última versão vale,
+      já que o Postgres não aceita atualizar a mesma linha duas vezes no mesmo
+      comando.
+    - `after_write(cur, linhas, dados)`: com `sql` terminando em RETURNING,
+      recebe as linhas devolvidas e os dicts do lote, na mesma transação
+      (ex.: url_store grava post_links/post_images antes do commit)
+    - `on_rollback()`: chamado quando um lote (ou linha) é desfeito
+    - `flush_interval`: idade máxima do lote, em segundos. Não há timer: o
+      prazo é conferido em `add()` e em `maybe_flush()`, que o pipeline
+      chama quando a fila fica parada (run_pipeline(..., tick=...)).
+
+    Se o lote falhar, ele é refeito linha a linha com SAVEPOINTs: as linhas
+    boas são gravadas e cada erro é reportado para o callback daquela linha,
+    sem derrubar o resto. Se a conexão cair no meio, nada do lote foi
+    gravado e o erro vai para o callback de todas as linhas.
+    """
+
+    def __init__(
+        self, conn, sql, to_row, key=lambda d: d.get("url"), batch_size=50, flush_interval=10.0, template=None,
+        on_flush=None, after_write=None, on_rollback=None,
+    ):
+        self.conn = conn
+        self.sql = sql
+        self.to_row = to_row
+        self.template = template
+        self.on_flush = on_flush
+        self.after_write = after_write
+        self.on_rollback = on_rollback
+        self.key = key
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self.written = 0
+        self.errors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def add(self, data: dict, on_done=None):
+        """
+        Enfileira um post. `on_done(data, erro)` é chamado depois do flush
+        (erro é None quando a linha foi gravada).
+        """
+        self._pending[self.key(data)] = (data, on_done)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        else:
+            self.maybe_flush()
+
+    def maybe_flush(self):
+        """Grava o lote pendente se ele já passou de `flush_interval`."""
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        pending = list(self._pending.values())
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        if not pending:
+            return 0, []
+        with scrape_metrics.stage("write"):
+            return self._flush(pending)
+
+    def _flush(self, pending):
+        results = []
+        try:
+            rows = [self.to_row(d) for d, _ in pending]
+            cur = self.conn.cursor()
+            self._write(cur, rows, [d for d, _ in pending])
+            self.conn.commit()
+            cur.close()
+            results = [(d, cb, None) for d, cb in pending]
+        except Exception:
+            self._rollback()
+            if self.on_rollback:
+                self.on_rollback()
+            results = self._flush_one_by_one(pending)
+
+        ok = 0
+        errors = []
+        for d, cb, err in results:
+            if err is None:
+                ok += 1
+            else:
+                errors.append((self.key(d), err))
+            if cb:
+                cb(d, err)
+        self.written += ok
+        self.errors.extend(errors)
+        scrape_metrics.rows_written(ok)
+        if self.on_flush:
+            self.on_flush(ok)
+        return ok, errors
+
+    def _write(self, cur, rows, datas):
+        from psycopg2.extras import execute_values
+
+        if self.after_write is None:
+            execute_values(cur, self.sql, rows, template=self.template, page_size=len(rows))
+            return
+        returned = execute_values(cur, self.sql, rows, template=self.template, page_size=len(rows), fetch=True)
+        self.after_write(cur, returned, datas)
+
+    def _rollback(self):
+        # com a conexão perdida o rollback também falha; quem grava descobre o erro
+        try:
+            self.conn.rollback()
+        except Exception:
+            pass
+
+    def _flush_one_by_one(self, pending):
+        try:
+            return self._write_one_by_one(pending)
+        except Exception as e:
+            # conexão perdida (SAVEPOINT/COMMIT falharam): nenhuma linha do lote ficou gravada
+            self._rollback()
+            if self.on_rollback:
+                self.on_rollback()
+            return [(d, cb, e) for d, cb in pending]
+
+    def _write_one_by_one(self, pending):
+        results = []
+        cur = self.conn.cursor()
+        for d, cb in pending:
+            try:
+                row = self.to_row(d)
+            except Exception as e:
+                results.append((d, cb, e))
+                continue
+            cur.execute("SAVEPOINT batch_row")
+            try:
+                self._write(cur, [row], [d])
+                cur.execute("RELEASE SAVEPOINT batch_row")
+                results.append((d, cb, None))
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT batch_row")
+                if self.on_rollback:
+                    self.on_rollback()
+                results.append((d, cb, e))
+        self.conn.commit()
+        cur.close()
+        return results
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# bench_pipeline.py
+# Mede o pipeline fetch -> parse -> escrita (pipeline.py) com parse na thread
+# principal (workers=0) e com 1..N processos. O "fetch" entrega HTML já em
+# memória (com latência simulada opcional) e a escrita só conta.
+#
+# Uso: python bench_pipeline.py [pasta_com_html ...]
+# Sem argumentos usa o content_html salvo em promocoes.db.
+# BENCH_POSTS=400 BENCH_FETCH_MS=20 python bench_pipeline.py
+
+import os
+import sys
+import time
+
+from bench_text_extract import load_pages
+from pipeline import make_pool, parse_post_job, run_pipeline
+
+POSTS = int(os.getenv("BENCH_POSTS", "200"))
+FETCH_MS = float(os.getenv("BENCH_FETCH_MS", "0"))  # latência simulada por página
+
+
+def make_job(i, name, html):
+    return {
+        "url": f"https://bench.local/{i}/{name}",
+        "item": {"feed_title": None, "published": None},
+        "body": html.encode("utf-8"),
+        "encoding": "utf-8",
+    }
+
+
+def jobs(pages):
+    for i in range(POSTS):
+        if FETCH_MS:
+            time.sleep(FETCH_MS / 1000)
+        yield make_job(i, *pages[i % len(pages)])
+
+
+def main():
+    pages = load_pages(sys.argv[1:])
+    if not pages:
+        print("Nenhuma página encontrada.")
+        return
+    written = []
+    cpus = os.cpu_count() or 1
+    print(f"{POSTS} posts ({len(pages)} páginas distintas), fetch simulado {FETCH_MS:.0f} ms, {cpus} CPU(s)")
+    base = None
+    for workers in range(0, cpus + 1):
+        pool = make_pool(workers)
+        try:
+            if pool is not None:
+                # sobe os processos (importações) fora da medição
+                list(pool.map(parse_post_job, [make_job(i, *pages[0]) for i in range(workers)]))
+            written.clear()
+            stats = run_pipeline(jobs(pages), parse_post_job, lambda job, data, err: written.append(err), workers=workers, pool=pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        errors = sum(1 for e in written if e is not None)
+        base = base or stats.per_second
+        label = "inline" if workers == 0 else f"{workers} proc"
+        print(
+            f"  {label:>8}: {stats.seconds:6.2f}s  {stats.per_second:7.1f} posts/s  "
+            f"({stats.per_second / base:.1f}x, {errors} erros)"
+        )
+
+
+if __name__ == "__main__":
+    main()
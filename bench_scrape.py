@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# bench_scrape.py
+# Benchmark offline do coletor: serve um corpus salvo (HTML dos artigos +
+# RSS) num servidor HTTP local e mede cada etapa por post: fetch, parse do
+# BeautifulSoup, collect_text_from_container, detect_valid_until, build_post
+# (parse completo) e upsert num banco local descartável. Mostra p50/p95 por
+# etapa e posts/s; com baseline salvo, sai com erro se alguma etapa piorou.
+# O caminho de gravação real do coletor (UPSERT_SQL + BatchWriter, com
+# url_store/content_store) é só Postgres: use --db. No SQLite padrão o upsert
+# é um SQL equivalente do próprio benchmark e o número dele é só indicativo.
+#
+# Uso:
+#   python bench_scrape.py                          # corpus = promocoes.db, SQLite temporário
+#   python bench_scrape.py --corpus pasta/          # *.html + feed.xml opcional
+#   python bench_scrape.py --db postgresql://...    # gravação real num schema temporário do Postgres
+#   python bench_scrape.py --save-baseline          # grava bench_baseline.json (versionado)
+#   python bench_scrape.py                          # compara com o baseline (exit 1 se regrediu)
+#
+# Corpus em pasta: cada `<slug>.html` vira /<slug>/ no servidor local. Com
+# `feed.xml` (RSS salvo do site) os <link> dos itens são apontados para o
+# servidor pelo último segmento do caminho; sem ele o feed é gerado.
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# -------- CONFIG --------
+DB = "promocoes.db"
+BASELINE = "bench_baseline.json"
+REPEAT = int(os.getenv("BENCH_REPEAT", "3"))  # passadas pelo corpus
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.25"))  # piora relativa aceita
+MIN_DELTA_MS = float(os.getenv("BENCH_MIN_DELTA_MS", "0.2"))  # abaixo disso é ruído
+MIN_P50_SAMPLES = 5  # etapa com menos amostras (o feed: uma por passada) é só informativa
+MIN_P95_SAMPLES = 50  # com menos amostras o p95 é praticamente o máximo: só informativo
+# ------------------------
+
+STAGES = ("feed", "fetch", "parse", "text", "detect", "build_post", "upsert")
+
+PAGE = (
+    '<html><head><meta property="article:published_time" content="{published}"></head>'
+    '<body><h1>{title}</h1><div class="td-post-content">{html}</div></body></html>'
+)
+
+
+# -------- corpus + servidor local --------
+
+
+def _slug(url, fallback):
+    return urlparse(url).path.rstrip("/").rsplit("/", 1)[-1] or fallback
+
+
+def load_corpus(path=None):
+    """
+    Devolve (artigos, feed_xml): artigos = [(slug, título, publicado, html)].
+    feed_xml é o RSS salvo (bytes) ou None para gerar um.
+    """
+    articles = []
+    feed = None
+    if path:
+        for file in sorted(glob.glob(os.path.join(path, "*.html"))):
+            with open(file, encoding="utf-8", errors="replace") as f:
+                articles.append((os.path.splitext(os.path.basename(file))[0], None, None, f.read()))
+        feed_path = os.path.join(path, "feed.xml")
+        if os.path.exists(feed_path):
+            with open(feed_path, "rb") as f:
+                feed = f.read()
+    else:
+        conn = sqlite3.connect(DB)
+        rows = conn.execute(
+            "SELECT id, url, title, date_published, content_html FROM promocoes WHERE content_html IS NOT NULL ORDER BY id"
+        )
+        for promo_id, url, title, published, html in rows:
+            published = datetime.fromisoformat(published[:10] + "T12:00:00-03:00") if published else None
+            page = PAGE.format(
+                published=published.isoformat() if published else "", title=escape(title or ""), html=html
+            )
+            articles.append((f"{_slug(url or '', str(promo_id))}-{promo_id}", title, published, page))
+        conn.close()
+    return articles, feed
+
+
+def build_feed(articles, base):
+    now = datetime.now().astimezone()
+    items = []
+    for i, (slug, title, published, _) in enumerate(articles):
+        published = published or now - timedelta(hours=i)
+        items.append(
+            f"<item><title>{escape(title or slug)}</title><link>{base}/{slug}/</link>"
+            f"<pubDate>{format_datetime(published)}</pubDate></item>"
+        )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>bench</title>'
+        f'{"".join(items)}</channel></rss>'
+    ).encode("utf-8")
+
+
+def rewrite_feed(feed, base):
+    """RSS salvo com os links trocados para o servidor local (/<slug>/)."""
+    def local(m):
+        slug = _slug(m.group(1).decode("utf-8", "replace").strip(), "x")
+        return f"<link>{base}/{slug}/</link>".encode("utf-8")
+
+    return re.sub(rb"<link>([^<]+)</link>", local, feed)
+
+
+class StandIn:
+    """
+    Servidor HTTP local (thread) com /feed/ e /<slug>/ do corpus. `hits`
+    registra (Host, caminho, time.monotonic()) de cada GET, na ordem de chegada.
+    """
+
+    def __init__(self, articles, feed=None):
+        pages = {f"/{slug}/": html.encode("utf-8") for slug, _, _, html in articles}
+        self.paths = frozenset(pages)
+        hits = self.hits = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                hits.append((self.headers.get("Host"), path, time.monotonic()))
+                if path == "/feed/":
+                    body, ctype = self.server.feed, "application/rss+xml; charset=utf-8"
+                else:
+                    body, ctype = pages.get(path), "text/html; charset=utf-8"
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.server.feed = rewrite_feed(feed, self.base) if feed else build_feed(articles, self.base)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# -------- bancos descartáveis --------
+
+# upsert do SqliteTarget: o coletor não grava em SQLite, então não há
+# caminho de produção para medir; colunas e condição espelham UPSERT_SQL
+SQLITE_UPSERT = """
+    INSERT INTO promocoes
+        (url, title, date_published, author, content_text, content_html, images_json, links_json,
+         scraped_at, valid_until, content_hash, simhash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (url) DO UPDATE SET
+        title = excluded.title,
+        date_published = excluded.date_published,
+        author = excluded.author,
+        content_text = excluded.content_text,
+        content_html = excluded.content_html,
+        images_json = excluded.images_json,
+        links_json = excluded.links_json,
+        scraped_at = excluded.scraped_at,
+        valid_until = excluded.valid_until,
+        content_hash = excluded.content_hash,
+        simhash = excluded.simhash
+    WHERE promocoes.content_hash IS NOT excluded.content_hash
+"""
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+class SqliteTarget:
+    """
+    Arquivo SQLite temporário com o schema do migrate.py e o SQLITE_UPSERT
+    acima. Mede parse e detect de verdade; o upsert é só indicativo (ver
+    PostgresTarget).
+    """
+
+    name = "sqlite"
+    upsert_is_real = False
+
+    def __init__(self):
+        import migrate
+
+        self._dir = tempfile.TemporaryDirectory(prefix="bench_scrape_")
+        self.conn = sqlite3.connect(os.path.join(self._dir.name, "bench.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate.upgrade(migrate.SqliteBackend(self.conn))
+        self.conn.isolation_level = ""  # volta ao modo transacional padrão do sqlite3
+
+    def upsert(self, data):
+        self.conn.execute(
+            SQLITE_UPSERT,
+            (
+                data["url"], data["title"], _iso(data["date_published"]), data["author"], data["content_text"],
+                data["content_html"], json.dumps(data["images"], ensure_ascii=False),
+                json.dumps(data["links"], ensure_ascii=False), datetime.now().astimezone().isoformat(),
+                _iso(data["valid_until"]), data["content_hash"], data["simhash"],
+            ),
+        )
+        self.conn.commit()
+
+    def reset(self):
+        self.conn.execute("DELETE FROM promocoes")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+        self._dir.cleanup()
+
+
+class PostgresTarget:
+    """
+    Schema temporário (bench_<pid>) no Postgres informado, migrado pelo
+    migrate.py, e o writer do coletor (sp.batch_writer: UPSERT_SQL +
+    BatchWriter + url_store/content_store) gravando nele sem tocar nas
+    tabelas reais; o schema é apagado no fim. Cada post é um flush: o tempo
+    é o de um lote de 1 (na coleta o commit se divide pelo lote).
+    """
+
+    name = "postgres"
+    upsert_is_real = True
+
+    def __init__(self, sp):
+        import migrate
+
+        self.schema = f"bench_{os.getpid()}"
+        admin = sp.db_connect()
+        admin.autocommit = True
+        admin.cursor().execute(f"CREATE SCHEMA {self.schema}")
+        admin.close()
+        # libpq aplica PGOPTIONS em toda conexão aberta daqui em diante;
+        # public continua no caminho para as extensões (unaccent)
+        os.environ["PGOPTIONS"] = f"{os.getenv('PGOPTIONS', '')} -c search_path={self.schema},public".strip()
+        self.conn = sp.db_connect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate.upgrade(migrate.PostgresBackend(self.conn))
+        migrate.check_schema(migrate.PostgresBackend(self.conn))
+        self.writer = sp.batch_writer(self.conn)
+
+    def upsert(self, data):
+        self.writer.add(data)
+        _, errors = self.writer.flush()
+        if errors:
+            raise RuntimeError(f"upsert falhou: {errors[0][1]}")
+
+    def reset(self):
+        cur = self.conn.cursor()
+        cur.execute("TRUNCATE promocoes RESTART IDENTITY CASCADE")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.rollback()
+        self.conn.cursor().execute(f"DROP SCHEMA {self.schema} CASCADE")
+        self.conn.commit()
+        self.conn.close()
+
+
+# -------- medição --------
+
+
+def percentile(values, p):
+    """Percentil por posição mais próxima (valores já em ms)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[k]
+
+
+def run(sp, target, server, repeat=REPEAT):
+    """Passa `repeat` vezes pelo feed do servidor local. Devolve ({etapa: [ms]}, posts, segundos)."""
+    import feedparser
+    from bs4 import BeautifulSoup
+
+    from fetcher import Fetcher
+    from html_text import collect_text_from_container
+    from page_parser import CONTENT_SELECTORS, JUNK_TAGS
+    from valid_until import detect_valid_until
+
+    timings = {stage: [] for stage in STAGES}
+    fetcher = Fetcher(headers={"User-Agent": sp.USER_AGENT}, timeout=sp.REQUEST_TIMEOUT, rate_seconds=0)
+    posts = 0
+    busy = 0.0
+
+    def timed(stage, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        elapsed = time.perf_counter() - t0
+        timings[stage].append(elapsed * 1000)
+        return out, elapsed
+
+    def container_of(soup):
+        for sel in CONTENT_SELECTORS:
+            el = soup.select_one(sel)
+            if el:
+                break
+        else:
+            el = soup.body or soup
+        for bad in el.find_all(JUNK_TAGS):
+            bad.decompose()
+        return el
+
+    for _ in range(repeat):
+        target.reset()
+        feed, _ = timed("feed", lambda: feedparser.parse(fetcher.get(f"{server.base}/feed/").content))
+        for entry in feed.entries:
+            if urlparse(entry.link).path not in server.paths:
+                continue  # item do feed salvo sem o HTML no corpus
+            published = sp.entry_published(entry)
+            resp, t_fetch = timed("fetch", fetcher.get, entry.link)
+            html = resp.text
+            # etapas isoladas (mesma página), para ver onde o tempo vai
+            soup, _ = timed("parse", lambda: container_of(BeautifulSoup(html, "html.parser")))
+            text, _ = timed("text", collect_text_from_container, soup)
+            timed("detect", detect_valid_until, text, published)
+            # caminho real do coletor: build_post + upsert
+            data, t_build = timed("build_post", sp.build_post, entry.link, html, getattr(entry, "title", None), published)
+            _, t_upsert = timed("upsert", target.upsert, data)
+            busy += t_fetch + t_build + t_upsert
+            posts += 1
+    return timings, posts, busy
+
+
+def summarize(timings, posts, busy):
+    return {
+        "stages": {
+            stage: {"p50": round(percentile(v, 50), 3), "p95": round(percentile(v, 95), 3), "n": len(v)}
+            for stage, v in timings.items()
+        },
+        "posts": posts,
+        # fetch + build_post + upsert em sequência: o custo de um post no coletor
+        "posts_per_second": round(posts / busy, 1) if busy else 0.0,
+    }
+
+
+def compare(result, baseline, tolerance=TOLERANCE, min_delta_ms=MIN_DELTA_MS):
+    """Lista de regressões (texto) de `result` contra `baseline`; etapas indicativas não entram."""
+    problems = []
+    for stage, cur in result["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if not old or stage in result.get("indicative", ()) or cur["n"] < MIN_P50_SAMPLES:
+            continue
+        keys = ("p50", "p95") if cur["n"] >= MIN_P95_SAMPLES else ("p50",)
+        for key in keys:
+            # p95 oscila mais: o dobro da tolerância
+            limit = tolerance if key == "p50" else tolerance * 2
+            delta = cur[key] - old[key]
+            if delta > min_delta_ms and cur[key] > old[key] * (1 + limit):
+                problems.append(f"{stage} {key}: {old[key]:.2f} -> {cur[key]:.2f} ms (+{delta / old[key]:.0%})")
+    old_rate = baseline.get("posts_per_second")
+    if old_rate and result["posts_per_second"] < old_rate / (1 + tolerance):
+        problems.append(f"posts/s: {old_rate:.1f} -> {result['posts_per_second']:.1f}")
+    return problems
+
+
+def print_report(result, baseline=None):
+    print(f"{'etapa':>10} {'p50 ms':>9} {'p95 ms':>9}   baseline p50/p95")
+    for stage, s in result["stages"].items():
+        ref = (baseline or {}).get("stages", {}).get(stage)
+        ref_txt = f"   {ref['p50']:.2f} / {ref['p95']:.2f}" if ref else ""
+        note = "   (indicativo: não é o UPSERT_SQL do coletor)" if stage in result.get("indicative", ()) else ""
+        print(f"{stage:>10} {s['p50']:9.2f} {s['p95']:9.2f}{ref_txt}{note}")
+    ref_rate = (baseline or {}).get("posts_per_second")
+    print(f"  {result['posts_per_second']:.1f} posts/s" + (f" (baseline {ref_rate:.1f})" if ref_rate else ""))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline do coletor (fetch -> parse -> detect -> upsert).")
+    ap.add_argument("--corpus", help="pasta com *.html (+ feed.xml); padrão: content_html de promocoes.db")
+    ap.add_argument("--db", default="sqlite", help="'sqlite' (arquivo temporário) ou URL postgresql:// de teste")
+    ap.add_argument("--repeat", type=int, default=REPEAT, help="passadas pelo corpus")
+    ap.add_argument("--baseline", default=BASELINE, help="arquivo JSON do baseline")
+    ap.add_argument("--save-baseline", action="store_true", help="grava o resultado como novo baseline")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE, help="piora relativa aceita (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    articles, feed = load_corpus(args.corpus)
+    if not articles:
+        print("Nenhuma página encontrada.")
+        return
+
+    with StandIn(articles, feed) as server:
+        # o coletor lê SITE/DATABASE_URL na importação: servidor local primeiro
+        os.environ["SCRAPER_SITE"] = server.base
+        os.environ["SCRAPER_RATE_SECONDS"] = "0"
+        if args.db != "sqlite":
+            os.environ["DATABASE_URL"] = args.db
+        import scrape_passageiro as sp
+
+        target = SqliteTarget() if args.db == "sqlite" else PostgresTarget(sp)
+        try:
+            print(
+                f"🏁 {len(articles)} páginas x {args.repeat} passadas, parser {sp.get_page_parser().name}, "
+                f"upsert em {target.name}"
+            )
+            result = summarize(*run(sp, target, server, args.repeat))
+        finally:
+            target.close()
+
+    result.update(db=target.name, parser=sp.get_page_parser().name, pages=len(articles), repeat=args.repeat)
+    if not target.upsert_is_real:
+        result["indicative"] = ["upsert"]
+    baseline = None
+    comparable = True
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        # com outro número de passadas a 1ª (conexões e caches frios) pesa diferente no p50/p95
+        measured = (baseline.get("db"), baseline.get("parser"), baseline.get("pages"), baseline.get("repeat"))
+        comparable = measured == (result["db"], result["parser"], result["pages"], result["repeat"])
+        if not comparable:
+            print(
+                f"⚠️  baseline medido com {measured[0]}/{measured[1]} em {measured[2]} páginas x {measured[3]} passadas: "
+                "comparação só indicativa"
+            )
+    print_report(result, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"💾 Baseline salvo em {args.baseline}.")
+        return
+    if baseline:
+        problems = compare(result, baseline, args.tolerance)
+        if problems:
+            print("❌ Regressão em relação ao baseline:" if comparable else "⚠️  Diferenças em relação ao baseline:")
+            for p in problems:
+                print(f"   {p}")
+            if comparable:
+                sys.exit(1)
+        else:
+            print("✅ Dentro do baseline.")
+
+if __name__ == "__main__":
+    main()
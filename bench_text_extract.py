@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# bench_text_extract.py
+# Compara a extração de texto antiga (get_text por ancestral) com a de uma passada.
+#
+# Uso: python bench_text_extract.py [pasta_com_html ...]
+# Sem argumentos usa o content_html salvo em promocoes.db.
+
+import glob
+import os
+import sqlite3
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from html_text import collect_text_from_container
+
+DB = "promocoes.db"
+REPEAT = 5
+
+LEGACY_ALLOWED = {
+    "p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "td", "th",
+    "caption", "figcaption", "div", "section", "article", "strong", "em",
+}
+
+
+def legacy_collect_text(container):
+    """Implementação anterior de _collect_text_from_container (quadrática em aninhamento)."""
+    fragments = []
+    for descendant in container.descendants:
+        if getattr(descendant, "name", None):
+            if descendant.name.lower() in LEGACY_ALLOWED:
+                text = descendant.get_text(" ", strip=True)
+                if text:
+                    fragments.append(text)
+    cleaned = []
+    prev = None
+    for f in fragments:
+        if f != prev:
+            cleaned.append(f)
+        prev = f
+    return "\n\n".join(cleaned)
+
+
+def load_pages(args):
+    pages = []
+    if args:
+        for d in args:
+            for path in sorted(glob.glob(os.path.join(d, "*.html"))):
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    pages.append((os.path.basename(path), f.read()))
+    else:
+        conn = sqlite3.connect(DB)
+        for url, html in conn.execute("SELECT url, content_html FROM promocoes WHERE content_html IS NOT NULL"):
+            pages.append((url, html))
+        conn.close()
+    return pages
+
+
+def bench(fn, soups):
+    best = None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = [fn(s) for s in soups]
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    pages = load_pages(sys.argv[1:])
+    if not pages:
+        print("Nenhuma página encontrada.")
+        return
+    soups = [BeautifulSoup(html, "html.parser") for _, html in pages]
+    t_old, out_old = bench(legacy_collect_text, soups)
+    t_new, out_new = bench(collect_text_from_container, soups)
+
+    chars_old = sum(len(t) for t in out_old)
+    chars_new = sum(len(t) for t in out_new)
+    print(f"{len(pages)} páginas, melhor de {REPEAT} execuções")
+    print(f"  antigo: {t_old * 1000:8.1f} ms  ({chars_old} caracteres)")
+    print(f"  novo:   {t_new * 1000:8.1f} ms  ({chars_new} caracteres)")
+    print(f"  speedup: {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# check_importtime.py
+# Orçamento de partida a frio: importa cada módulo num processo novo com
+# `python -X importtime` e falha (exit 1) se o tempo acumulado do import
+# passar do orçamento ou se algum módulo pesado que deveria ser carregado só
+# no primeiro uso (dateparser, bs4, requests, psycopg2, ...) entrou na
+# importação. Roda no CI ou antes de subir imagem nova do cron/API.
+#
+# Uso:
+#   python check_importtime.py                  # todos os módulos do CONFIG
+#   python check_importtime.py --scale 2        # máquina lenta: orçamentos x2
+#   python check_importtime.py scrape_passageiro
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# -------- CONFIG --------
+_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNS = 3  # usa o melhor de N processos (o primeiro paga o cache frio do disco)
+SCRAPER_HEAVY = ("dateparser", "bs4", "lxml", "feedparser", "requests", "psycopg2", "dateutil", "prometheus_client")
+# módulo -> (diretório de trabalho, orçamento em ms, módulos que não podem ser importados)
+CHECKS = {
+    "scrape_passageiro": (_DIR, 120, SCRAPER_HEAVY),
+    "scrape_and_clean": (_DIR, 120, SCRAPER_HEAVY),
+    # FastAPI + SQLAlchemy dominam; o driver síncrono não tem o que fazer no worker
+    "app.main": (os.path.join(_DIR, "backend"), 1500, ("psycopg2", "psycopg")),
+}
+# create_async_engine não conecta: qualquer URL postgresql serve para importar a API
+ENV = {"DATABASE_URL": os.getenv("DATABASE_URL") or "postgresql://importtime@localhost/importtime"}
+# ------------------------
+
+LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def measure(module, cwd):
+    """(ms acumulados do import de `module`, módulos importados) num processo novo."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env={**os.environ, **ENV},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} falhou:\n{proc.stderr.strip().splitlines()[-1]}")
+    total = None
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        loaded.add(m.group(3))
+        if m.group(3) == module and not m.group(2):
+            total = int(m.group(1)) / 1000
+    return total, loaded
+
+
+def check(module, cwd, budget_ms, forbidden, runs):
+    best = None
+    loaded = set()
+    for _ in range(runs):
+        ms, loaded = measure(module, cwd)
+        best = ms if best is None else min(best, ms)
+    problems = []
+    if best > budget_ms:
+        problems.append(f"{best:.0f} ms > orçamento de {budget_ms:.0f} ms")
+    # `bs4` pega também bs4.element etc.
+    heavy = sorted({m.split(".")[0] for m in loaded} & set(forbidden))
+    if heavy:
+        problems.append("importa na carga: " + ", ".join(heavy))
+    return best, problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Orçamento de tempo de import (python -X importtime).")
+    ap.add_argument("modules", nargs="*", help=f"módulos a medir (padrão: {', '.join(CHECKS)})")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiplica os orçamentos (máquinas lentas)")
+    ap.add_argument("--runs", type=int, default=RUNS, help="processos por módulo (vale o melhor)")
+    args = ap.parse_args()
+
+    failed = False
+    for module in args.modules or CHECKS:
+        if module not in CHECKS:
+            print(f"⚠️  {module} não está no CONFIG")
+            failed = True
+            continue
+        cwd, budget_ms, forbidden = CHECKS[module]
+        try:
+            ms, problems = check(module, cwd, budget_ms * args.scale, forbidden, max(1, args.runs))
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            failed = True
+            continue
+        if problems:
+            failed = True
+            print(f"❌ {module}: " + "; ".join(problems))
+        else:
+            print(f"✅ {module}: {ms:.0f} ms (orçamento {budget_ms * args.scale:.0f} ms)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
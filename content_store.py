@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# content_store.py
+# HTML dos posts fora da linha de promocoes (migrate.py 0008): o
+# content_html é o grosso da tabela e só a página de detalhe usa. Cada post
+# tem uma linha em promocoes_content com o HTML comprimido com zstd; o
+# backup (promocoes_backup) guarda os mesmos bytes, sem recomprimir.
+#
+# zstd vem do pacote zstandard (pip install zstandard); sem ele o scraper
+# grava com zlib. Quem lê reconhece o formato pelos primeiros bytes: a
+# leitura fica em backend/app/content.py, usada pela API e pelo export.py.
+
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # sem zstandard: zlib (comprime menos, mas funciona)
+    zstandard = None
+
+# -------- CONFIG --------
+ZSTD_LEVEL = int(os.getenv("CONTENT_ZSTD_LEVEL", "9"))
+# ------------------------
+
+# HTML comprimido do post; `{t}` é o alias da linha de promocoes
+CONTENT_HTML_SQL = "(SELECT c.html FROM promocoes_content c WHERE c.post_id = {t}.id)"
+
+UPSERT_CONTENT = """
+    INSERT INTO promocoes_content (post_id, html) VALUES %s
+    ON CONFLICT (post_id) DO UPDATE SET html = EXCLUDED.html
+"""
+
+_compressor = None
+
+
+def compress_html(html):
+    """HTML -> bytes (zstd; zlib sem o zstandard). None continua None."""
+    global _compressor
+    if html is None:
+        return None
+    data = html.encode("utf-8")
+    if zstandard is None:
+        return zlib.compress(data, 9)
+    if _compressor is None:
+        _compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _compressor.compress(data)
+
+
+def write_content(cur, posts):
+    """
+    Grava o HTML comprimido de `posts` (lista de (post_id, data) já gravados),
+    na transação do upsert. Post regravado sem HTML perde a linha antiga (a
+    API mostraria o HTML de antes).
+    """
+    rows = [(post_id, compress_html(data["content_html"])) for post_id, data in posts if data.get("content_html") is not None]
+    gone = [post_id for post_id, data in posts if data.get("content_html") is None]
+    if gone:
+        cur.execute("DELETE FROM promocoes_content WHERE post_id = ANY(%s)", (gone,))
+    if not rows:
+        return
+    from psycopg2 import Binary
+    from psycopg2.extras import execute_values
+
+    execute_values(cur, UPSERT_CONTENT, [(post_id, Binary(blob)) for post_id, blob in rows], page_size=len(rows))
@@ -4,12 +4,13 @@
 
 import os
 import psycopg2
-from datetime import datetime
-from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 
+from archiver import archive_expired, purge_old_backups
+from migrate import PostgresBackend, check_schema
+from promo_version import bump_version
+
 # -------- CONFIG --------
-TZ = ZoneInfo("America/Sao_Paulo")
 BACKUP_RETENTION_DAYS = 30  # tempo para manter backup
 # ------------------------
 
@@ -23,60 +24,17 @@ def db_connect():
     return psycopg2.connect(DB_URL)
 
 def init_backup_table(conn):
-    """Cria tabela de backup se não existir"""
-    cur = conn.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS promocoes_backup (
-        id SERIAL PRIMARY KEY,
-        url TEXT,
-        title TEXT,
-        date_published DATE,
-        author TEXT,
-        content_text TEXT,
-        content_html TEXT,
-        images_json JSONB,
-        links_json JSONB,
-        scraped_at TIMESTAMPTZ,
-        valid_until TIMESTAMPTZ,
-        deleted_at TIMESTAMPTZ DEFAULT NOW()
-    )
-    """)
-    conn.commit()
+    """Tabela de backup (particionada por mês) e promocoes_version vêm do migrate.py: só confere se está em dia"""
+    check_schema(PostgresBackend(conn))
 
 def move_expired(conn):
-    """Move registros expirados para o backup"""
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO promocoes_backup
-            (url, title, date_published, author, content_text, content_html,
-             images_json, links_json, scraped_at, valid_until, deleted_at)
-        SELECT url, title, date_published, author, content_text, content_html,
-               images_json, links_json, scraped_at, valid_until, NOW()
-        FROM promocoes
-        WHERE valid_until IS NOT NULL
-          AND valid_until < NOW()
-    """)
-    moved = cur.rowcount
-
-    cur.execute("""
-        DELETE FROM promocoes
-        WHERE valid_until IS NOT NULL
-          AND valid_until < NOW()
-    """)
-    deleted = cur.rowcount
-    conn.commit()
-    return moved, deleted
+    """Move registros expirados para o backup (em lotes, ver archiver.py)"""
+    stats = archive_expired(conn)
+    return stats.rows, stats.rows
 
 def cleanup_old_backups(conn):
     """Remove backups antigos"""
-    cur = conn.cursor()
-    cur.execute("""
-        DELETE FROM promocoes_backup
-        WHERE deleted_at < NOW() - INTERVAL %s
-    """, (f"{BACKUP_RETENTION_DAYS} days",))
-    removed = cur.rowcount
-    conn.commit()
-    return removed
+    return purge_old_backups(conn, BACKUP_RETENTION_DAYS)
 
 def main():
     print("🧹 Iniciando limpeza de posts expirados...")
@@ -84,6 +42,8 @@ def main():
     init_backup_table(conn)
 
     moved, deleted = move_expired(conn)
+    if deleted:
+        bump_version(conn)
     print(f"➡️  Movidos {moved} posts para backup e excluídos {deleted} da tabela principal.")
 
     removed = cleanup_old_backups(conn)
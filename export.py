@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# export.py
+# Exporta promocoes como NDJSON (um objeto JSON por linha), lendo de um
+# cursor nomeado: memória constante e o consumidor já pode ler enquanto o
+# arquivo é escrito. Substitui o today_posts.json (um documento único).
+# Mesmo formato do GET /api/v1/promotions/export.
+#
+# Uso:
+#   python export.py promocoes.ndjson                     # tudo
+#   python export.py hoje.ndjson --today                  # posts de hoje
+#   python export.py - --from 2025-01-01 --to 2025-06-30  # stdout
+#   python export.py novos.ndjson.gz --since 2025-09-04T12:00:00-03:00
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from backend.app.content import decompress_html
+from backend.app.serialization import dumps
+from content_store import CONTENT_HTML_SQL
+from url_store import IMAGES_JSON_SQL, LINKS_JSON_SQL
+
+# -------- CONFIG --------
+TZ = ZoneInfo("America/Sao_Paulo")
+ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "1000"))  # linhas por ida ao servidor
+# mesmos campos padrão do endpoint (EXPORT_FIELDS do router: Promotion.FIELDS
+# sem content_html); tests/test_export.py confere que as listas não divergem
+FIELDS = (
+    "id", "url", "title", "date_published", "author", "content_text",
+    "images_json", "links_json", "scraped_at", "valid_until", "expired", "canonical_id",
+)
+# ------------------------
+
+COLUMNS = {
+    "canonical_id": "COALESCE(canonical_id, id)",
+    # imagens/links normalizados (url_store.py) de volta ao JSON da API
+    "images_json": IMAGES_JSON_SQL.format(t="promocoes"),
+    "links_json": LINKS_JSON_SQL.format(t="promocoes"),
+    # HTML comprimido em promocoes_content (content_store.py); descomprimido aqui
+    "content_html": CONTENT_HTML_SQL.format(t="promocoes"),
+}
+
+
+def export_rows(conn, out, fields=FIELDS, date_from=None, date_to=None, since=None, itersize=ITERSIZE):
+    """Escreve uma linha JSON por promo em `out` (binário). Devolve quantas linhas saíram."""
+    cols = ", ".join(COLUMNS.get(f, f) for f in fields)
+    cur = conn.cursor(name="export_promocoes")
+    cur.itersize = itersize
+    cur.execute(
+        f"""
+        SELECT {cols} FROM promocoes
+        WHERE (%(date_from)s::date IS NULL OR date_published >= %(date_from)s::date)
+          AND (%(date_to)s::date IS NULL OR date_published <= %(date_to)s::date)
+          AND (%(since)s::timestamptz IS NULL OR updated_at > %(since)s::timestamptz)
+        ORDER BY id
+    """,
+        {"date_from": date_from, "date_to": date_to, "since": since},
+    )
+    count = 0
+    try:
+        for row in cur:
+            data = dict(zip(fields, row))
+            if "content_html" in data:
+                data["content_html"] = decompress_html(data["content_html"])
+            # mesmo serializador do endpoint (orjson quando instalado)
+            out.write(dumps(data) + b"\n")
+            count += 1
+    finally:
+        cur.close()
+        conn.rollback()
+    return count
+
+
+def main():
+    import psycopg2
+    from dotenv import load_dotenv
+
+    ap = argparse.ArgumentParser(description="Exporta promocoes como NDJSON.")
+    ap.add_argument("output", help="arquivo de saída (.gz = comprimido; '-' = stdout)")
+    ap.add_argument("--from", dest="date_from", type=date.fromisoformat, help="date_published >= (AAAA-MM-DD)")
+    ap.add_argument("--to", dest="date_to", type=date.fromisoformat, help="date_published <= (AAAA-MM-DD)")
+    ap.add_argument("--today", action="store_true", help="só posts publicados hoje (antigo today_posts.json)")
+    ap.add_argument("--since", type=datetime.fromisoformat, help="só gravados/alterados depois (updated_at, ISO)")
+    ap.add_argument("--fields", help=f"campos separados por vírgula (padrão: {','.join(FIELDS)})")
+    ap.add_argument("--gzip", action="store_true", help="comprime mesmo sem .gz no nome")
+    args = ap.parse_args()
+
+    fields = tuple(f.strip() for f in args.fields.split(",") if f.strip()) if args.fields else FIELDS
+    unknown = [f for f in fields if f not in FIELDS + ("content_html",)]
+    if unknown:
+        raise SystemExit(f"campos desconhecidos: {', '.join(unknown)}")
+    date_from, date_to = args.date_from, args.date_to
+    if args.today:
+        date_from = date_to = datetime.now(TZ).date()
+    since = args.since
+    if since and since.tzinfo is None:
+        since = since.replace(tzinfo=TZ)
+
+    load_dotenv()
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise SystemExit("DATABASE_URL não encontrada no .env")
+    conn = psycopg2.connect(db_url)
+
+    log = sys.stderr if args.output == "-" else sys.stdout
+    compress = args.gzip or args.output.endswith(".gz")
+    raw = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    out = gzip.GzipFile(fileobj=raw, mode="wb") if compress else raw
+    t0 = time.perf_counter()
+    try:
+        count = export_rows(conn, out, fields, date_from, date_to, since)
+    finally:
+        if out is not raw:
+            out.close()
+        if raw is not sys.stdout.buffer:
+            raw.close()
+        conn.close()
+    print(f"📦 {count} promos exportadas para {args.output} em {time.perf_counter() - t0:.1f}s.", file=log)
+
+
+if __name__ == "__main__":
+    main()
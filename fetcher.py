@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# fetcher.py
+# Etapa de download concorrente com limite de taxa por host (token bucket).
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+import scrape_metrics
+
+
+class TokenBucket:
+    """
+    Token bucket simples: recarrega `rate` tokens por segundo, acumulando no
+    máximo `capacity`. `acquire` bloqueia até haver um token disponível.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # reserva o token já; quem chega depois espera a fila andar
+            self._tokens -= 1
+            wait_s = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait_s > 0:
+            time.sleep(wait_s)
+
+
+def _rate(rate_seconds: float) -> float:
+    return 1.0 / rate_seconds if rate_seconds > 0 else float("inf")
+
+
+class HostRateLimiter:
+    """
+    Um TokenBucket por host (netloc), criado sob demanda. `set_rate` dá a
+    um host um intervalo diferente do padrão (fonte com limite próprio).
+    """
+
+    def __init__(self, rate_seconds: float, burst: int = 1):
+        self.rate = _rate(rate_seconds)
+        self.burst = burst
+        self._rates = {}  # host -> taxa própria
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def set_rate(self, url: str, rate_seconds: float):
+        host = urlparse(url).netloc
+        with self._lock:
+            self._rates[host] = _rate(rate_seconds)
+            self._buckets.pop(host, None)
+
+    def acquire(self, url: str):
+        host = urlparse(url).netloc
+        rate = self._rates.get(host, self.rate)
+        if rate == float("inf"):
+            return
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(rate, self.burst)
+        bucket.acquire()
+
+
+class Fetcher:
+    """
+    Baixa URLs em paralelo (thread pool) respeitando um intervalo mínimo
+    por host. `fetch_all` entrega os resultados conforme ficam prontos, então
+    o chamador pode parsear/gravar enquanto outros downloads estão em andamento.
+    Com `cache` (http_cache.HttpCache), os GETs são condicionais e podem
+    voltar 304.
+
+    O pool de threads é criado uma vez e reaproveitado por todas as chamadas
+    de `fetch_all` (inclusive simultâneas, de fontes diferentes): as sessões
+    HTTP de cada thread, com as conexões keep-alive, duram até `close()`.
+    """
+
+    def __init__(self, headers=None, timeout=20, rate_seconds=1.5, concurrency=4, burst=1, cache=None):
+        self.headers = headers or {}
+        self.cache = cache
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.limiter = HostRateLimiter(rate_seconds, burst)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._sessions = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            sessions, self._sessions = self._sessions, []
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        for s in sessions:
+            s.close()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="fetch")
+            return self._pool
+
+    def _session(self):
+        # requests.Session não é garantidamente thread-safe: uma por thread
+        s = getattr(self._local, "session", None)
+        if s is None:
+            import requests
+
+            s = self._local.session = requests.Session()
+            s.headers.update(self.headers)
+            with self._lock:
+                self._sessions.append(s)
+        return s
+
+    def get(self, url, **kwargs):
+        if self.cache is not None:
+            kwargs["headers"] = {**self.cache.conditional_headers(url), **kwargs.get("headers", {})}
+        self.limiter.acquire(url)
+        # espera do limitador fica fora: "fetch" é só a rede
+        with scrape_metrics.stage("fetch"):
+            resp = self._session().get(url, timeout=self.timeout, **kwargs)
+        scrape_metrics.fetched(resp)
+        resp.raise_for_status()
+        return resp
+
+    def fetch_all(self, items, url_of=None, headers_of=None):
+        """
+        Gera (item, resp, erro) na ordem em que os downloads terminam.
+        Mantém no máximo 2 * concurrency downloads pendentes, então `items`
+        pode ser um iterador grande. `headers_of(item)` acrescenta headers
+        por item (ex.: Referer da fonte).
+        """
+        url_of = url_of or (lambda it: it)
+        max_pending = self.concurrency * 2
+        it = iter(items)
+        pool = self._executor()
+        pending = {}
+
+        def submit_next():
+            try:
+                item = next(it)
+            except StopIteration:
+                return False
+            kwargs = {"headers": headers_of(item)} if headers_of else {}
+            pending[pool.submit(self.get, url_of(item), **kwargs)] = item
+            return True
+
+        try:
+            while len(pending) < max_pending and submit_next():
+                pass
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    item = pending.pop(fut)
+                    err = fut.exception()
+                    yield item, (None if err else fut.result()), err
+                    submit_next()
+        finally:
+            # gerador abandonado no meio: o pool é compartilhado, não espera o resto
+            for fut in pending:
+                fut.cancel()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# fingerprint.py
+# Impressões digitais de posts: hash do conteúdo (upsert sem mudança vira
+# no-op) e SimHash do texto (promos republicadas com outro slug, ex. "-2",
+# ficam agrupadas sob um canonical_id).
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+# -------- CONFIG --------
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3  # palavras por shingle
+NEAR_DUP_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "6"))  # bits diferentes para ser "quase igual"
+DEDUP_WINDOW_DAYS = int(os.getenv("DEDUP_WINDOW_DAYS", "14"))  # só compara com posts recentes
+# ------------------------
+
+_MASK = (1 << SIMHASH_BITS) - 1
+_BANDS = 8  # 8 faixas de 8 bits: distância <= 7 garante uma faixa idêntica
+_BAND_BITS = SIMHASH_BITS // _BANDS
+_RE_WORD = re.compile(r"\w+")
+
+# campos gravados que definem o conteúdo (valid_until é derivado deles)
+HASHED_FIELDS = ("title", "author", "date_published", "content_text", "content_html", "images", "links")
+
+
+def content_hash(data: dict) -> str:
+    """sha256 dos campos de conteúdo do post (o que o upsert reescreveria)."""
+    payload = [data.get(f) for f in HASHED_FIELDS]
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _words(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _RE_WORD.findall(text)
+
+
+def simhash(text):
+    """SimHash de 64 bits dos shingles de palavras, como inteiro com sinal (cabe em BIGINT)."""
+    words = _words(text or "")
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+        for s in shingles
+    ]
+    half = len(hashes) / 2
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if sum((h >> bit) & 1 for h in hashes) > half:
+            value |= 1 << bit
+    return value - (1 << SIMHASH_BITS) if value >> (SIMHASH_BITS - 1) else value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count("1")
+
+
+def _bands(value):
+    value &= _MASK
+    return [(i, (value >> (i * _BAND_BITS)) & ((1 << _BAND_BITS) - 1)) for i in range(_BANDS)]
+
+
+class DuplicateIndex:
+    """
+    Agrupa posts quase iguais. `add` em ordem de id: cada post aponta para o
+    cluster do primeiro post anterior a até `max_distance` bits de distância.
+    """
+
+    def __init__(self, max_distance=NEAR_DUP_DISTANCE):
+        self.max_distance = max_distance
+        self._by_band = {}
+        self._entries = []  # (id, simhash, canonical)
+
+    def candidates(self, value):
+        if self.max_distance >= _BANDS:
+            return self._entries
+        seen = {}
+        for band in _bands(value):
+            for entry in self._by_band.get(band, ()):
+                seen[entry[0]] = entry
+        return sorted(seen.values())
+
+    def add(self, post_id, value):
+        """Registra o post e devolve o id canônico do seu cluster (None se ele é o canônico)."""
+        canonical = None
+        for other_id, other_value, other_canonical in self.candidates(value):
+            if hamming(value, other_value) <= self.max_distance:
+                canonical = other_canonical or other_id
+                break
+        entry = (post_id, value, canonical)
+        self._entries.append(entry)
+        for band in _bands(value):
+            self._by_band.setdefault(band, []).append(entry)
+        return canonical
+
+
+def known_hashes(conn, urls):
+    """{url: content_hash} dos posts já gravados."""
+    if not urls:
+        return {}
+    cur = conn.cursor()
+    cur.execute("SELECT url, content_hash FROM promocoes WHERE url = ANY(%s)", (list(urls),))
+    rows = dict(cur.fetchall())
+    conn.commit()
+    cur.close()
+    return rows
+
+
+def cluster_duplicates(conn, window_days=DEDUP_WINDOW_DAYS, max_distance=NEAR_DUP_DISTANCE):
+    """
+    Recalcula canonical_id dos posts da janela e grava só o que mudou. Um
+    canonical_id já gravado só é trocado, nunca apagado: o canônico pode ser
+    mais antigo que a janela. Devolve quantos posts mudaram de cluster.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT id, simhash, canonical_id FROM promocoes
+        WHERE simhash IS NOT NULL
+          AND (date_published IS NULL OR date_published >= CURRENT_DATE - %s)
+        ORDER BY id
+    """,
+        (window_days,),
+    )
+    index = DuplicateIndex(max_distance)
+    changes = []
+    for post_id, value, current in cur.fetchall():
+        canonical = index.add(post_id, value)
+        if canonical is not None and canonical != current:
+            changes.append((canonical, post_id))
+    if changes:
+        cur.executemany("UPDATE promocoes SET canonical_id = %s WHERE id = %s", changes)
+    conn.commit()
+    cur.close()
+    return len(changes)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# html_text.py
+# Extração de texto em uma passada, respeitando blocos (parágrafos).
+
+from bs4 import CData, NavigableString, Tag
+
+# tags que abrem/fecham um parágrafo; o resto (strong, em, a, span...) é inline
+BLOCK_TAGS = frozenset(
+    [
+        "p",
+        "li",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "blockquote",
+        "pre",
+        "td",
+        "th",
+        "caption",
+        "figcaption",
+        "div",
+        "section",
+        "article",
+        "ul",
+        "ol",
+        "dl",
+        "dt",
+        "dd",
+        "table",
+        "tr",
+        "figure",
+        "header",
+        "footer",
+        "aside",
+        "nav",
+        "main",
+        "form",
+        "hr",
+    ]
+)
+
+# só texto "de verdade": comentários, doctype etc. ficam de fora (como no get_text)
+_TEXT_TYPES = (NavigableString, CData)
+
+
+def collect_text_from_container(container) -> str:
+    """
+    Percorre a árvore uma única vez e emite cada nó de texto exatamente uma
+    vez. Texto entre fronteiras de bloco vira um parágrafo (pedaços unidos
+    por espaço, como get_text(" ", strip=True)); parágrafos são separados
+    por linha em branco e repetições consecutivas são descartadas.
+    """
+    paragraphs = []
+    buf = []
+
+    def flush():
+        if buf:
+            text = " ".join(buf)
+            if not paragraphs or paragraphs[-1] != text:
+                paragraphs.append(text)
+            buf.clear()
+
+    # pilha de (nó, saindo?): o marcador de saída fecha o bloco no fim do elemento
+    stack = [(container, False)]
+    while stack:
+        node, leaving = stack.pop()
+        if leaving:
+            flush()
+            continue
+        if isinstance(node, Tag):
+            is_block = node is not container and (node.name or "").lower() in BLOCK_TAGS
+            if is_block:
+                flush()
+                stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.contents))
+        elif type(node) in _TEXT_TYPES:
+            s = node.strip()
+            if s:
+                buf.append(s)
+    flush()
+    return "\n\n".join(paragraphs)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# http_cache.py
+# Cache HTTP persistente (SQLite) para GETs condicionais de feed e artigos.
+
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import scrape_metrics
+
+DEFAULT_PATH = os.getenv("HTTP_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache.sqlite"))
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body or b"").hexdigest()
+
+
+class HttpCache:
+    """
+    Guarda ETag / Last-Modified / hash do corpo por URL.
+
+    Fluxo:
+      headers = cache.conditional_headers(url)   # antes do GET
+      if cache.is_unchanged(url, resp): pular    # 304 ou mesmo hash
+      ... parse + upsert ...
+      cache.store(url, resp)                      # só depois de gravar com sucesso
+
+    Quando quem baixa não é quem grava, `stage(url, resp)` guarda os
+    validadores em memória e `commit(url)` os persiste depois do upsert;
+    se o parse ou a gravação falham, `discard(url)` solta a resposta.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._staged = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            fetched_at TEXT
+        )
+        """
+        )
+        self._conn.commit()
+
+    def _row(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, content_hash FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+
+    def conditional_headers(self, url: str) -> dict:
+        row = self._row(url)
+        if not row:
+            return {}
+        etag, last_modified, _ = row
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def is_unchanged(self, url: str, resp) -> bool:
+        if resp.status_code == 304:
+            unchanged = True
+        else:
+            row = self._row(url)
+            unchanged = bool(row and row[2] and row[2] == content_hash(resp.content))
+        scrape_metrics.cache_result("http", unchanged)
+        return unchanged
+
+    def store(self, url: str, resp):
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            if resp.status_code == 304:
+                self._conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (now, url))
+            else:
+                self._conn.execute(
+                    """
+                INSERT INTO http_cache (url, etag, last_modified, content_hash, fetched_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    content_hash = excluded.content_hash,
+                    fetched_at = excluded.fetched_at
+                """,
+                    (
+                        url,
+                        resp.headers.get("ETag"),
+                        resp.headers.get("Last-Modified"),
+                        content_hash(resp.content),
+                        now,
+                    ),
+                )
+            self._conn.commit()
+
+    def stage(self, url: str, resp):
+        with self._lock:
+            self._staged[url] = resp
+
+    def commit(self, url: str):
+        with self._lock:
+            resp = self._staged.pop(url, None)
+        if resp is not None:
+            self.store(url, resp)
+
+    def discard(self, url: str):
+        """Descarta a resposta em stage sem gravar (o próximo GET baixa de novo)."""
+        with self._lock:
+            self._staged.pop(url, None)
+
+    def forget(self, url: str):
+        """Remove a entrada (força download completo na próxima execução)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_cache():
+    """Abre o cache padrão, ou None se HTTP_CACHE_PATH estiver vazio (desativado)."""
+    if not DEFAULT_PATH:
+        return None
+    return HttpCache(DEFAULT_PATH)
@@ -0,0 +1,1118 @@
+#!/usr/bin/env python3
+# migrate.py
+# Migrações versionadas do schema de promocoes (Postgres e o SQLite promocoes.db).
+#
+# Uso:
+#   python migrate.py                  # aplica as pendentes no DATABASE_URL
+#   python migrate.py promocoes.db     # idem no SQLite
+#   python migrate.py --status [alvo]  # lista aplicadas/pendentes
+#   python migrate.py --to 1 [alvo]    # aplica só até a versão 1
+#
+# Cada migração guarda em schema_migrations o EXPLAIN das consultas quentes
+# (EXPLAIN_QUERIES) antes e depois de rodar; os planos que mudaram são impressos.
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+# -------- CONSULTAS MONITORADAS --------
+# {now} vira o placeholder do driver; o valor é o instante atual.
+# Consultas que dependem do banco são um dict {dialeto: sql}.
+EXPLAIN_QUERIES = {
+    # /api/v1/promotions/today (primeira página)
+    "today": """
+        SELECT id FROM promocoes
+        WHERE valid_until IS NULL OR valid_until >= {now}
+        ORDER BY date_published DESC NULLS LAST, id DESC
+        LIMIT 51
+    """,
+    # move_and_delete_expired / delete_expired_with_backup.move_expired
+    "expired": """
+        SELECT id FROM promocoes
+        WHERE valid_until IS NOT NULL AND valid_until < {now}
+    """,
+    # limpeza de backups antigos (BACKUP_RETENTION_DAYS; só existe no Postgres)
+    "backup_retention": """
+        SELECT id FROM promocoes_backup
+        WHERE deleted_at < {now} - INTERVAL '30 days'
+    """,
+    # /api/v1/promotions/by-link (promos que linkam para um parceiro)
+    "links_by_host": {
+        "postgres": """
+            SELECT post_id FROM post_links
+            WHERE url_ids && ARRAY(SELECT id FROM urls WHERE host = 'livelo.com.br')
+        """,
+        "sqlite": """
+            SELECT DISTINCT pl.post_id FROM post_links pl
+            JOIN urls u ON u.id = pl.url_id
+            WHERE u.host = 'livelo.com.br'
+        """,
+    },
+    # /api/v1/promotions/search
+    "search": {
+        "postgres": "SELECT id FROM promocoes WHERE search_tsv @@ websearch_to_tsquery('pt_unaccent', 'smiles')",
+        "sqlite": "SELECT rowid FROM promocoes_fts WHERE promocoes_fts MATCH 'smiles'",
+    },
+}
+# ----------------------------------------
+
+
+class Migration:
+    """
+    Uma versão do schema. `postgres`/`sqlite` são listas de passos: SQL ou
+    função que recebe o backend. Com transactional=False os passos rodam em
+    autocommit (necessário para CREATE INDEX CONCURRENTLY).
+    """
+
+    def __init__(self, version, name, postgres=(), sqlite=(), transactional=True):
+        self.version = version
+        self.name = name
+        self.steps = {"postgres": list(postgres), "sqlite": list(sqlite)}
+        self.transactional = transactional
+
+
+# -------- BACKENDS --------
+class PostgresBackend:
+    dialect = "postgres"
+    param = "%s"
+    LOCK_ID = 72_011  # pg_advisory_lock: um runner por vez
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        cur = self.conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall() if cur.description else []
+        cur.close()
+        return rows
+
+    def columns(self, table):
+        rows = self.execute(
+            # só o schema corrente: outro schema com a mesma tabela (ex.: o
+            # schema temporário do bench_scrape.py) não conta
+            "SELECT column_name FROM information_schema.columns"
+            " WHERE table_schema = current_schema() AND table_name = %s",
+            (table,),
+        )
+        return {r[0] for r in rows}
+
+    def explain(self, sql, params):
+        return "\n".join(r[0] for r in self.execute("EXPLAIN (COSTS OFF) " + sql, params))
+
+    def now(self, dt):
+        return dt
+
+    def begin(self, transactional=True):
+        self.conn.commit()  # fecha a transação implícita de leituras anteriores
+        self.conn.autocommit = not transactional
+
+    def commit(self):
+        if not self.conn.autocommit:
+            self.conn.commit()
+        self.conn.autocommit = False
+
+    def rollback(self):
+        if not self.conn.autocommit:
+            self.conn.rollback()
+        self.conn.autocommit = False
+
+    def lock(self):
+        self.execute("SELECT pg_advisory_lock(%s)", (self.LOCK_ID,))
+        self.conn.commit()
+
+    def unlock(self):
+        self.execute("SELECT pg_advisory_unlock(%s)", (self.LOCK_ID,))
+        self.conn.commit()
+
+
+class SqliteBackend:
+    dialect = "sqlite"
+    param = "?"
+
+    def __init__(self, conn):
+        conn.isolation_level = None  # BEGIN/COMMIT explícitos (DDL transacional)
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def columns(self, table):
+        return {r[1] for r in self.execute(f"PRAGMA table_info({table})")}
+
+    def explain(self, sql, params):
+        # linhas (id, parent, notused, detail) -> árvore indentada
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in self.execute("EXPLAIN QUERY PLAN " + sql, params):
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node] + detail)
+        return "\n".join(lines)
+
+    def now(self, dt):
+        return dt.isoformat()  # datas ficam em TEXT ISO no SQLite
+
+    def begin(self, transactional=True):
+        if transactional:
+            self.conn.execute("BEGIN")
+
+    def commit(self):
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+
+    def rollback(self):
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+
+    def lock(self):
+        pass
+
+    def unlock(self):
+        pass
+# ---------------------------
+
+
+# -------- MIGRAÇÕES --------
+SQLITE_PROMOCOES_COLUMNS = [
+    # colunas que o antigo migrate_db.py adicionava + as mais novas
+    ("author", "TEXT"),
+    ("content_html", "TEXT"),
+    ("images_json", "TEXT"),
+    ("links_json", "TEXT"),
+    ("scraped_at", "TEXT"),
+    ("valid_until", "TEXT"),
+    ("expired", "INTEGER DEFAULT 0"),
+]
+
+
+def _sqlite_baseline(backend):
+    backend.execute(
+        """
+    CREATE TABLE IF NOT EXISTS promocoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT UNIQUE,
+        title TEXT,
+        content_text TEXT,
+        date_published TEXT
+    )
+    """
+    )
+    existing = backend.columns("promocoes")
+    for col, coltype in SQLITE_PROMOCOES_COLUMNS:
+        if col not in existing:
+            print(f"   ➕ Adicionando coluna: {col} {coltype}")
+            backend.execute(f"ALTER TABLE promocoes ADD COLUMN {col} {coltype}")
+
+
+def _sqlite_add_columns(table, columns):
+    """Passo SQLite: ADD COLUMN só das que faltam (não há IF NOT EXISTS)."""
+    def step(backend):
+        existing = backend.columns(table)
+        for col, coltype in columns:
+            if col not in existing:
+                backend.execute(f"ALTER TABLE {table} ADD COLUMN {col} {coltype}")
+    return step
+
+
+def _sqlite_normalize_urls(backend):
+    """Passo SQLite: preenche urls/post_links/post_images a partir do JSON (o JSON fica)."""
+    from url_store import is_internal, url_host
+
+    ids = {}
+
+    def url_id(url, site):
+        if url not in ids:
+            host = url_host(url)
+            backend.execute(
+                "INSERT OR IGNORE INTO urls (url, host, internal) VALUES (?, ?, ?)",
+                (url, host, int(is_internal(host, site))),
+            )
+            ids[url] = backend.execute("SELECT id FROM urls WHERE url = ?", (url,))[0][0]
+        return ids[url]
+
+    rows = backend.execute("SELECT id, url, images_json, links_json FROM promocoes")
+    # migração não transacional (por causa do VACUUM no Postgres): aqui uma transação só
+    backend.execute("BEGIN")
+    for post_id, post_url, images_json, links_json in rows:
+        site = url_host(post_url or "")
+        for pos, img in enumerate(json.loads(images_json or "[]")):
+            if img.get("src"):
+                backend.execute(
+                    "INSERT OR REPLACE INTO post_images (post_id, position, url_id, alt, title) VALUES (?, ?, ?, ?, ?)",
+                    (post_id, pos, url_id(img["src"], site), img.get("alt", ""), img.get("title", "")),
+                )
+        for pos, link in enumerate(json.loads(links_json or "[]")):
+            if link.get("href"):
+                backend.execute(
+                    "INSERT OR REPLACE INTO post_links (post_id, position, url_id, text) VALUES (?, ?, ?, ?)",
+                    (post_id, pos, url_id(link["href"], site), link.get("text", "")),
+                )
+    backend.execute("COMMIT")
+
+
+def _pg_compress_content(backend, chunk=500):
+    """Passo Postgres: content_html de promocoes -> promocoes_content comprimido, em lotes."""
+    from psycopg2 import Binary
+    from psycopg2.extras import execute_values
+
+    from content_store import compress_html
+
+    last_id = 0
+    while True:
+        rows = backend.execute(
+            "SELECT id, content_html FROM promocoes WHERE content_html IS NOT NULL AND id > %s ORDER BY id LIMIT %s",
+            (last_id, chunk),
+        )
+        if not rows:
+            return
+        cur = backend.conn.cursor()
+        # linha já em promocoes_content foi gravada pelo scraper novo: vale ela
+        execute_values(
+            cur,
+            "INSERT INTO promocoes_content (post_id, html) VALUES %s ON CONFLICT (post_id) DO NOTHING",
+            [(post_id, Binary(compress_html(html))) for post_id, html in rows],
+        )
+        last_id = rows[-1][0]
+        cur.execute("UPDATE promocoes SET content_html = NULL WHERE id = ANY(%s)", ([r[0] for r in rows],))
+        cur.close()
+
+
+def backup_partition_sql(dt):
+    """(nome, CREATE TABLE) da partição mensal de promocoes_backup que contém `dt` (mês de São Paulo)."""
+    from zoneinfo import ZoneInfo
+
+    start = dt.astimezone(ZoneInfo("America/Sao_Paulo")).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    name = f"promocoes_backup_p{start:%Y%m}"
+    return name, (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF promocoes_backup "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def _pg_partition_backup(backend, chunk=500):
+    """
+    Passo Postgres: promocoes_backup vira particionada por mês (deleted_at),
+    com o HTML comprimido como em promocoes_content. As linhas antigas são
+    copiadas numa transação só; o id continua na mesma sequência.
+    """
+    from psycopg2 import Binary
+    from psycopg2.extras import execute_values
+
+    from content_store import compress_html
+
+    kind = backend.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('promocoes_backup')")
+    if kind and kind[0][0] == "p":
+        return
+    old = "promocoes_backup_old" if kind else None
+    seq = None
+    backend.execute("BEGIN")
+    try:
+        if old:
+            (seq,) = backend.execute("SELECT pg_get_serial_sequence('promocoes_backup', 'id')")[0]
+            old_columns = backend.columns("promocoes_backup")
+            backend.execute(f"ALTER TABLE promocoes_backup RENAME TO {old}")
+            backend.execute("ALTER INDEX IF EXISTS idx_promocoes_backup_deleted_at RENAME TO idx_promocoes_backup_old_deleted_at")
+            if seq:
+                backend.execute(f"ALTER SEQUENCE {seq} OWNED BY NONE")
+        if not seq:
+            seq = "promocoes_backup_id_seq"
+            backend.execute(f"CREATE SEQUENCE IF NOT EXISTS {seq}")
+        # a chave de partição precisa fazer parte da PK
+        backend.execute(
+            f"""
+            CREATE TABLE promocoes_backup (
+                id INTEGER NOT NULL DEFAULT nextval('{seq}'),
+                url TEXT,
+                title TEXT,
+                date_published DATE,
+                author TEXT,
+                content_text TEXT,
+                html BYTEA,
+                images_json JSONB,
+                links_json JSONB,
+                scraped_at TIMESTAMPTZ,
+                valid_until TIMESTAMPTZ,
+                deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (id, deleted_at)
+            ) PARTITION BY RANGE (deleted_at)
+            """
+        )
+        backend.execute(f"ALTER SEQUENCE {seq} OWNED BY promocoes_backup.id")
+        backend.execute("ALTER TABLE promocoes_backup ALTER COLUMN html SET STORAGE EXTERNAL")
+        backend.execute("CREATE INDEX idx_promocoes_backup_deleted_at ON promocoes_backup (deleted_at)")
+
+        now = datetime.now(timezone.utc)
+        months = [now, now + timedelta(days=31)]
+        if old:
+            months += [r[0] for r in backend.execute(
+                f"SELECT DISTINCT date_trunc('month', COALESCE(deleted_at, NOW()), 'America/Sao_Paulo') FROM {old}"
+            )]
+        for month in months:
+            backend.execute(backup_partition_sql(month)[1])
+
+        if old:
+            copied = [
+                c for c in ("url", "title", "date_published", "author", "content_text", "images_json",
+                            "links_json", "scraped_at", "valid_until")
+                if c in old_columns
+            ]
+            html = "content_html" if "content_html" in old_columns else "NULL"
+            last_id = 0
+            while True:
+                rows = backend.execute(
+                    f"SELECT id, {', '.join(copied)}, {html}, COALESCE(deleted_at, NOW()) FROM {old} "
+                    "WHERE id > %s ORDER BY id LIMIT %s",
+                    (last_id, chunk),
+                )
+                if not rows:
+                    break
+                cur = backend.conn.cursor()
+                execute_values(
+                    cur,
+                    f"INSERT INTO promocoes_backup (id, {', '.join(copied)}, html, deleted_at) VALUES %s",
+                    [r[:-2] + (Binary(compress_html(r[-2])) if r[-2] is not None else None, r[-1]) for r in rows],
+                )
+                cur.close()
+                last_id = rows[-1][0]
+            backend.execute(f"DROP TABLE {old}")
+            backend.execute(f"SELECT setval('{seq}', GREATEST((SELECT max(id) FROM promocoes_backup), 1))")
+        backend.execute("COMMIT")
+    except Exception:
+        backend.execute("ROLLBACK")
+        raise
+
+
+def _pg_drop_invalid_index(name):
+    """
+    Passo Postgres, antes de um CREATE INDEX CONCURRENTLY IF NOT EXISTS: um
+    build anterior que falhou ou foi cancelado deixa o índice INVALID, que o
+    IF NOT EXISTS pularia para sempre (e o planner nunca usa).
+    """
+    def step(backend):
+        rows = backend.execute(
+            "SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(%s)", (name,)
+        )
+        if rows and not rows[0][0]:
+            print(f"   🧹 Removendo índice inválido de um build interrompido: {name}")
+            backend.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    return step
+
+
+# título pesa mais que o corpo no ranking (ts_rank_cd); `{t}` é a linha
+_PG_SEARCH_TSV = (
+    "setweight(to_tsvector('pt_unaccent', coalesce({t}.title, '')), 'A') || "
+    "setweight(to_tsvector('pt_unaccent', coalesce({t}.content_text, '')), 'B')"
+)
+
+
+def _pg_backfill(column, expr, chunk=1000):
+    """
+    Passo Postgres (migração não transacional): preenche `column` IS NULL de
+    promocoes com `expr`, um lote (e um commit) por vez, sem reescrever a
+    tabela sob lock.
+    """
+    def step(backend):
+        last_id = 0
+        while True:
+            rows = backend.execute(
+                f"UPDATE promocoes SET {column} = {expr} WHERE id IN ("
+                f" SELECT id FROM promocoes WHERE id > %s AND {column} IS NULL ORDER BY id LIMIT %s"
+                ") RETURNING id",
+                (last_id, chunk),
+            )
+            if not rows:
+                return
+            last_id = max(r[0] for r in rows)
+    return step
+
+
+# host da URL como em url_store.url_host (minúsculas, sem porta e sem "www.")
+_PG_HOST = r"regexp_replace(lower(substring({col} from '^[^:/?#]+://(?:[^/?#@]*@)?([^/?#:]+)')), '^www\.', '')"
+
+MIGRATIONS = [
+    Migration(
+        1,
+        "baseline",
+        postgres=[
+            """
+            CREATE TABLE IF NOT EXISTS promocoes (
+                id SERIAL PRIMARY KEY,
+                url TEXT UNIQUE,
+                title TEXT,
+                date_published DATE,
+                author TEXT,
+                content_text TEXT,
+                content_html TEXT,
+                images_json JSONB,
+                links_json JSONB,
+                scraped_at TIMESTAMPTZ,
+                valid_until TIMESTAMPTZ
+            )
+            """,
+            # tabelas criadas antes dessas colunas existirem
+            "ALTER TABLE promocoes ADD COLUMN IF NOT EXISTS valid_until TIMESTAMPTZ",
+            "ALTER TABLE promocoes ADD COLUMN IF NOT EXISTS expired BOOLEAN DEFAULT FALSE",
+            """
+            CREATE TABLE IF NOT EXISTS promocoes_backup (
+                id SERIAL PRIMARY KEY,
+                url TEXT,
+                title TEXT,
+                date_published DATE,
+                author TEXT,
+                content_text TEXT,
+                content_html TEXT,
+                images_json JSONB,
+                links_json JSONB,
+                scraped_at TIMESTAMPTZ,
+                valid_until TIMESTAMPTZ,
+                deleted_at TIMESTAMPTZ DEFAULT NOW()
+            )
+            """,
+        ],
+        sqlite=[_sqlite_baseline],
+    ),
+    Migration(
+        2,
+        "expiry_indexes",
+        postgres=[
+            # ORDER BY + keyset do /today: o filtro de valid_until é aplicado
+            # andando no índice, parando no LIMIT
+            _pg_drop_invalid_index("idx_promocoes_today"),
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_promocoes_today
+            ON promocoes (date_published DESC NULLS LAST, id DESC)
+            """,
+            # limpeza (valid_until < NOW()); parcial: promos sem data ficam de fora
+            _pg_drop_invalid_index("idx_promocoes_valid_until"),
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_promocoes_valid_until
+            ON promocoes (valid_until) WHERE valid_until IS NOT NULL
+            """,
+            _pg_drop_invalid_index("idx_promocoes_backup_deleted_at"),
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_promocoes_backup_deleted_at
+            ON promocoes_backup (deleted_at)
+            """,
+            "ANALYZE promocoes",
+            "ANALYZE promocoes_backup",
+        ],
+        sqlite=[
+            # no SQLite NULL é o menor valor: DESC já deixa os nulos no fim
+            "CREATE INDEX IF NOT EXISTS idx_promocoes_today ON promocoes (date_published DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_promocoes_valid_until ON promocoes (valid_until) WHERE valid_until IS NOT NULL",
+            "ANALYZE promocoes",
+        ],
+        transactional=False,
+    ),
+    Migration(
+        3,
+        "fulltext_search",
+        postgres=[
+            "CREATE EXTENSION IF NOT EXISTS unaccent",
+            # portuguese + unaccent: "bônus" e "bonus" viram o mesmo lexema
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pt_unaccent') THEN
+                    CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese);
+                    ALTER TEXT SEARCH CONFIGURATION pt_unaccent
+                        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+                END IF;
+            END
+            $$
+            """,
+            # coluna comum + trigger em vez de GENERATED ... STORED: aquela
+            # reescreve promocoes inteira sob ACCESS EXCLUSIVE (o /today e o
+            # scraper param); esta entra na hora e é preenchida em lotes
+            "ALTER TABLE promocoes ADD COLUMN IF NOT EXISTS search_tsv tsvector",
+            """
+            CREATE OR REPLACE FUNCTION promocoes_search_tsv() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_tsv := {tsv};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """.format(tsv=_PG_SEARCH_TSV.format(t="NEW")),
+            "DROP TRIGGER IF EXISTS promocoes_search_tsv ON promocoes",
+            """
+            CREATE TRIGGER promocoes_search_tsv BEFORE INSERT OR UPDATE OF title, content_text ON promocoes
+            FOR EACH ROW EXECUTE FUNCTION promocoes_search_tsv()
+            """,
+            _pg_backfill("search_tsv", _PG_SEARCH_TSV.format(t="promocoes")),
+            _pg_drop_invalid_index("idx_promocoes_search"),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_promocoes_search ON promocoes USING GIN (search_tsv)",
+            "ANALYZE promocoes",
+        ],
+        sqlite=[
+            # índice FTS5 externo (conteúdo continua em promocoes), mantido por triggers
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS promocoes_fts USING fts5(
+                title, content_text,
+                content='promocoes', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS promocoes_fts_ai AFTER INSERT ON promocoes BEGIN
+                INSERT INTO promocoes_fts (rowid, title, content_text) VALUES (new.id, new.title, new.content_text);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS promocoes_fts_ad AFTER DELETE ON promocoes BEGIN
+                INSERT INTO promocoes_fts (promocoes_fts, rowid, title, content_text)
+                VALUES ('delete', old.id, old.title, old.content_text);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS promocoes_fts_au AFTER UPDATE OF title, content_text ON promocoes BEGIN
+                INSERT INTO promocoes_fts (promocoes_fts, rowid, title, content_text)
+                VALUES ('delete', old.id, old.title, old.content_text);
+                INSERT INTO promocoes_fts (rowid, title, content_text) VALUES (new.id, new.title, new.content_text);
+            END
+            """,
+            "INSERT INTO promocoes_fts (promocoes_fts) VALUES ('rebuild')",
+        ],
+        # o GIN é criado com CONCURRENTLY; os passos anteriores são idempotentes
+        transactional=False,
+    ),
+    Migration(
+        4,
+        "fingerprints",
+        postgres=[
+            # fingerprint.py: hash do conteúdo (upsert no-op) e SimHash (quase duplicados)
+            "ALTER TABLE promocoes ADD COLUMN IF NOT EXISTS content_hash TEXT",
+            "ALTER TABLE promocoes ADD COLUMN IF NOT EXISTS simhash BIGINT",
+            # NULL = o próprio post é o canônico; se o canônico sai, o cluster se refaz
+            """
+            ALTER TABLE promocoes ADD COLUMN IF NOT EXISTS canonical_id INTEGER
+            REFERENCES promocoes (id) ON DELETE SET NULL
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_promocoes_canonical ON promocoes (canonical_id) WHERE canonical_id IS NOT NULL",
+        ],
+        sqlite=[
+            _sqlite_add_columns("promocoes", [
+                ("content_hash", "TEXT"),
+                ("simhash", "INTEGER"),
+                ("canonical_id", "INTEGER REFERENCES promocoes (id) ON DELETE SET NULL"),
+            ]),
+            "CREATE INDEX IF NOT EXISTS idx_promocoes_canonical ON promocoes (canonical_id) WHERE canonical_id IS NOT NULL",
+        ],
+    ),
+    Migration(
+        5,
+        "backfill_checkpoints",
+        postgres=[
+            # backfill.py: uma linha por job (fonte + intervalo de datas)
+            """
+            CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                job TEXT PRIMARY KEY,
+                position TEXT NOT NULL,
+                seen INTEGER NOT NULL DEFAULT 0,
+                saved INTEGER NOT NULL DEFAULT 0,
+                done BOOLEAN NOT NULL DEFAULT FALSE,
+                updated_at TIMESTAMPTZ DEFAULT NOW()
+            )
+            """,
+        ],
+        # o backfill só grava no Postgres
+        sqlite=[],
+    ),
+    Migration(
+        6,
+        "promocoes_notify",
+        postgres=[
+            # backend/app/events.py faz LISTEN promocoes_events e repassa ao SSE.
+            # Payload pequeno (limite do NOTIFY é 8000 bytes): o cliente busca o resto.
+            """
+            CREATE OR REPLACE FUNCTION promocoes_notify() RETURNS trigger AS $$
+            DECLARE
+                r RECORD;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN r := OLD; ELSE r := NEW; END IF;
+                PERFORM pg_notify('promocoes_events', json_build_object(
+                    'op', lower(TG_OP),
+                    'id', r.id,
+                    'url', r.url,
+                    'title', left(r.title, 300),
+                    'date_published', r.date_published,
+                    'valid_until', r.valid_until,
+                    'canonical_id', r.canonical_id
+                )::text);
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS promocoes_notify_ins_del ON promocoes",
+            """
+            CREATE TRIGGER promocoes_notify_ins_del AFTER INSERT OR DELETE ON promocoes
+            FOR EACH ROW EXECUTE FUNCTION promocoes_notify()
+            """,
+            # só mudanças visíveis na API (o upsert sem mudança já não reescreve a linha)
+            "DROP TRIGGER IF EXISTS promocoes_notify_upd ON promocoes",
+            """
+            CREATE TRIGGER promocoes_notify_upd AFTER UPDATE ON promocoes
+            FOR EACH ROW
+            WHEN ((OLD.title, OLD.date_published, OLD.valid_until, OLD.content_hash, OLD.canonical_id)
+                  IS DISTINCT FROM (NEW.title, NEW.date_published, NEW.valid_until, NEW.content_hash, NEW.canonical_id))
+            EXECUTE FUNCTION promocoes_notify()
+            """,
+        ],
+        # sem LISTEN no SQLite: a API usa o broker em memória
+        sqlite=[],
+    ),
+    Migration(
+        7,
+        "normalized_urls",
+        postgres=[
+            # url_store.py: cada URL uma vez; host/internal calculados ao gravar
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                id SERIAL PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                host TEXT NOT NULL,
+                internal BOOLEAN NOT NULL DEFAULT FALSE
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_urls_host ON urls (host)",
+            # uma linha por post com os ids na ordem da página: uma linha por
+            # link custaria mais que o JSONB comprimido que substitui
+            """
+            CREATE TABLE IF NOT EXISTS post_links (
+                post_id INTEGER PRIMARY KEY REFERENCES promocoes (id) ON DELETE CASCADE,
+                url_ids INTEGER[] NOT NULL,
+                texts TEXT[] NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS post_images (
+                post_id INTEGER PRIMARY KEY REFERENCES promocoes (id) ON DELETE CASCADE,
+                url_ids INTEGER[] NOT NULL,
+                alts TEXT[] NOT NULL,
+                titles TEXT[] NOT NULL
+            )
+            """,
+            # busca reversa: url_ids && ARRAY[...] usa o GIN
+            "CREATE INDEX IF NOT EXISTS idx_post_links_urls ON post_links USING GIN (url_ids)",
+            "CREATE INDEX IF NOT EXISTS idx_post_images_urls ON post_images USING GIN (url_ids)",
+            # migra o JSON existente; "internal" = mesmo host do post
+            """
+            INSERT INTO urls (url, host, internal)
+            SELECT url, host, bool_or(host = site OR right(host, length(site) + 1) = '.' || site)
+            FROM (
+                SELECT e ->> 'href' AS url, {host_ref} AS host, {host_post} AS site
+                FROM promocoes p CROSS JOIN LATERAL jsonb_array_elements(p.links_json) AS e
+                WHERE jsonb_typeof(p.links_json) = 'array'
+                UNION ALL
+                SELECT e ->> 'src', {host_src}, {host_post}
+                FROM promocoes p CROSS JOIN LATERAL jsonb_array_elements(p.images_json) AS e
+                WHERE jsonb_typeof(p.images_json) = 'array'
+            ) AS refs
+            WHERE url IS NOT NULL
+            GROUP BY url, host
+            ON CONFLICT (url) DO NOTHING
+            """.format(
+                host_ref=_PG_HOST.format(col="(e ->> 'href')"),
+                host_src=_PG_HOST.format(col="(e ->> 'src')"),
+                host_post=_PG_HOST.format(col="p.url"),
+            ),
+            """
+            INSERT INTO post_links (post_id, url_ids, texts)
+            SELECT p.id, array_agg(u.id ORDER BY e.ord), array_agg(coalesce(e.value ->> 'text', '') ORDER BY e.ord)
+            FROM promocoes p
+            CROSS JOIN LATERAL jsonb_array_elements(p.links_json) WITH ORDINALITY AS e (value, ord)
+            JOIN urls u ON u.url = e.value ->> 'href'
+            WHERE jsonb_typeof(p.links_json) = 'array'
+            GROUP BY p.id
+            ON CONFLICT (post_id) DO NOTHING
+            """,
+            """
+            INSERT INTO post_images (post_id, url_ids, alts, titles)
+            SELECT p.id, array_agg(u.id ORDER BY e.ord),
+                   array_agg(coalesce(e.value ->> 'alt', '') ORDER BY e.ord),
+                   array_agg(coalesce(e.value ->> 'title', '') ORDER BY e.ord)
+            FROM promocoes p
+            CROSS JOIN LATERAL jsonb_array_elements(p.images_json) WITH ORDINALITY AS e (value, ord)
+            JOIN urls u ON u.url = e.value ->> 'src'
+            WHERE jsonb_typeof(p.images_json) = 'array'
+            GROUP BY p.id
+            ON CONFLICT (post_id) DO NOTHING
+            """,
+            # o JSON vira derivado (url_store.IMAGES_JSON_SQL / LINKS_JSON_SQL)
+            "UPDATE promocoes SET images_json = NULL, links_json = NULL WHERE images_json IS NOT NULL OR links_json IS NOT NULL",
+            # libera o espaço das versões antigas das linhas para reuso
+            "VACUUM ANALYZE promocoes",
+        ],
+        sqlite=[
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL UNIQUE,
+                host TEXT NOT NULL,
+                internal INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_urls_host ON urls (host)",
+            # sem arrays no SQLite: uma linha por link (aqui linhas são baratas)
+            """
+            CREATE TABLE IF NOT EXISTS post_links (
+                post_id INTEGER NOT NULL REFERENCES promocoes (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                url_id INTEGER NOT NULL REFERENCES urls (id),
+                text TEXT,
+                PRIMARY KEY (post_id, position)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS post_images (
+                post_id INTEGER NOT NULL REFERENCES promocoes (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                url_id INTEGER NOT NULL REFERENCES urls (id),
+                alt TEXT,
+                title TEXT,
+                PRIMARY KEY (post_id, position)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_post_links_url ON post_links (url_id)",
+            "CREATE INDEX IF NOT EXISTS idx_post_images_url ON post_images (url_id)",
+            # no SQLite (cópia offline, a API lê o JSON) o JSON continua gravado
+            _sqlite_normalize_urls,
+        ],
+        # VACUUM não roda dentro de transação; os passos são idempotentes
+        transactional=False,
+    ),
+    Migration(
+        8,
+        "compressed_content",
+        postgres=[
+            # content_store.py: HTML comprimido (zstd) fora da linha; o /today
+            # não lê content_html e a linha de promocoes fica pequena
+            """
+            CREATE TABLE IF NOT EXISTS promocoes_content (
+                post_id INTEGER PRIMARY KEY REFERENCES promocoes (id) ON DELETE CASCADE,
+                html BYTEA NOT NULL
+            )
+            """,
+            # bytes já comprimidos: o TOAST não tenta comprimir de novo
+            "ALTER TABLE promocoes_content ALTER COLUMN html SET STORAGE EXTERNAL",
+            _pg_compress_content,
+            # backup por mês: a retenção vira DROP da partição inteira
+            _pg_partition_backup,
+            # libera o espaço do HTML antigo para reuso (devolver ao disco
+            # exige VACUUM FULL, que trava a tabela: fica para uma janela)
+            "VACUUM ANALYZE promocoes",
+            "ANALYZE promocoes_backup",
+        ],
+        # cópia offline: o HTML continua na linha (a API lê content_html)
+        sqlite=[],
+        # VACUUM não roda dentro de transação; a cópia do backup abre a sua
+        transactional=False,
+    ),
+    Migration(
+        9,
+        "updated_at",
+        postgres=[
+            # export incremental (since=): scraped_at só muda no upsert, mas
+            # reprocess.py (valid_until) e fingerprint.py (canonical_id) também
+            # alteram o que a API mostra. O trigger marca qualquer UPDATE que
+            # mude uma coluna exportada, venha de onde vier (colunas listadas:
+            # o WHEN de um trigger BEFORE não aceita a linha inteira quando há
+            # coluna gerada). Coluna nova exportada entra na lista.
+            "ALTER TABLE promocoes ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ",
+            "ALTER TABLE promocoes ALTER COLUMN updated_at SET DEFAULT NOW()",
+            """
+            CREATE OR REPLACE FUNCTION promocoes_touch() RETURNS trigger AS $$
+            BEGIN
+                -- quem define updated_at explicitamente (o backfill abaixo) prevalece
+                IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+                    NEW.updated_at := NOW();
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS promocoes_touch ON promocoes",
+            """
+            CREATE TRIGGER promocoes_touch BEFORE UPDATE ON promocoes
+            FOR EACH ROW WHEN (
+                (OLD.url, OLD.title, OLD.date_published, OLD.author, OLD.content_text,
+                 OLD.content_html, OLD.images_json::text, OLD.links_json::text, OLD.scraped_at,
+                 OLD.valid_until, OLD.expired, OLD.canonical_id, OLD.updated_at)
+                IS DISTINCT FROM
+                (NEW.url, NEW.title, NEW.date_published, NEW.author, NEW.content_text,
+                 NEW.content_html, NEW.images_json::text, NEW.links_json::text, NEW.scraped_at,
+                 NEW.valid_until, NEW.expired, NEW.canonical_id, NEW.updated_at)
+            )
+            EXECUTE FUNCTION promocoes_touch()
+            """,
+            # linhas antigas: a última gravação conhecida
+            _pg_backfill("updated_at", "COALESCE(scraped_at, NOW())"),
+            _pg_drop_invalid_index("idx_promocoes_updated_at"),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_promocoes_updated_at ON promocoes (updated_at)",
+            "ANALYZE promocoes",
+        ],
+        # cópia offline: só o upsert escreve nela; o export usa scraped_at
+        sqlite=[],
+        transactional=False,
+    ),
+    Migration(
+        10,
+        "normalized_json_functions",
+        postgres=[
+            # images_json/links_json no formato antigo a partir das tabelas da
+            # 0007: definição única para a API, export.py e archiver.py
+            # (url_store.IMAGES_JSON_SQL / LINKS_JSON_SQL). Linhas ainda não
+            # normalizadas (JSON gravado) continuam valendo pelo COALESCE.
+            # STABLE: enxerga o snapshot de quem chama (o DELETE ... RETURNING
+            # do archiver ainda vê post_images/post_links da linha).
+            """
+            CREATE OR REPLACE FUNCTION promocoes_images_json(post_id INTEGER, stored JSONB)
+            RETURNS JSONB LANGUAGE sql STABLE AS $$
+                SELECT COALESCE(stored, (
+                    SELECT COALESCE(jsonb_agg(jsonb_build_object('src', u.url, 'alt', i.alts[o.n], 'title', i.titles[o.n]) ORDER BY o.n), '[]')
+                    FROM post_images i
+                    CROSS JOIN LATERAL unnest(i.url_ids) WITH ORDINALITY AS o (url_id, n)
+                    JOIN urls u ON u.id = o.url_id
+                    WHERE i.post_id = promocoes_images_json.post_id
+                ))
+            $$
+            """,
+            """
+            CREATE OR REPLACE FUNCTION promocoes_links_json(post_id INTEGER, stored JSONB)
+            RETURNS JSONB LANGUAGE sql STABLE AS $$
+                SELECT COALESCE(stored, (
+                    SELECT COALESCE(jsonb_agg(jsonb_build_object('href', u.url, 'text', l.texts[o.n], 'internal', u.internal) ORDER BY o.n), '[]')
+                    FROM post_links l
+                    CROSS JOIN LATERAL unnest(l.url_ids) WITH ORDINALITY AS o (url_id, n)
+                    JOIN urls u ON u.id = o.url_id
+                    WHERE l.post_id = promocoes_links_json.post_id
+                ))
+            $$
+            """,
+        ],
+        # SQLite guarda o JSON na própria linha
+        sqlite=[],
+    ),
+    Migration(
+        11,
+        "links_internal_per_post",
+        postgres=[
+            # urls.internal era gravado pelo primeiro post que citou a URL:
+            # com várias fontes, o link de um site para o outro saía interno
+            # nos dois. Agora sai na leitura: host da URL contra o host do post.
+            "DROP FUNCTION IF EXISTS promocoes_links_json(INTEGER, JSONB)",
+            """
+            CREATE OR REPLACE FUNCTION promocoes_links_json(post_id INTEGER, post_url TEXT, stored JSONB)
+            RETURNS JSONB LANGUAGE sql STABLE AS $$
+                SELECT COALESCE(stored, (
+                    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                        'href', u.url, 'text', l.texts[o.n],
+                        'internal', site.host <> '' AND (u.host = site.host OR right(u.host, length(site.host) + 1) = '.' || site.host)
+                    ) ORDER BY o.n), '[]')
+                    FROM post_links l
+                    CROSS JOIN LATERAL unnest(l.url_ids) WITH ORDINALITY AS o (url_id, n)
+                    JOIN urls u ON u.id = o.url_id
+                    CROSS JOIN (SELECT COALESCE({host}, '') AS host) AS site
+                    WHERE l.post_id = promocoes_links_json.post_id
+                ))
+            $$
+            """.format(host=_PG_HOST.format(col="post_url")),
+            "ALTER TABLE urls DROP COLUMN IF EXISTS internal",
+        ],
+        # SQLite: links_json fica na linha com o internal do parser, por post
+        sqlite=[],
+    ),
+    Migration(
+        12,
+        "promocoes_version",
+        postgres=[
+            # contador que invalida o cache do /today (promo_version.py); antes
+            # criado na hora por quem escrevia
+            """
+            CREATE TABLE IF NOT EXISTS promocoes_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMPTZ DEFAULT NOW()
+            )
+            """,
+            "INSERT INTO promocoes_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+        ],
+        # ninguém escreve na cópia offline: a API fica só com o TTL do cache
+        sqlite=[],
+    ),
+]
+# ---------------------------
+
+
+def ensure_migrations_table(backend):
+    backend.begin()
+    backend.execute(
+        """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL,
+        plan_before TEXT,
+        plan_after TEXT
+    )
+    """
+    )
+    backend.commit()
+
+
+def applied_versions(backend):
+    return {r[0] for r in backend.execute("SELECT version FROM schema_migrations")}
+
+
+def capture_plans(backend, now):
+    """EXPLAIN de cada consulta monitorada ({nome: plano}); tabela ausente vira a mensagem de erro."""
+    now = backend.now(now)
+    plans = {}
+    for name, sql in EXPLAIN_QUERIES.items():
+        if isinstance(sql, dict):
+            sql = sql.get(backend.dialect)
+            if sql is None:
+                continue
+        params = (now,) if "{now}" in sql else ()
+        backend.begin()
+        try:
+            plans[name] = backend.explain(sql.format(now=backend.param), params)
+        except Exception as e:
+            plans[name] = f"(indisponível: {str(e).strip().splitlines()[0]})"
+        finally:
+            backend.rollback()
+    return plans
+
+
+def print_plan_changes(before, after):
+    for name in EXPLAIN_QUERIES:
+        if before.get(name) == after.get(name):
+            continue
+        print(f"   📊 Plano de '{name}' mudou:")
+        for label, plan in (("antes", before.get(name)), ("depois", after.get(name))):
+            print(f"      {label}:")
+            for line in (plan or "").splitlines():
+                print(f"        {line}")
+
+
+def apply_migration(backend, migration):
+    print(f"⏫ Aplicando {migration.version:04d}_{migration.name} ({backend.dialect})...")
+    # mesmo instante antes e depois, para os planos serem comparáveis
+    now = datetime.now(timezone.utc)
+    before = capture_plans(backend, now)
+    backend.begin(migration.transactional)
+    try:
+        for step in migration.steps[backend.dialect]:
+            if callable(step):
+                step(backend)
+            else:
+                backend.execute(step)
+        backend.commit()
+    except Exception:
+        backend.rollback()
+        raise
+    after = capture_plans(backend, now)
+
+    backend.begin()
+    backend.execute(
+        "INSERT INTO schema_migrations (version, name, applied_at, plan_before, plan_after) VALUES ({p}, {p}, {p}, {p}, {p})".format(p=backend.param),
+        (
+            migration.version,
+            migration.name,
+            datetime.now(timezone.utc).isoformat(),
+            json.dumps(before, ensure_ascii=False),
+            json.dumps(after, ensure_ascii=False),
+        ),
+    )
+    backend.commit()
+    print_plan_changes(before, after)
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+def check_schema(backend):
+    """
+    Para os scripts agendados (coleta, arquivamento): falha se houver
+    migração pendente em vez de aplicá-la. Migrações podem reescrever
+    tabelas inteiras; rodam só com `python migrate.py`.
+    """
+    try:
+        done = applied_versions(backend)
+    except Exception:
+        done = set()  # sem schema_migrations: banco nunca migrado
+    finally:
+        backend.rollback()
+    pending = [m for m in MIGRATIONS if m.version not in done]
+    if pending:
+        names = ", ".join(f"{m.version:04d}_{m.name}" for m in pending)
+        raise SchemaOutdated(f"banco desatualizado (pendentes: {names}); rode python migrate.py")
+
+
+def upgrade(backend, target=None):
+    """Aplica as migrações pendentes (até `target`, se informado). Devolve quantas rodaram."""
+    backend.lock()
+    try:
+        ensure_migrations_table(backend)
+        done = applied_versions(backend)
+        pending = [
+            m for m in MIGRATIONS
+            if m.version not in done and (target is None or m.version <= target)
+        ]
+        for migration in pending:
+            apply_migration(backend, migration)
+        return len(pending)
+    finally:
+        backend.unlock()
+
+
+def status(backend):
+    ensure_migrations_table(backend)
+    rows = {r[0]: r for r in backend.execute("SELECT version, name, applied_at FROM schema_migrations")}
+    for m in MIGRATIONS:
+        if m.version in rows:
+            print(f"  ✅ {m.version:04d}_{m.name}  (aplicada em {rows[m.version][2]})")
+        else:
+            print(f"  ⏳ {m.version:04d}_{m.name}  (pendente)")
+
+
+def connect(target=None):
+    """SQLite se o alvo for um arquivo (.db/.sqlite ou sqlite:///...), senão Postgres do DATABASE_URL."""
+    if target and target.startswith("sqlite:///"):
+        target = target[len("sqlite:///"):]
+    if target and not target.startswith(("postgres://", "postgresql://")):
+        return SqliteBackend(sqlite3.connect(target))
+
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    db_url = target or os.getenv("DATABASE_URL")
+    if not db_url:
+        raise RuntimeError("DATABASE_URL não encontrado no .env")
+    return PostgresBackend(psycopg2.connect(db_url))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Migrações versionadas do schema de promocoes.")
+    ap.add_argument("target", nargs="?", help="arquivo SQLite ou URL Postgres (padrão: DATABASE_URL)")
+    ap.add_argument("--status", action="store_true", help="só lista migrações aplicadas/pendentes")
+    ap.add_argument("--to", type=int, help="aplica até esta versão")
+    args = ap.parse_args()
+
+    backend = connect(args.target)
+    try:
+        if args.status:
+            status(backend)
+            return
+        n = upgrade(backend, args.to)
+        print(f"✅ {n} migração(ões) aplicada(s)." if n else "Nenhuma migração pendente. Banco já está atualizado.")
+    finally:
+        backend.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# page_parser.py
+# Backends de parsing dos artigos: BeautifulSoup (referência) ou lxml (C, mais rápido).
+#
+# Escolha com SCRAPER_PARSER=bs4 | bs4-lxml | lxml. Todos devolvem o mesmo dict:
+#   title, published_meta, author, content_text, content_html, images, links
+#
+# Cada fonte (scrape_sources.py) pode trocar os seletores do conteúdo; o
+# backend lxml entende só o subconjunto "tag", "tag.classe", ".classe" e
+# descendentes separados por espaço ("article .entry-content").
+
+import os
+import re
+import threading
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from html_text import BLOCK_TAGS, collect_text_from_container
+
+PARSER_BACKEND = os.getenv("SCRAPER_PARSER", "bs4")
+
+CONTENT_SELECTORS = [
+    "div.td-post-content",
+    "div.entry-content",
+    "div.post-content",
+    "article .entry-content",
+    "article",
+    "main",
+    "div.content",
+    "section",
+]
+JUNK_TAGS = ["script", "style", "iframe", "ins", "noscript", "svg"]
+
+
+_RE_SIMPLE_SELECTOR = re.compile(r"^[a-z0-9]*(?:\.[\w-]+)*$")
+
+
+def compile_selector(sel):
+    """'article .entry-content' -> [("article", {}), (None, {"entry-content"})] (da raiz para a folha)."""
+    parts = []
+    for part in sel.split():
+        if not _RE_SIMPLE_SELECTOR.match(part):
+            raise ValueError(f"seletor não suportado pelo backend lxml: {sel!r}")
+        tag, *classes = part.split(".")
+        parts.append((tag or None, frozenset(classes)))
+    if not parts:
+        raise ValueError("seletor vazio")
+    return parts
+
+
+def safe_get_text(el):
+    return el.get_text(strip=True) if el else None
+
+
+def _image(url, src, alt, title):
+    return {"src": urljoin(url, src), "alt": alt, "title": title}
+
+
+def _link(url, href, text, site_netloc):
+    href = urljoin(url, href)
+    internal = urlparse(href).netloc.endswith(site_netloc)
+    return {"href": href, "text": text, "internal": internal}
+
+
+class Bs4Parser:
+    """Implementação de referência (BeautifulSoup); `features` escolhe o tree builder."""
+
+    def __init__(self, features="html.parser"):
+        self.features = features
+        self.name = "bs4" if features == "html.parser" else f"bs4-{features}"
+
+    def parse(self, html, url, site, selectors=None):
+        soup = BeautifulSoup(html, self.features)
+
+        # título
+        titulo_tag = soup.find("h1") or soup.find("h2")
+        title = safe_get_text(titulo_tag) if titulo_tag else None
+        if not title:
+            og = soup.find("meta", property="og:title")
+            if og and og.get("content"):
+                title = og.get("content").strip()
+
+        meta_pub = soup.find("meta", {"property": "article:published_time"})
+        published_meta = meta_pub["content"] if meta_pub and meta_pub.get("content") else None
+
+        # autor
+        author_tag = soup.find(attrs={"rel": "author"}) or soup.find(class_="author") or soup.find(class_="byline")
+        author = safe_get_text(author_tag)
+
+        # conteúdo
+        content_soup = None
+        for sel in selectors or CONTENT_SELECTORS:
+            el = soup.select_one(sel)
+            if el:
+                content_soup = el
+                break
+        if not content_soup:
+            content_soup = soup.find("article") or soup.find("main") or soup.body or soup
+        for bad in content_soup.find_all(JUNK_TAGS):
+            bad.decompose()
+        content_text = collect_text_from_container(content_soup) or ""
+        content_html = str(content_soup)
+
+        # imagens
+        images = []
+        for img in content_soup.find_all("img"):
+            src = img.get("src") or img.get("data-src") or img.get("data-lazy-src") or img.get("data-original")
+            if src:
+                images.append(_image(url, src, img.get("alt", ""), img.get("title", "")))
+
+        # links
+        site_netloc = urlparse(site).netloc
+        links = []
+        for a in content_soup.find_all("a", href=True):
+            links.append(_link(url, a["href"], a.get_text(" ", strip=True), site_netloc))
+
+        return {
+            "title": title,
+            "published_meta": published_meta,
+            "author": author,
+            "content_text": content_text,
+            "content_html": content_html,
+            "images": images,
+            "links": links,
+        }
+
+
+# --------- lxml ---------
+# Regras de saída do BeautifulSoup (formatter "minimal") reproduzidas para o
+# content_html sair byte a byte igual ao do backend bs4.
+_VOID_TAGS = frozenset(
+    [
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem",
+        "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame",
+        "image", "isindex", "nextid", "spacer",
+    ]
+)
+_LIST_ATTRS = {
+    "*": {"class", "accesskey", "dropzone"},
+    "a": {"rel", "rev"},
+    "link": {"rel", "rev"},
+    "td": {"headers"},
+    "th": {"headers"},
+    "form": {"accept-charset"},
+    "object": {"archive"},
+    "area": {"rel"},
+    "icon": {"sizes"},
+    "iframe": {"sandbox"},
+    "output": {"for"},
+}
+_PRESERVE_WS = ("pre", "textarea")
+_RAW_TEXT = ("script", "style")
+# strings dentro destas tags não contam no get_text do bs4
+_NON_TEXT = frozenset(["script", "style", "template"])
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+
+def _collapse_ws(s):
+    """bs4 troca strings só de espaços ASCII por '\\n' (se tiver quebra) ou ' '."""
+    if s and not s.strip(_ASCII_SPACES):
+        return "\n" if "\n" in s else " "
+    return s
+
+
+def _escape(s):
+    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _quote_attr(v):
+    v = _escape(v)
+    if '"' in v:
+        if "'" in v:
+            return '"%s"' % v.replace('"', "&quot;")
+        return "'%s'" % v
+    return '"%s"' % v
+
+
+class LxmlParser:
+    """
+    Backend lxml: uma passada pelo documento acha título, meta, autor e raiz
+    do conteúdo; uma passada pela raiz do conteúdo gera texto, imagens,
+    links e o HTML serializado.
+
+    Para HTML bem formado a saída é idêntica à do Bs4Parser. Em HTML
+    quebrado (ex.: <p> sem fechamento) o libxml2 monta a árvore como um
+    navegador e o html.parser não, então o resultado pode diferir; atributos
+    sem valor (`<video controls>`) saem como `controls="controls"`.
+    """
+
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree, html as lxml_html
+
+        self._etree = etree
+        self._lxml_html = lxml_html
+        # parsers do lxml não podem ser compartilhados entre threads
+        self._local = threading.local()
+        self._compiled = {}  # tupla de seletores -> compilados
+
+    @property
+    def _parser(self):
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            parser = self._local.parser = self._lxml_html.HTMLParser(encoding="utf-8")
+        return parser
+
+    def _selectors(self, selectors):
+        key = tuple(selectors or CONTENT_SELECTORS)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compiled[key] = [compile_selector(sel) for sel in key]
+        return compiled
+
+    def parse(self, html, url, site, selectors=None):
+        etree = self._etree
+        compiled = self._selectors(selectors)
+        data = html.encode("utf-8") if isinstance(html, str) else html
+        try:
+            root = self._lxml_html.document_fromstring(data, parser=self._parser)
+        except etree.ParserError:
+            # documento vazio: deixa o bs4 decidir o que sai
+            return Bs4Parser().parse(html, url, site, selectors)
+
+        preserve = set()
+        for p in root.iter(*_PRESERVE_WS):
+            preserve.update(p.iter())
+
+        first = {}
+        selector_hits = [None] * len(compiled)
+        for el in root.iter():
+            # normalização de espaços igual à do bs4 (antes de remover lixo)
+            text, tail = el.text, el.tail
+            if text and el not in preserve and _collapse_ws(text) is not text:
+                el.text = _collapse_ws(text)
+            if tail and el.getparent() not in preserve and _collapse_ws(tail) is not tail:
+                el.tail = _collapse_ws(tail)
+            tag = el.tag
+            if not isinstance(tag, str):
+                continue
+            cls = el.get("class")
+            classes = cls.split() if cls else ()
+            if tag in ("h1", "h2", "article", "main") and tag not in first:
+                first[tag] = el
+            elif tag == "meta":
+                prop = el.get("property")
+                if prop in ("og:title", "article:published_time") and prop not in first:
+                    first[prop] = el
+            rel = el.get("rel")
+            if rel and "author" in rel.split() and "rel" not in first:
+                first["rel"] = el
+            if classes:
+                for key in ("author", "byline"):
+                    if key in classes and key not in first:
+                        first[key] = el
+            for i, sel in enumerate(compiled):
+                if selector_hits[i] is None and self._matches(el, tag, classes, sel):
+                    selector_hits[i] = el
+
+        # título
+        titulo_tag = first.get("h1") if first.get("h1") is not None else first.get("h2")
+        title = self._get_text(titulo_tag, "") if titulo_tag is not None else None
+        if not title:
+            og = first.get("og:title")
+            if og is not None and og.get("content"):
+                title = og.get("content").strip()
+
+        meta_pub = first.get("article:published_time")
+        published_meta = meta_pub.get("content") if meta_pub is not None and meta_pub.get("content") else None
+
+        # autor
+        author_tag = next((first[k] for k in ("rel", "author", "byline") if first.get(k) is not None), None)
+        author = self._get_text(author_tag, "") if author_tag is not None else None
+
+        # conteúdo
+        content = next((el for el in selector_hits if el is not None), None)
+        if content is None:
+            content = next(
+                (el for el in (first.get("article"), first.get("main"), root.find("body")) if el is not None), root
+            )
+        for bad in list(content.iterdescendants(*JUNK_TAGS)):
+            bad.drop_tree()
+
+        content_text, content_html, images, links = self._walk_content(content, url, urlparse(site).netloc)
+        return {
+            "title": title,
+            "published_meta": published_meta,
+            "author": author,
+            "content_text": content_text,
+            "content_html": content_html,
+            "images": images,
+            "links": links,
+        }
+
+    @staticmethod
+    def _matches(el, tag, classes, sel):
+        """`sel` compilado (compile_selector): a última parte casa com `el`, as outras com ancestrais."""
+        name, need = sel[-1]
+        if (name and tag != name) or not need.issubset(classes):
+            return False
+        node = el
+        for name, need in reversed(sel[:-1]):
+            # ancestral mais próximo que casa: suficiente com só descendentes
+            for node in node.iterancestors(name) if name else node.iterancestors():
+                cls = node.get("class")
+                if not need or need.issubset(cls.split() if cls else ()):
+                    break
+            else:
+                return False
+        return True
+
+    def _iter_strings(self, el):
+        """Strings de texto de `el` em ordem (sem o tail de `el`), como o bs4 as vê."""
+        comment = self._etree.Comment
+        stack = [("el", el)]
+        while stack:
+            kind, x = stack.pop()
+            if kind == "text":
+                yield x
+                continue
+            if x.tag is comment or x.tag in _NON_TEXT:
+                continue
+            for child in reversed(x):
+                if child.tail:
+                    stack.append(("text", child.tail))
+                stack.append(("el", child))
+            if isinstance(x.tag, str) and x.text:
+                stack.append(("text", x.text))
+
+    def _get_text(self, el, sep):
+        return sep.join(s.strip() for s in self._iter_strings(el) if s.strip())
+
+    def _walk_content(self, content, url, site_netloc):
+        """Uma passada: texto em parágrafos, imagens, links e HTML no formato do bs4."""
+        comment = self._etree.Comment
+        html_out = []
+        paragraphs = []
+        buf = []
+        images = []
+        links = []
+
+        def flush():
+            if buf:
+                text = " ".join(buf)
+                if not paragraphs or paragraphs[-1] != text:
+                    paragraphs.append(text)
+                buf.clear()
+
+        # ("el", nó) abre, ("end", nó) fecha, ("text", str) é texto cujo pai é `parent`;
+        # `quiet` marca subárvores (script/style/template) fora do texto
+        stack = [("el", content, None, False)]
+        while stack:
+            kind, x, parent, quiet = stack.pop()
+            if kind == "text":
+                html_out.append(x if parent in _RAW_TEXT else _escape(x))
+                if not quiet:
+                    s = x.strip()
+                    if s:
+                        buf.append(s)
+                continue
+            if kind == "end":
+                html_out.append("</%s>" % x.tag)
+                if x is not content and x.tag in BLOCK_TAGS:
+                    flush()
+                continue
+            tag = x.tag
+            if tag is comment:
+                html_out.append("<!--%s-->" % (x.text or ""))
+                continue
+            if not isinstance(tag, str):
+                continue
+            if x is not content and tag in BLOCK_TAGS:
+                flush()
+            html_out.append(self._start_tag(x, tag))
+
+            if tag == "img":
+                src = x.get("src") or x.get("data-src") or x.get("data-lazy-src") or x.get("data-original")
+                if src:
+                    images.append(_image(url, src, x.get("alt", ""), x.get("title", "")))
+            elif tag == "a" and x.get("href") is not None:
+                links.append(_link(url, x.get("href"), self._get_text(x, " "), site_netloc))
+
+            if tag in _VOID_TAGS and not len(x) and not x.text:
+                if x is not content and tag in BLOCK_TAGS:
+                    flush()
+                continue
+            inner_quiet = quiet or tag in _NON_TEXT
+            stack.append(("end", x, None, quiet))
+            for child in reversed(x):
+                if child.tail:
+                    stack.append(("text", child.tail, tag, inner_quiet))
+                stack.append(("el", child, None, inner_quiet))
+            if x.text:
+                stack.append(("text", x.text, tag, inner_quiet))
+        flush()
+        return "\n\n".join(paragraphs), "".join(html_out), images, links
+
+    @staticmethod
+    def _start_tag(el, tag):
+        list_attrs = _LIST_ATTRS["*"] | _LIST_ATTRS.get(tag, set())
+        parts = ["<", tag]
+        for k, v in sorted(el.attrib.items()):
+            if k in list_attrs:
+                v = " ".join(v.split())
+            parts.append(" %s=%s" % (k, _quote_attr(v)))
+        void = tag in _VOID_TAGS and not len(el) and not el.text
+        parts.append("/>" if void else ">")
+        return "".join(parts)
+
+
+_BACKENDS = {
+    "bs4": lambda: Bs4Parser("html.parser"),
+    "bs4-lxml": lambda: Bs4Parser("lxml"),
+    "lxml": LxmlParser,
+}
+
+
+def get_parser(name: str = None):
+    """Instancia o backend pedido (padrão: SCRAPER_PARSER)."""
+    name = name or PARSER_BACKEND
+    try:
+        return _BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"SCRAPER_PARSER desconhecido: {name!r} (use {', '.join(_BACKENDS)})")
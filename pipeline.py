@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# pipeline.py
+# Pipeline em três estágios para coleta (scrape_engine.py), backfill e reprocessamento:
+#
+#   fetch (thread)  --fila-->  parse (ProcessPoolExecutor)  --fila-->  escrita (thread única)
+#
+# O fetch só faz I/O e entrega o HTML cru (bytes); parse + extração de texto +
+# detect_valid_until rodam em processos (usam todos os núcleos); um único
+# writer grava no banco. Filas limitadas dão backpressure: se o banco ou o
+# parse atrasam, o fetch espera.
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# -------- CONFIG --------
+PARSE_WORKERS = int(os.getenv("PIPELINE_PARSE_WORKERS", str(os.cpu_count() or 1)))  # 0 = parse na thread principal
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))  # itens entre estágios
+TICK_SECONDS = 1.0  # fila de escrita parada por esse tempo: chama tick()
+# ------------------------
+
+_DONE = object()
+
+
+class PipelineStats:
+    def __init__(self):
+        self.fetched = 0
+        self.parsed = 0
+        self.skipped = 0  # parse devolveu None (nada a gravar)
+        self.failed = 0
+        self.seconds = 0.0
+
+    @property
+    def per_second(self):
+        return self.parsed / self.seconds if self.seconds else 0.0
+
+
+def make_pool(workers=PARSE_WORKERS):
+    """
+    Pool do estágio de parse (None com workers=0). Usa "spawn": o fetch e o
+    writer já são threads quando o pool cria processos, e fork com threads
+    rodando pode herdar locks presos.
+    """
+    if workers <= 0:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def fetched_jobs(fetcher, items, url_of=lambda it: it["link"], **extra):
+    """
+    Estágio de fetch a partir de um Fetcher: gera jobs {"url", "body",
+    "encoding", "item", ...extra} (ou {"url", "item", "error"}).
+    """
+    for item, resp, err in fetcher.fetch_all(items, url_of=url_of):
+        if err:
+            yield {"url": url_of(item), "item": item, "error": err}
+        else:
+            yield {"url": url_of(item), "item": item, "body": resp.content, "encoding": resp.encoding, **extra}
+
+
+def parse_post_job(job):
+    """Estágio de parse (roda no processo filho): HTML cru -> dict do post da fonte `job["source"]`."""
+    import scrape_engine
+    from scrape_sources import DEFAULT_SOURCE, get_source
+
+    html = job["body"].decode(job.get("encoding") or "utf-8", errors="replace")
+    item = job["item"]
+    return scrape_engine.build_post(
+        get_source(job.get("source", DEFAULT_SOURCE)),
+        job["url"],
+        html,
+        feed_title=item.get("feed_title"),
+        published_dt=item.get("published"),
+        known_hash=job.get("known_hash"),
+    )
+
+
+def run_pipeline(jobs, parse, write, workers=PARSE_WORKERS, queue_size=QUEUE_SIZE, pool=None, tick=None):
+    """
+    Executa os três estágios até esgotar `jobs` (iterável que faz o I/O; roda
+    numa thread). `parse(job)` precisa ser uma função de módulo (vai para
+    outro processo). `write(job, resultado, erro)` roda sempre na mesma
+    thread, e `tick()` também, quando nada chega por TICK_SECONDS (ex.:
+    BatchWriter.maybe_flush, para posts que chegam devagar não esperarem o
+    próximo). `pool` permite reaproveitar um ProcessPoolExecutor entre
+    chamadas. Devolve PipelineStats.
+    """
+    stats = PipelineStats()
+    fetched = queue.Queue(maxsize=queue_size)
+    parsed = queue.Queue(maxsize=queue_size)
+    errors = []
+    stop = threading.Event()
+    t0 = time.perf_counter()
+
+    def fetch_stage():
+        try:
+            for job in jobs:
+                if stop.is_set():
+                    break
+                fetched.put(job)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            fetched.put(_DONE)
+
+    def write_stage():
+        while True:
+            try:
+                entry = parsed.get(timeout=TICK_SECONDS)
+            except queue.Empty:
+                if tick is not None and not errors:
+                    try:
+                        tick()
+                    except BaseException as e:
+                        errors.append(e)
+                continue
+            if entry is _DONE:
+                return
+            if errors:
+                continue  # outro estágio falhou: só drena a fila
+            try:
+                write(*entry)
+            except BaseException as e:
+                errors.append(e)
+
+    fetch_thread = threading.Thread(target=fetch_stage, name="pipeline-fetch", daemon=True)
+    write_thread = threading.Thread(target=write_stage, name="pipeline-write", daemon=True)
+    fetch_thread.start()
+    write_thread.start()
+
+    def deliver(job, result, err):
+        if err is not None:
+            stats.failed += 1
+        elif result is None:
+            stats.skipped += 1
+        else:
+            stats.parsed += 1
+        parsed.put((job, result, err))
+
+    own_pool = pool is None
+    if own_pool:
+        pool = make_pool(workers)
+    try:
+        max_pending = max(1, workers * 2)
+        pending = {}
+        exhausted = False
+        while not exhausted or pending:
+            # enche o pool até o limite; job com erro de fetch vai direto ao writer
+            while not exhausted and len(pending) < max_pending and not errors:
+                job = fetched.get()
+                if job is _DONE:
+                    exhausted = True
+                    break
+                stats.fetched += 1
+                if "error" in job:
+                    deliver(job, None, job["error"])
+                elif pool is None:
+                    try:
+                        deliver(job, parse(job), None)
+                    except Exception as e:
+                        deliver(job, None, e)
+                else:
+                    pending[pool.submit(parse, job)] = job
+            if errors and not exhausted:
+                # estágio de escrita/fetch falhou: não busca mais nada
+                break
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    job = pending.pop(fut)
+                    err = fut.exception()
+                    deliver(job, None if err else fut.result(), err)
+    finally:
+        if own_pool and pool is not None:
+            pool.shutdown(cancel_futures=True)
+        parsed.put(_DONE)
+        write_thread.join()
+        # interrompido no meio: para o fetch e desbloqueia o put na fila cheia
+        stop.set()
+        while fetch_thread.is_alive():
+            try:
+                fetched.get(timeout=0.1)
+            except queue.Empty:
+                pass
+    stats.seconds = time.perf_counter() - t0
+    if errors:
+        raise errors[0]
+    return stats
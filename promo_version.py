@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# promo_version.py
+# Contador de versão da tabela promocoes: quem escreve incrementa, a API usa
+# para invalidar o cache do /today. A tabela vem do migrate.py (0012); quem
+# chama já conferiu o schema com check_schema.
+
+
+def bump_version(conn):
+    """
+    Incrementa a versão. Chamar depois do commit dos dados: qualquer resposta
+    montada antes disso é descartada pela API na próxima checagem.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO promocoes_version (id, version, updated_at) VALUES (1, 1, NOW())
+        ON CONFLICT (id) DO UPDATE SET
+            version = promocoes_version.version + 1,
+            updated_at = NOW()
+    """
+    )
+    conn.commit()
+    cur.close()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# reprocess.py
+# Recalcula valid_until das promos já gravadas com o detect_valid_until atual
+# e as regras da fonte de cada URL (scrape_sources.py), sem baixar nada de
+# novo. Lê content_text/date_published com um cursor nomeado (servidor),
+# recalcula em processos (pipeline.py) e grava em lote só os valores que
+# mudaram. Memória constante: nada da tabela fica em RAM.
+#
+# Uso:
+#   python reprocess.py                       # recalcula tudo e grava
+#   python reprocess.py --dry-run             # só mostra o que mudaria
+#   python reprocess.py --since 2025-01-01 --diff mudancas.csv
+
+import argparse
+import csv
+import os
+import time
+from datetime import date, datetime, time as dtime
+
+from batch_writer import BatchWriter
+from pipeline import PARSE_WORKERS, run_pipeline
+from scrape_engine import detect_valid_until
+from scrape_sources import source_for_url
+from valid_until import TZ
+
+# -------- CONFIG --------
+READ_ITERSIZE = int(os.getenv("REPROCESS_ITERSIZE", "2000"))  # linhas por ida ao servidor
+CHUNK_ROWS = int(os.getenv("REPROCESS_CHUNK_ROWS", "200"))  # linhas por tarefa de processo
+BATCH_SIZE = int(os.getenv("REPROCESS_BATCH_SIZE", "500"))  # linhas por UPDATE
+SHOW_CHANGES = 20  # mudanças listadas no terminal (o resto só no --diff)
+# ------------------------
+
+# só linhas com data de publicação: sem ela o detector não tem referência e
+# apagaria um valid_until que não consegue recalcular
+SELECT_SQL = """
+    SELECT id, url, date_published, content_text, valid_until
+    FROM promocoes
+    WHERE date_published IS NOT NULL
+      AND (%(since)s::date IS NULL OR date_published >= %(since)s::date)
+    ORDER BY id
+"""
+
+# só grava se valid_until ainda é o valor lido (o scraper pode ter regravado
+# a linha enquanto o job rodava)
+UPDATE_SQL = """
+    UPDATE promocoes p SET valid_until = v.new
+    FROM (VALUES %s) AS v(id, old, new)
+    WHERE p.id = v.id AND p.valid_until IS NOT DISTINCT FROM v.old
+"""
+UPDATE_TEMPLATE = "(%s, %s::timestamptz, %s::timestamptz)"
+
+
+def redetect_chunk(job):
+    """
+    Roda no processo filho: recalcula um lote de linhas e devolve só as que
+    mudaram, como (id, url, date_published, antigo, novo). date_published é
+    DATE: a referência do detector vira meia-noite do dia (o horário do RSS
+    não é gravado).
+    """
+    changed = []
+    for promo_id, url, published, text, old in job["rows"]:
+        new = detect_valid_until(source_for_url(url), text, datetime.combine(published, dtime(), tzinfo=TZ))
+        if new != old:
+            changed.append((promo_id, url, published, old, new))
+    return changed
+
+
+def row_chunks(conn, since=None, itersize=READ_ITERSIZE, chunk_rows=CHUNK_ROWS):
+    """Estágio de leitura: lotes de linhas de um cursor nomeado (só itersize linhas por vez)."""
+    cur = conn.cursor(name="reprocess_valid_until")
+    cur.itersize = itersize
+    cur.execute(SELECT_SQL, {"since": since})
+    try:
+        chunk = []
+        for row in cur:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield {"rows": chunk}
+                chunk = []
+        if chunk:
+            yield {"rows": chunk}
+    finally:
+        cur.close()
+        conn.rollback()
+
+
+class DiffStats:
+    """Resumo das mudanças (contadores; as linhas vão direto para o CSV)."""
+
+    def __init__(self):
+        self.seen = 0
+        self.changed = 0
+        self.set = 0  # None -> data
+        self.cleared = 0  # data -> None
+        self.later = 0
+        self.earlier = 0
+
+    def add(self, old, new):
+        self.changed += 1
+        if old is None:
+            self.set += 1
+        elif new is None:
+            self.cleared += 1
+        elif new > old:
+            self.later += 1
+        else:
+            self.earlier += 1
+
+
+def _fmt(dt):
+    return dt.astimezone(TZ).isoformat() if dt else ""
+
+
+def reprocess(read_conn, write_conn, since=None, dry_run=False, diff_out=None, workers=PARSE_WORKERS, batch_size=BATCH_SIZE):
+    """
+    Recalcula valid_until de todas as linhas (desde `since`). `diff_out`:
+    csv.writer que recebe cada mudança. Devolve (DiffStats, PipelineStats).
+    """
+    stats = DiffStats()
+    writer = None
+    if not dry_run:
+        writer = BatchWriter(
+            write_conn,
+            UPDATE_SQL,
+            lambda d: (d["id"], d["old"], d["new"]),
+            key=lambda d: d["id"],
+            batch_size=batch_size,
+            flush_interval=float("inf"),
+            template=UPDATE_TEMPLATE,
+        )
+
+    def write(job, changed, err):
+        stats.seen += len(job["rows"])
+        if err:
+            print(f"   ❌ Erro no lote a partir do id {job['rows'][0][0]}: {err}")
+            return
+        for promo_id, url, published, old, new in changed:
+            stats.add(old, new)
+            if diff_out is not None:
+                diff_out.writerow([promo_id, url, published, _fmt(old), _fmt(new)])
+            if stats.changed <= SHOW_CHANGES:
+                print(f"   {promo_id}: {_fmt(old) or '-'} → {_fmt(new) or '-'}  {url}")
+            if writer is not None:
+                writer.add({"id": promo_id, "old": old, "new": new})
+
+    try:
+        run_stats = run_pipeline(row_chunks(read_conn, since), redetect_chunk, write, workers=workers)
+    finally:
+        if writer is not None:
+            writer.flush()
+    return stats, run_stats
+
+
+def main():
+    import psycopg2
+    from dotenv import load_dotenv
+
+    from migrate import PostgresBackend, check_schema
+    from promo_version import bump_version
+
+    ap = argparse.ArgumentParser(description="Recalcula valid_until das promos gravadas.")
+    ap.add_argument("--since", type=date.fromisoformat, help="só posts publicados a partir de (AAAA-MM-DD)")
+    ap.add_argument("--dry-run", action="store_true", help="não grava; só relata as mudanças")
+    ap.add_argument("--diff", metavar="ARQUIVO", help="CSV com cada mudança (id, url, date_published, antigo, novo)")
+    ap.add_argument("--workers", type=int, default=PARSE_WORKERS, help="processos de recálculo (0 = sem processos)")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"linhas por UPDATE (padrão {BATCH_SIZE})")
+    args = ap.parse_args()
+
+    load_dotenv()
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise SystemExit("DATABASE_URL não encontrada no .env")
+    # o cursor nomeado vive numa transação própria; os UPDATEs fazem commit na outra conexão
+    read_conn = psycopg2.connect(db_url)
+    write_conn = psycopg2.connect(db_url)
+    check_schema(PostgresBackend(write_conn))
+
+    diff_file = None
+    diff_out = None
+    if args.diff:
+        diff_file = open(args.diff, "w", newline="", encoding="utf-8")
+        diff_out = csv.writer(diff_file)
+        diff_out.writerow(["id", "url", "date_published", "valid_until_antigo", "valid_until_novo"])
+
+    print("🔁 Recalculando valid_until" + (" [dry-run]" if args.dry_run else "") + "...")
+    t0 = time.perf_counter()
+    try:
+        stats, run_stats = reprocess(
+            read_conn, write_conn, since=args.since, dry_run=args.dry_run,
+            diff_out=diff_out, workers=args.workers, batch_size=args.batch_size,
+        )
+    finally:
+        if diff_file is not None:
+            diff_file.close()
+    elapsed = time.perf_counter() - t0
+
+    if stats.changed > SHOW_CHANGES:
+        print(f"   ... mais {stats.changed - SHOW_CHANGES} mudança(s)" + ("" if args.diff else " (use --diff para a lista completa)"))
+    verb = "Mudariam" if args.dry_run else "Mudaram"
+    print(
+        f"📊 {stats.seen} linhas em {elapsed:.1f}s ({stats.seen / elapsed if elapsed else 0:.0f}/s). "
+        f"{verb} {stats.changed}: {stats.set} ganharam data, {stats.cleared} perderam, "
+        f"{stats.later} mais tarde, {stats.earlier} mais cedo."
+    )
+    if run_stats.failed:
+        print(f"   ❌ {run_stats.failed} lote(s) falharam.")
+    if stats.changed and not args.dry_run:
+        bump_version(write_conn)
+    read_conn.close()
+    write_conn.close()
+    print("✅ Concluído.")
+
+
+if __name__ == "__main__":
+    main()
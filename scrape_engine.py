@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+# scrape_engine.py
+# Motor único do coletor, o mesmo para todas as fontes de scrape_sources.py:
+#
+#   feeds (todas as fontes em paralelo) -> posts de hoje -> fetch (um Fetcher
+#   só: pool de threads/sessões HTTP e limite por host compartilhados) ->
+#   parse (pipeline.py; processos com SCRAPER_PARSE_WORKERS > 0) -> um único
+#   BatchWriter
+#
+# scrape_passageiro.py e scrape_and_clean.py rodam este motor; backfill.py e
+# reprocess.py usam as mesmas peças (build_post, batch_writer, detect_valid_until).
+#
+# Uso:
+#   python scrape_engine.py                       # fontes habilitadas (SCRAPER_SOURCES)
+#   python scrape_engine.py --source passageiro   # só as escolhidas (repetível)
+#   python scrape_engine.py --list                # fontes declaradas
+
+import argparse
+import os
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Optional
+
+# requests, feedparser, psycopg2, dateutil, dateparser e o parser de HTML
+# são importados no primeiro uso (check_importtime.py)
+import scrape_metrics
+from batch_writer import BatchWriter
+from content_store import write_content
+from fetcher import Fetcher
+from fingerprint import cluster_duplicates, content_hash, known_hashes, simhash
+from http_cache import open_cache
+from pipeline import parse_post_job, run_pipeline
+from promo_version import bump_version
+from scrape_sources import all_sources, enabled_sources
+from url_store import UrlStore
+from valid_until import DETECTOR, HIGH_PRIORITY_PHRASES, TZ, ValidUntilDetector
+
+# -------- CONFIG --------
+DEBUG = False   # <-- ative True para debugar posts específicos
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120 Safari/537.36"
+)
+RATE_SECONDS = float(os.getenv("SCRAPER_RATE_SECONDS", "1.5"))  # intervalo mínimo entre requests ao mesmo host
+REQUEST_TIMEOUT = 20
+CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "4"))  # downloads simultâneos, somando todas as fontes
+BATCH_SIZE = int(os.getenv("SCRAPER_BATCH_SIZE", "50"))  # posts por INSERT em lote
+BATCH_FLUSH_SECONDS = float(os.getenv("SCRAPER_BATCH_FLUSH_SECONDS", "10"))  # flush mesmo com lote incompleto
+# poucos posts por rodada: processos só compensam em coletas grandes
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", "0"))
+# fallback de datas (Source.date_fallback) com o dateparser
+DATEPARSER_SETTINGS = {
+    "PREFER_DATES_FROM": "future",
+    "DATE_ORDER": "DMY",
+    "RETURN_AS_TIMEZONE_AWARE": True,
+}
+# ------------------------
+
+_PARSER = None
+
+
+def get_page_parser():
+    """Backend de parsing (SCRAPER_PARSER=bs4 | bs4-lxml | lxml), criado no primeiro uso."""
+    global _PARSER
+    if _PARSER is None:
+        from page_parser import get_parser
+
+        _PARSER = get_parser()
+    return _PARSER
+
+
+# -------- DB --------
+def db_connect():
+    # .env e DATABASE_URL só são lidos quando alguém conecta, não na importação
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise RuntimeError("DATABASE_URL não encontrado no .env")
+    return psycopg2.connect(db_url)
+
+
+def init_db():
+    """Conexão para a coleta; recusa banco com migração pendente (python migrate.py)."""
+    from migrate import PostgresBackend, check_schema
+
+    conn = db_connect()
+    check_schema(PostgresBackend(conn))
+    return conn
+
+
+# imagens e links vão para post_images/post_links (url_store.py) e o HTML
+# para promocoes_content (content_store.py); o JSON e o HTML antigos da
+# linha são apagados quando ela é reescrita
+UPSERT_SQL = """
+    INSERT INTO promocoes
+        (url, title, date_published, author, content_text, scraped_at, valid_until,
+         content_hash, simhash)
+    VALUES %s
+    ON CONFLICT (url) DO UPDATE SET
+        title = EXCLUDED.title,
+        date_published = EXCLUDED.date_published,
+        author = EXCLUDED.author,
+        content_text = EXCLUDED.content_text,
+        content_html = NULL,
+        images_json = NULL,
+        links_json = NULL,
+        scraped_at = EXCLUDED.scraped_at,
+        valid_until = EXCLUDED.valid_until,
+        content_hash = EXCLUDED.content_hash,
+        simhash = EXCLUDED.simhash
+    -- mesmo conteúdo já gravado: não reescreve a linha
+    WHERE promocoes.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+    RETURNING id, url
+"""
+
+
+def _post_row(data: dict):
+    return (
+        data.get("url"),
+        data.get("title"),
+        data.get("date_published"),
+        data.get("author"),
+        data.get("content_text"),
+        datetime.now(TZ),
+        data.get("valid_until"),
+        data.get("content_hash"),
+        data.get("simhash"),
+    )
+
+
+def _after_write(urls):
+    """Gancho do BatchWriter: imagens/links e HTML das linhas gravadas, na mesma transação."""
+    def after_write(cur, returned, written):
+        by_url = {d["url"]: d for d in written}
+        posts = [(post_id, by_url[url]) for post_id, url in returned if url in by_url]
+        urls.write_refs(cur, posts)
+        write_content(cur, posts)
+    return after_write
+
+
+@scrape_metrics.timed("upsert")
+def upsert_post(conn, data: dict):
+    from psycopg2.extras import execute_values
+
+    cur = conn.cursor()
+    returned = execute_values(cur, UPSERT_SQL, [_post_row(data)], fetch=True)
+    _after_write(UrlStore())(cur, returned, [data])
+    conn.commit()
+
+
+def batch_writer(conn):
+    """Writer em lote: um INSERT multi-linha + um commit por flush. Serve a todas as fontes."""
+    urls = UrlStore()
+    return BatchWriter(
+        conn,
+        UPSERT_SQL,
+        _post_row,
+        batch_size=BATCH_SIZE,
+        flush_interval=BATCH_FLUSH_SECONDS,
+        # avisa a API (cache do /today) que houve escrita
+        on_flush=lambda n: n and bump_version(conn),
+        # imagens/links e HTML das linhas gravadas, na mesma transação
+        after_write=_after_write(urls),
+        on_rollback=urls.rollback,
+    )
+
+
+# -------- DATAS --------
+_DETECTORS = {}  # fonte -> ValidUntilDetector com as frases dela
+
+
+def _detector(source):
+    if not source.valid_until_phrases:
+        return DETECTOR
+    detector = _DETECTORS.get(source.name)
+    if detector is None:
+        detector = _DETECTORS[source.name] = ValidUntilDetector(
+            high_priority_phrases=list(HIGH_PRIORITY_PHRASES) + list(source.valid_until_phrases)
+        )
+    return detector
+
+
+def search_valid_until(text, published_dt, languages=("pt",)):
+    """
+    Fallback das fontes com date_fallback: primeira data que o dateparser
+    acha no texto, relativa a published_dt. Só nos idiomas da fonte: sem
+    `languages` ele testa todos os locales (~100 ms por texto em vez de ~5).
+    """
+    if not text or not published_dt:
+        return None
+    from dateparser.search import search_dates
+
+    txt = unicodedata.normalize("NFKC", text.lower())
+    txt = re.sub(r"\s+", " ", txt).strip()
+    try:
+        found = search_dates(
+            txt, languages=list(languages), settings={**DATEPARSER_SETTINGS, "RELATIVE_BASE": published_dt}
+        )
+    except Exception:
+        return None
+    for _, cand in found or ():
+        if cand:
+            return cand.astimezone(TZ)
+    return None
+
+
+@scrape_metrics.timed("detect")
+def detect_valid_until(source, content_text: str, published_dt: Optional[datetime], debug: bool = False):
+    """valid_until pelas regras do valid_until.py (+ frases da fonte) e, se a fonte pedir, o dateparser."""
+    valid_until = _detector(source).detect(content_text, published_dt, debug=debug)
+    if valid_until is None and source.date_fallback:
+        valid_until = search_valid_until(content_text, published_dt, source.date_languages)
+    return valid_until
+
+
+def entry_published(entry) -> Optional[datetime]:
+    """Data de publicação de um item do feed (published_parsed ou o texto de published)."""
+    if hasattr(entry, "published_parsed") and entry.published_parsed:
+        try:
+            # o feedparser normaliza published_parsed para UTC
+            return datetime(*entry.published_parsed[:6], tzinfo=timezone.utc).astimezone(TZ)
+        except Exception:
+            pass
+    if hasattr(entry, "published"):
+        from dateutil import parser as dateparser
+
+        try:
+            dt = dateparser.parse(entry.published)
+            return dt.astimezone(TZ) if dt.tzinfo else dt.replace(tzinfo=TZ)
+        except Exception:
+            pass
+    return None
+
+
+# -------- POSTS --------
+@scrape_metrics.timed("parse")
+def build_post(
+    source,
+    url,
+    html: str,
+    feed_title=None,
+    published_dt: Optional[datetime] = None,
+    known_hash: Optional[str] = None,
+):
+    """
+    Parse, hashes e valid_until de um post de `source`, sem rede nem banco:
+    roda também nos processos do pipeline.py. Devolve None quando o
+    conteúdo tem o mesmo hash já gravado (`known_hash`).
+    """
+    page = get_page_parser().parse(html, url, source.site, source.content_selectors)
+
+    title = page["title"]
+    if not title and feed_title:
+        title = feed_title
+    if not title:
+        title = "Sem título"
+
+    # published_dt (prioridade: parâmetro > meta tag)
+    if not published_dt and page["published_meta"]:
+        from dateutil import parser as dateparser
+
+        try:
+            dt = dateparser.parse(page["published_meta"])
+            if dt.tzinfo:
+                published_dt = dt.astimezone(TZ)
+            else:
+                published_dt = dt.replace(tzinfo=TZ)
+        except Exception:
+            published_dt = None
+
+    content_text = page["content_text"]
+    data = {
+        "url": url,
+        "source": source.name,
+        "title": title,
+        "date_published": published_dt.date() if published_dt else None,
+        "author": page["author"],
+        "content_text": content_text,
+        "content_html": page["content_html"],
+        "images": page["images"],
+        "links": page["links"],
+    }
+    data["content_hash"] = content_hash(data)
+    if known_hash is not None:
+        scrape_metrics.cache_result("content_hash", data["content_hash"] == known_hash)
+        if data["content_hash"] == known_hash:
+            return None
+    data["simhash"] = simhash(content_text)
+
+    # validade (usa published_dt — que vem do RSS quando possível)
+    valid_until = detect_valid_until(source, content_text, published_dt, debug=DEBUG)
+
+    if DEBUG:
+        print("DEBUG published_dt:", published_dt)
+        print("DEBUG content snippet:", content_text[:400])
+        print("DEBUG detected valid_until:", valid_until)
+
+    data["valid_until"] = valid_until
+    return data
+
+
+def feed_items(source, content, day=None):
+    """Itens do feed publicados em `day` (padrão: hoje), sem repetir link."""
+    import feedparser
+
+    feed = feedparser.parse(content)
+    day = day or datetime.now(TZ).date()
+    items = []
+    seen = set()
+    for entry in feed.entries:
+        pub_dt = entry_published(entry)
+        if pub_dt and pub_dt.date() == day and entry.link not in seen:
+            seen.add(entry.link)
+            items.append(
+                {"link": entry.link, "feed_title": getattr(entry, "title", None), "published": pub_dt,
+                 "source": source.name}
+            )
+    return items
+
+
+# -------- RODADA --------
+class SourceStats:
+    def __init__(self):
+        self.found = 0
+        self.saved = 0
+        self.unchanged = 0  # página igual no cache HTTP (contado na thread de fetch)
+        self.skipped = 0  # conteúdo com o mesmo hash já gravado
+        self.failed = 0
+
+
+def run(sources, conn=None, cache=None, workers=PARSE_WORKERS):
+    """
+    Uma rodada de coleta das `sources`: os feeds de todas em paralelo e
+    depois os posts de hoje de todas pelo mesmo Fetcher (cada host no seu
+    ritmo) até um único BatchWriter. Sem `conn`, abre uma com init_db() só
+    se houver post novo. Devolve {nome da fonte: SourceStats}.
+    """
+    stats = {s.name: SourceStats() for s in sources}
+    by_name = {s.name: s for s in sources}
+    with Fetcher(
+        headers={"User-Agent": USER_AGENT},
+        timeout=REQUEST_TIMEOUT,
+        rate_seconds=RATE_SECONDS,
+        concurrency=CONCURRENCY,
+        cache=cache,
+    ) as fetcher:
+        for s in sources:
+            if s.rate_seconds is not None:
+                fetcher.limiter.set_rate(s.site, s.rate_seconds)
+
+        items = []
+        for source, resp, err in fetcher.fetch_all(sources, url_of=lambda s: s.feed_url):
+            if err:
+                stats[source.name].failed += 1
+                print(f"[{source.name}] ❌ Erro no feed: {err}")
+                continue
+            if cache is not None and cache.is_unchanged(source.feed_url, resp):
+                print(f"[{source.name}] Feed sem alterações.")
+                continue
+            found = feed_items(source, resp.content)
+            if cache is not None:
+                # persistido só depois que os posts do feed forem gravados (commit_feeds)
+                cache.stage(source.feed_url, resp)
+            stats[source.name].found = len(found)
+            print(f"[{source.name}] {len(found)} post(s) de hoje.")
+            items.extend(found)
+
+        def commit_feeds():
+            # fonte com falha: o feed fica sem validadores novos e é relido na próxima execução
+            if cache is not None:
+                for s in sources:
+                    if stats[s.name].failed:
+                        cache.discard(s.feed_url)
+                    else:
+                        cache.commit(s.feed_url)
+
+        if not items:
+            commit_feeds()
+            return stats
+
+        own_conn = conn is None
+        if own_conn:
+            conn = init_db()
+        try:
+            # o BatchWriter já fez o último flush quando _collect volta
+            _collect(conn, fetcher, items, by_name, stats, cache, workers)
+            commit_feeds()
+            if any(st.saved for st in stats.values()):
+                clustered = cluster_duplicates(conn)
+                if clustered:
+                    bump_version(conn)
+                    print(f"🔗 {clustered} post(s) agrupados como quase duplicados.")
+        finally:
+            if own_conn:
+                conn.close()
+    return stats
+
+
+def _collect(conn, fetcher, items, by_name, stats, cache, workers):
+    """fetch (threads) -> parse (pipeline.py) -> BatchWriter, para os itens de todas as fontes."""
+    known = known_hashes(conn, [it["link"] for it in items])
+
+    def jobs():
+        results = fetcher.fetch_all(
+            items, url_of=lambda it: it["link"], headers_of=lambda it: {"Referer": by_name[it["source"]].site}
+        )
+        for it, resp, err in results:
+            url = it["link"]
+            if err:
+                yield {"url": url, "item": it, "error": err}
+                continue
+            if cache is not None:
+                if cache.is_unchanged(url, resp):
+                    stats[it["source"]].unchanged += 1
+                    print(f"[{it['source']}] ⏭️  Sem alterações desde a última coleta: {url}")
+                    continue
+                # persistido no cache só depois de gravado (cache.commit)
+                cache.stage(url, resp)
+            yield {
+                "url": url,
+                "source": it["source"],
+                "item": it,
+                "body": resp.content,
+                "encoding": resp.encoding,
+                "known_hash": known.get(url),
+            }
+
+    def on_saved(data, err):
+        # chamado pelo BatchWriter quando o lote do post é gravado (ou falha)
+        st = stats[data["source"]]
+        if err:
+            st.failed += 1
+            print(f"[{data['source']}] ❌ Erro ao gravar {data.get('url')}: {err}")
+            if cache is not None:
+                cache.discard(data["url"])
+            return
+        if cache is not None:
+            cache.commit(data["url"])
+        st.saved += 1
+        print(f"[{data['source']}] ✅ Salvo: {data.get('title')}")
+        if data.get("valid_until"):
+            print(f"      ↳ expira em: {data['valid_until'].isoformat()}")
+
+    with batch_writer(conn) as writer:
+        def write(job, data, err):
+            name = job["item"]["source"]
+            if err:
+                stats[name].failed += 1
+                print(f"[{name}] ❌ Erro em {job['url']}: {err}")
+                if cache is not None:
+                    cache.discard(job["url"])
+            elif data is None:
+                stats[name].skipped += 1
+                print(f"[{name}] ⏭️  Conteúdo igual ao já gravado: {job['url']}")
+                if cache is not None:
+                    cache.commit(job["url"])
+            else:
+                writer.add(data, on_done=on_saved)
+
+        run_pipeline(jobs(), parse_post_job, write, workers=workers, tick=writer.maybe_flush)
+
+
+def collect(sources, conn=None, workers=PARSE_WORKERS):
+    """run() com o cache HTTP e o resumo por fonte no terminal. Devolve os totais (para scrape_metrics.finish)."""
+    print(f"Iniciando coleta: {', '.join(s.name for s in sources)} (posts de hoje)...")
+    cache = open_cache()
+    try:
+        stats = run(sources, conn=conn, cache=cache, workers=workers)
+    finally:
+        if cache is not None:
+            cache.close()
+    totals = {"found": 0, "saved": 0, "skipped": 0, "failed": 0}
+    for name, st in stats.items():
+        skipped = st.unchanged + st.skipped
+        print(f"[{name}] {st.found} de hoje, {st.saved} salvos, {skipped} sem alterações, {st.failed} falhas.")
+        totals["found"] += st.found
+        totals["saved"] += st.saved
+        totals["skipped"] += skipped
+        totals["failed"] += st.failed
+    return totals
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Coleta os posts de hoje das fontes de scrape_sources.py.")
+    ap.add_argument("--source", action="append", help="fonte a coletar (repetível; padrão: SCRAPER_SOURCES ou todas)")
+    ap.add_argument("--workers", type=int, default=PARSE_WORKERS, help="processos de parse (0 = sem processos)")
+    ap.add_argument("--list", action="store_true", help="lista as fontes declaradas e sai")
+    args = ap.parse_args()
+
+    if args.list:
+        for s in all_sources().values():
+            print(f"{'✅' if s.enabled else '⏸️ '} {s.name:<20} {s.feed_url}")
+        return
+    totals = collect(enabled_sources(args.source), workers=args.workers)
+    scrape_metrics.finish("scrape_engine", **totals)
+
+
+if __name__ == "__main__":
+    main()
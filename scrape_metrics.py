@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# scrape_metrics.py
+# Métricas das coletas: tempo por etapa (fetch, extract, parse, detect,
+# upsert, write, archive), bytes baixados, respostas HTTP e acertos de
+# cache. Cada execução termina com um resumo JSON (SCRAPER_SUMMARY_PATH). Com
+# prometheus_client instalado, as mesmas métricas podem ir para o textfile
+# collector do node_exporter (SCRAPER_METRICS_TEXTFILE) e/ou para um
+# Pushgateway (SCRAPER_PUSHGATEWAY): a coleta é um processo curto, não fica
+# no ar para ser raspada.
+#
+# Etapas medidas dentro dos processos do pipeline.py (spawn) ficam nesses
+# processos e não entram no resumo.
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# -------- CONFIG --------
+_DIR = os.path.dirname(os.path.abspath(__file__))
+# {job} = nome da coleta (scrape_passageiro, backfill, ...); vazio desativa
+SUMMARY_PATH = os.getenv("SCRAPER_SUMMARY_PATH", os.path.join(_DIR, "run_summary_{job}.json"))
+TEXTFILE_PATH = os.getenv("SCRAPER_METRICS_TEXTFILE", "")  # ex.: /var/lib/node_exporter/textfile/{job}.prom
+PUSHGATEWAY = os.getenv("SCRAPER_PUSHGATEWAY", "")  # ex.: localhost:9091
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# ------------------------
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[k]
+
+
+class RunMetrics:
+    """Acumula as medições de uma execução (thread-safe: o Fetcher baixa em threads)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}  # etapa -> [segundos]
+        self.counters = {}  # nome -> int
+        self.registry = None
+        if TEXTFILE_PATH or PUSHGATEWAY:
+            self._init_prometheus()
+
+    def _init_prometheus(self):
+        # importado só com exportação configurada (~90 ms de import)
+        try:
+            from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+        except ImportError:
+            print("⚠️  prometheus_client não instalado: só o resumo JSON")
+            return
+        # registry próprio: só as métricas da coleta vão para o textfile/Pushgateway
+        self.registry = CollectorRegistry()
+        self._stage_hist = Histogram(
+            "scraper_stage_seconds", "Duração de cada etapa da coleta", ["stage"],
+            buckets=STAGE_BUCKETS, registry=self.registry,
+        )
+        self._bytes = Counter("scraper_fetched_bytes", "Bytes baixados", registry=self.registry)
+        self._responses = Counter(
+            "scraper_http_responses", "Respostas HTTP por status", ["status"], registry=self.registry
+        )
+        self._cache = Counter(
+            "scraper_cache", "Consultas aos caches (http = 304/mesmo corpo, content_hash = post já gravado)",
+            ["cache", "result"], registry=self.registry,
+        )
+        self._rows = Counter("scraper_rows_written", "Linhas gravadas pelo BatchWriter", registry=self.registry)
+        self._results = Gauge(
+            "scraper_last_run_posts", "Posts da última execução por resultado", ["result"], registry=self.registry
+        )
+        self._last_run = Gauge(
+            "scraper_last_run_timestamp_seconds", "Fim da última execução", registry=self.registry
+        )
+        self._duration = Gauge("scraper_last_run_duration_seconds", "Duração da última execução", registry=self.registry)
+
+    def _inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.stages.setdefault(stage, []).append(seconds)
+        if self.registry is not None:
+            self._stage_hist.labels(stage).observe(seconds)
+
+    def fetched(self, resp):
+        size = len(resp.content or b"")
+        self._inc("fetched_bytes", size)
+        self._inc(f"http_{resp.status_code}")
+        if self.registry is not None:
+            self._bytes.inc(size)
+            self._responses.labels(str(resp.status_code)).inc()
+
+    def cache_result(self, cache, hit):
+        result = "hit" if hit else "miss"
+        self._inc(f"cache_{cache}_{result}")
+        if self.registry is not None:
+            self._cache.labels(cache, result).inc()
+
+    def rows_written(self, n):
+        self._inc("rows_written", n)
+        if self.registry is not None:
+            self._rows.inc(n)
+
+    def summary(self, job, **results):
+        with self._lock:
+            stages = {
+                name: {
+                    "count": len(v),
+                    "total_s": round(sum(v), 4),
+                    "p50_ms": round(_percentile(v, 50) * 1000, 2),
+                    "p95_ms": round(_percentile(v, 95) * 1000, 2),
+                    "max_ms": round(max(v) * 1000, 2),
+                }
+                for name, v in self.stages.items()
+            }
+            counters = dict(self.counters)
+        return {
+            "job": job,
+            "started_at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "duration_s": round(time.time() - self.started, 3),
+            "results": results,
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def finish(self, job, **results):
+        """Fim da execução: grava o resumo JSON e exporta para Prometheus (se configurado)."""
+        data = self.summary(job, **results)
+        if SUMMARY_PATH:
+            path = SUMMARY_PATH.format(job=job)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)  # quem lê nunca vê um arquivo pela metade
+            print(f"📊 Resumo da execução em {path}")
+        if self.registry is not None:
+            for name, n in results.items():
+                self._results.labels(name).set(n)
+            self._last_run.set_to_current_time()
+            self._duration.set(data["duration_s"])
+            try:
+                if TEXTFILE_PATH:
+                    from prometheus_client import write_to_textfile
+
+                    write_to_textfile(TEXTFILE_PATH.format(job=job), self.registry)
+                if PUSHGATEWAY:
+                    from prometheus_client import push_to_gateway
+
+                    push_to_gateway(PUSHGATEWAY, job=job, registry=self.registry)
+            except Exception as e:
+                # métrica não pode derrubar a coleta
+                print(f"⚠️  Falha ao exportar métricas: {e}")
+        return data
+
+
+RUN = RunMetrics()
+
+
+@contextmanager
+def stage(name):
+    """`with stage("fetch"): ...` mede o bloco (também quando levanta exceção)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        RUN.observe(name, time.perf_counter() - t0)
+
+
+def timed(name):
+    """Decorator: mede cada chamada da função como a etapa `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def fetched(resp):
+    RUN.fetched(resp)
+
+
+def cache_result(cache, hit):
+    RUN.cache_result(cache, hit)
+
+
+def rows_written(n):
+    RUN.rows_written(n)
+
+
+def finish(job, **results):
+    return RUN.finish(job, **results)
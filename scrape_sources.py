@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# scrape_sources.py
+# Fontes do coletor. Cada blog declara o feed, os seletores do conteúdo e as
+# regras de data; o motor (scrape_engine.py) é o mesmo para todas. Um blog
+# novo é uma entrada em BUILTIN ou no JSON de SCRAPER_SOURCES_FILE, não
+# outro script.
+#
+# SCRAPER_SOURCES_FILE é uma lista de objetos com os argumentos de Source;
+# uma entrada com o nome de uma embutida a substitui:
+#   [
+#     {"name": "outro-blog", "site": "https://www.exemplo.com.br",
+#      "content_selectors": ["div.post-body", "article"],
+#      "valid_until_phrases": ["resgate até"], "rate_seconds": 3}
+#   ]
+
+import json
+import os
+
+# -------- CONFIG --------
+SOURCES_FILE = os.getenv("SCRAPER_SOURCES_FILE", "")
+ENABLED = os.getenv("SCRAPER_SOURCES", "")  # nomes separados por vírgula; vazio = todas as habilitadas
+DEFAULT_SOURCE = "passageiro"  # backfill e jobs do pipeline sem "source"
+# ------------------------
+
+
+class Source:
+    """
+    Declaração de uma fonte. Só `name` e `site` são obrigatórios: um blog
+    WordPress típico funciona com o feed em /feed/ e os seletores padrão do
+    page_parser.
+
+    - feed_url: RSS (padrão: site + "/feed/")
+    - content_selectors: seletores CSS do corpo do post, tentados em ordem
+      (padrão: page_parser.CONTENT_SELECTORS)
+    - valid_until_phrases: frases extras de alta prioridade para o detector
+      de validade (ex.: "resgate até")
+    - date_fallback: quando as regras do valid_until.py não acham a data,
+      procura datas no texto com o dateparser (mais lento)
+    - date_languages: idiomas do dateparser (fallback acima e datas do feed)
+    - rate_seconds: intervalo mínimo entre requests ao host (padrão: o global)
+    - enabled: False deixa a fonte fora da coleta sem apagar a declaração
+    """
+
+    def __init__(
+        self,
+        name,
+        site,
+        feed_url=None,
+        content_selectors=None,
+        valid_until_phrases=(),
+        date_fallback=False,
+        date_languages=("pt",),
+        rate_seconds=None,
+        enabled=True,
+    ):
+        self.name = name
+        self.site = site.rstrip("/")
+        self.feed_url = feed_url or self.site + "/feed/"
+        self.content_selectors = list(content_selectors) if content_selectors else None
+        self.valid_until_phrases = tuple(valid_until_phrases)
+        self.date_fallback = date_fallback
+        self.date_languages = list(date_languages)
+        self.rate_seconds = rate_seconds
+        self.enabled = enabled
+
+    def __repr__(self):
+        return f"Source({self.name!r}, {self.site!r})"
+
+
+BUILTIN = [
+    Source(DEFAULT_SOURCE, os.getenv("SCRAPER_SITE", "https://passageirodeprimeira.com")),
+]
+
+_SOURCES = None
+
+
+def all_sources():
+    """{nome: Source}: as embutidas e as do SCRAPER_SOURCES_FILE (lido uma vez por processo)."""
+    global _SOURCES
+    if _SOURCES is None:
+        sources = {s.name: s for s in BUILTIN}
+        if SOURCES_FILE:
+            with open(SOURCES_FILE, encoding="utf-8") as f:
+                for spec in json.load(f):
+                    source = Source(**spec)
+                    sources[source.name] = source
+        _SOURCES = sources
+    return _SOURCES
+
+
+def get_source(name):
+    sources = all_sources()
+    try:
+        return sources[name]
+    except KeyError:
+        raise ValueError(f"fonte desconhecida: {name!r} (use {', '.join(sources)})")
+
+
+def source_for_url(url):
+    """Fonte dona de `url` (mesmo host do site, sem "www."), ou a padrão."""
+    from url_store import url_host
+
+    host = url_host(url)
+    for source in all_sources().values():
+        if url_host(source.site) == host:
+            return source
+    return get_source(DEFAULT_SOURCE)
+
+
+def enabled_sources(names=None):
+    """Fontes a coletar: `names`, senão SCRAPER_SOURCES, senão todas com enabled=True."""
+    names = names or [n.strip() for n in ENABLED.split(",") if n.strip()]
+    if names:
+        return [get_source(n) for n in names]
+    return [s for s in all_sources().values() if s.enabled]
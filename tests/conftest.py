@@ -0,0 +1,9 @@
+# tests/conftest.py
+# Os módulos do coletor ficam na raiz do repositório (scripts soltos, sem
+# pacote): a raiz entra no sys.path para os testes importarem como os scripts.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
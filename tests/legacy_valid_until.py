@@ -0,0 +1,305 @@
+# tests/legacy_valid_until.py
+# Detector de validade do scrape_passageiro.py original (commit baseline),
+# copiado sem alterações: referência do golden test do valid_until.py.
+# Não é usado pelo coletor.
+
+import re
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Optional, List
+
+from dateutil import parser as dateparser
+
+DEBUG = False
+TZ = ZoneInfo("America/Sao_Paulo")
+
+
+PT_MONTHS = {
+    "janeiro": 1,
+    "fevereiro": 2,
+    "março": 3,
+    "marco": 3,
+    "abril": 4,
+    "maio": 5,
+    "junho": 6,
+    "julho": 7,
+    "agosto": 8,
+    "setembro": 9,
+    "outubro": 10,
+    "novembro": 11,
+    "dezembro": 12,
+}
+PT_WEEKDAYS = {
+    "segunda": 0,
+    "segunda-feira": 0,
+    "terça": 1,
+    "terca": 1,
+    "terça-feira": 1,
+    "terca-feira": 1,
+    "quarta": 2,
+    "quarta-feira": 2,
+    "quinta": 3,
+    "quinta-feira": 3,
+    "sexta": 4,
+    "sexta-feira": 4,
+    "sábado": 5,
+    "sabado": 5,
+    "domingo": 6,
+}
+
+# palavras que tipicamente aparecem perto da validade
+PROMO_KEYWORDS = [
+    "promo", "promoção", "promoções", "válida", "válido", "válidos", "mecânica",
+    "oferta", "campanha", "últimas horas", "últimas", "só até", "até amanhã",
+    "até hoje", "somente até", "período de compra", "período de emissão", "oferta válida",
+    "reservas", "período de compra:"
+]
+
+HIGH_PRIORITY_PHRASES = [
+    "oferta válida", "promoção válida", "período de compra", "período de emissão",
+    "reserva", "reservas", "período de compra:", "oferta válida até", "oferta válida até"
+]
+
+
+def _to_int(s, default=None):
+    try:
+        return int(s)
+    except Exception:
+        return default
+
+
+def _mk_dt(base_date: datetime, day=None, month=None, year=None, hour=None, minute=None, second=0):
+    y = year if year else base_date.year
+    m = month if month else base_date.month
+    d = day if day else base_date.day
+
+    # sanitização de hora/minuto
+    h = 23 if hour is None else hour
+    mi = 59 if minute is None else minute
+    if h < 0 or h > 23:
+        h = 23
+    if mi < 0 or mi > 59:
+        mi = 59
+
+    s = 59 if (hour is None and minute is None and second == 0) else (second or 0)
+    return datetime(y, m, d, h, mi, s, tzinfo=TZ)
+
+
+
+def _next_weekday_on_or_after(base_date: datetime, target_wd: int):
+    delta = (target_wd - base_date.weekday()) % 7
+    return base_date if delta == 0 else (base_date + timedelta(days=delta))
+
+
+def _candidate_paragraphs(content_text: str) -> List[str]:
+    """Retorna parágrafos candidatos, priorizando parágrafos com frases de alta prioridade."""
+    paras = [p.strip() for p in content_text.split("\n\n") if p.strip()]
+    priority = []
+    normal = []
+    for p in paras:
+        low = p.lower()
+        if any(phrase in low for phrase in HIGH_PRIORITY_PHRASES):
+            priority.append(p)
+        elif "até" in low and any(k in low for k in PROMO_KEYWORDS):
+            normal.append(p)
+        elif any(k in low for k in PROMO_KEYWORDS):
+            normal.append(p)
+    if priority:
+        return priority + normal
+    if normal:
+        return normal
+    # fallback: primeiros 8 parágrafos (para não perder nada)
+    return paras[:8]
+
+
+def _parse_date_from_text_snippet(txt: str, base_date: datetime) -> Optional[datetime]:
+    """
+    Tenta extrair uma data/hora de um snippet. Trata também UTC offsets se presentes.
+    Retorna datetime timezone-aware em TZ.
+    """
+    txt_low = txt.lower()
+    txt_low = re.sub(r"\s+", " ", txt_low).strip()
+
+    def to_int(s):
+        try:
+            return int(s)
+        except Exception:
+            return None
+
+    # detect tz in snippet like "utc+3" or "utc+03:00"
+    tz_match = re.search(r"utc\s*([+-]\d{1,2})(?::?(\d{2}))?", txt_low)
+    tz_offset_hours = None
+    if tz_match:
+        try:
+            tz_offset_hours = int(tz_match.group(1))
+        except Exception:
+            tz_offset_hours = None
+
+    # 1) patterns like "até amanhã (7)" or "até amanhã" with optional time
+    m = re.search(r"até\s+amanh[ãa]\s*(?:\((\d{1,2})\))?(?:.*?(?:às|a)\s*(\d{1,2})(?::(\d{2}))?)?", txt_low)
+    if m:
+        paren_day = to_int(m.group(1))
+        hh = _to_int(m.group(2))
+        mm = _to_int(m.group(3))
+        next_day_date = (base_date + timedelta(days=1)).date()
+        if paren_day:
+            # prefer the parenthetical day if provided
+            try:
+                dt = datetime(base_date.year, base_date.month, paren_day, 0, 0, 0)
+                dt = dt.replace(tzinfo=TZ)
+            except Exception:
+                dt = _mk_dt(base_date + timedelta(days=1), hour=hh, minute=mm, second=0)
+        else:
+            dt = _mk_dt(base_date + timedelta(days=1), hour=hh, minute=mm, second=0)
+        # if snippet included UTC offset, convert
+        if tz_offset_hours is not None:
+            dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+        return dt
+
+    # 2) patterns like "até hoje [às HH[:MM]]"
+    m = re.search(r"até\s+hoje\b(?:.*?(?:às|a)\s*(\d{1,2})(?::(\d{2}))?)?", txt_low)
+    if m:
+        hh = _to_int(m.group(1))
+        mm = _to_int(m.group(2))
+        dt = _mk_dt(base_date, hour=hh, minute=mm, second=0)
+        if tz_offset_hours is not None:
+            dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+        return dt
+
+    # 3) explicit dd/mm[/yyyy] optionally with time
+    m = re.search(r"(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?(?:.*?(?:às|a)\s*(\d{1,2})(?::(\d{2}))?)?", txt_low)
+    if m:
+        d = _to_int(m.group(1))
+        mo = _to_int(m.group(2))
+        y = _to_int(m.group(3))
+        if y and y < 100:
+            y += 2000
+        y = y or base_date.year
+        hh = _to_int(m.group(4))
+        mm = _to_int(m.group(5))
+        if 1 <= d <= 31 and 1 <= mo <= 12:
+            dt = datetime(y, mo, d, hh or 23, mm or 59, 0, tzinfo=TZ)
+            if tz_offset_hours is not None:
+                # dt currently in TZ local; convert from specified UTC offset to TZ
+                # build dt in that UTC offset first:
+                dt_offset = datetime(y, mo, d, hh or 23, mm or 59, 0, tzinfo=timezone(timedelta(hours=tz_offset_hours)))
+                dt = dt_offset.astimezone(TZ)
+            return dt
+
+    # 4) "até dia 17 de setembro [de 2025] [às HH:MM]" or "válida até dia 17 de setembro"
+    m = re.search(
+        r"(?:v[aá]lid[ao]s?\s*)?até\s+(?:o\s+)?(?:dia\s+)?(\d{1,2})(?:\s+de\s+([a-zçãéôíóú]+)(?:\s+de\s+(\d{4}))?)?(?:.*?(?:às|a)\s*(\d{1,2})(?::(\d{2}))?)?",
+        txt_low,
+    )
+    if m:
+        d = _to_int(m.group(1))
+        mon_name = (m.group(2) or "").lower()
+        mo = PT_MONTHS.get(mon_name) if mon_name else base_date.month
+        y = _to_int(m.group(3)) or base_date.year
+        hh = _to_int(m.group(4))
+        mm = _to_int(m.group(5))
+        if d and 1 <= d <= 31 and 1 <= mo <= 12:
+            dt = datetime(y, mo, d, hh or 23, mm or 59, 0, tzinfo=TZ)
+            if tz_offset_hours is not None:
+                dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+            return dt
+
+    # 5) "até domingo (7)" or "até o domingo (7)" or "até domingo"
+    m = re.search(r"até\s+(?:o\s+|deste\s+)?([a-zçãéôíóú]+)(?:\s*\((\d{1,2})\))?", txt_low)
+    if m:
+        wd_name = (m.group(1) or "").lower()
+        paren_day = _to_int(m.group(2))
+        if wd_name in PT_WEEKDAYS:
+            if paren_day:
+                # use parenthetical day if present (e.g. domingo (7))
+                try:
+                    dt = datetime(base_date.year, base_date.month, paren_day, 23, 59, 0, tzinfo=TZ)
+                    # check for valid date; if ValueError, fallback to next weekday
+                except Exception:
+                    target = _next_weekday_on_or_after(base_date, PT_WEEKDAYS[wd_name])
+                    dt = _mk_dt(target, hour=None, minute=None, second=59)
+            else:
+                target = _next_weekday_on_or_after(base_date, PT_WEEKDAYS[wd_name])
+                dt = _mk_dt(target, hour=None, minute=None, second=59)
+            if tz_offset_hours is not None:
+                dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+            return dt
+
+    # 6) catch "até HH:MM deste domingo (7)" or "até as 23h59 deste domingo (7)"
+    m = re.search(r"até\s+as?\s*(\d{1,2})(?::(\d{2}))?\s*(?:h)?\s*(?:deste|do|de|do dia)?\s*([a-zçãéôíóú]+)?(?:\s*\((\d{1,2})\))?", txt_low)
+    if m:
+        hh = _to_int(m.group(1))
+        mm = _to_int(m.group(2))
+        wd_name = (m.group(3) or "").lower()
+        paren_day = _to_int(m.group(4))
+        if wd_name in PT_WEEKDAYS:
+            if paren_day:
+                try:
+                    dt = datetime(base_date.year, base_date.month, paren_day, hh or 23, mm or 59, 0, tzinfo=TZ)
+                except Exception:
+                    target = _next_weekday_on_or_after(base_date, PT_WEEKDAYS[wd_name])
+                    dt = _mk_dt(target, hour=hh, minute=mm, second=0)
+            else:
+                target = _next_weekday_on_or_after(base_date, PT_WEEKDAYS[wd_name])
+                dt = _mk_dt(target, hour=hh, minute=mm, second=0)
+            if tz_offset_hours is not None:
+                dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+            return dt
+
+    # 7) fallback: tentar usar dateparser no snippet inteiro, com RELATIVE_BASE = base_date
+    try:
+        # dateparser pode inferir "17 de setembro" etc.
+        dp = dateparser.parse(txt, settings={"RELATIVE_BASE": base_date, "PREFER_DAY_OF_MONTH": "first"})
+        if dp:
+            # se dateparser retorna tz-naive, assumimos TZ e convertemos
+            if dp.tzinfo:
+                return dp.astimezone(TZ)
+            else:
+                return dp.replace(tzinfo=TZ)
+    except Exception:
+        pass
+
+    return None
+
+
+def detect_valid_until(content_text: str, published_dt: Optional[datetime]) -> Optional[datetime]:
+    """
+    Lógica:
+    - extrai parágrafos candidatos (prioritiza frases tipo 'Oferta válida / Período de compra')
+    - tenta parse em cada snippet
+    - aplica sanity checks e escolhe a data mais próxima >= published_dt
+    """
+    if not content_text or not published_dt:
+        return None
+
+    # ensure tz-aware published_dt
+    published_dt = published_dt if published_dt.tzinfo else published_dt.replace(tzinfo=TZ)
+
+    candidates = _candidate_paragraphs(content_text)
+    parsed_dates: List[datetime] = []
+
+    for c in candidates:
+        dt = _parse_date_from_text_snippet(c, published_dt)
+        if dt:
+            # sanity: dt not too far in the past relative to published_dt (allow small negative drift)
+            if dt < (published_dt - timedelta(days=3)):
+                continue
+            # sanity: dt not ridiculously far in the future (e.g., > 2 years)
+            if dt > (published_dt + timedelta(days=730)):
+                continue
+            parsed_dates.append(dt)
+
+    if DEBUG:
+        print("DEBUG candidates:", len(candidates))
+        for i, c in enumerate(candidates[:6]):
+            print(f"DEBUG cand[{i}]:", c[:200])
+        print("DEBUG parsed_dates:", parsed_dates)
+
+    if not parsed_dates:
+        return None
+
+    # choose most appropriate: smallest dt >= published_dt; else smallest dt
+    ge = [d for d in parsed_dates if d >= published_dt]
+    if ge:
+        return min(ge)
+    return min(parsed_dates)
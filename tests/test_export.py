@@ -0,0 +1,72 @@
+# tests/test_export.py
+# export.py tem que sair no mesmo formato do GET /api/v1/promotions/export:
+# mesmos campos padrão e o mesmo serializador. O router importa o engine da
+# API, que exige DATABASE_URL: um SQLite em arquivo temporário basta (nada é
+# consultado).
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(tempfile.gettempdir(), "test_export.db"))
+
+import export  # noqa: E402
+from backend.app.routers.promotions import EXPORT_FIELDS  # noqa: E402
+from backend.app.serialization import dumps  # noqa: E402
+
+TZ = ZoneInfo("America/Sao_Paulo")
+
+
+class Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.itersize = None
+        self.sql = None
+
+    def execute(self, sql, params):
+        self.sql = sql
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def close(self):
+        pass
+
+
+class Conn:
+    def __init__(self, rows):
+        self.cur = Cursor(rows)
+
+    def cursor(self, name=None):
+        return self.cur
+
+    def rollback(self):
+        pass
+
+
+ROW = (
+    7, "https://exemplo.com/promo/", "Promoção até amanhã", date(2025, 9, 3), "Fulano", "texto",
+    [{"src": "https://exemplo.com/a.jpg"}], [{"url": "https://parceiro.com/", "internal": False}],
+    datetime(2025, 9, 3, 12, 0, 5, 123456, tzinfo=TZ), datetime(2025, 9, 4, 23, 59, tzinfo=TZ), False, 7,
+)
+
+
+def test_campos_padrao_iguais_aos_do_endpoint():
+    assert export.FIELDS == EXPORT_FIELDS
+    assert "expired" in export.FIELDS
+
+
+def test_linha_no_formato_do_endpoint():
+    conn = Conn([ROW])
+    out = io.BytesIO()
+    assert export.export_rows(conn, out) == 1
+    assert conn.cur.sql.lstrip().startswith("SELECT id, url,")
+    line = out.getvalue()
+    assert line == dumps(dict(zip(EXPORT_FIELDS, ROW))) + b"\n"
+    data = json.loads(line)
+    assert data["expired"] is False
+    assert data["title"] == "Promoção até amanhã"
+    assert data["date_published"] == "2025-09-03"
+    assert datetime.fromisoformat(data["scraped_at"]) == ROW[8]
@@ -0,0 +1,160 @@
+# tests/test_fetcher.py
+# fetcher.py contra o servidor local do bench_scrape.py (StandIn): intervalo
+# por host do token bucket, limite de downloads pendentes do fetch_all e
+# erros devolvidos em (item, resp, erro).
+import time
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+from bench_scrape import StandIn
+from fetcher import Fetcher, HostRateLimiter, TokenBucket
+
+# folga para o agendamento das threads (os intervalos medidos são de ~100 ms)
+SLACK = 0.02
+
+PAGES = [(f"p{i}", None, None, f"<html><body>post {i}</body></html>") for i in range(8)]
+
+
+@pytest.fixture
+def server():
+    with StandIn(PAGES) as s:
+        yield s
+
+
+def _gaps(times):
+    times = sorted(times)
+    return [b - a for a, b in zip(times, times[1:])]
+
+
+def _warm_up(fetcher, server, urls):
+    """
+    O limitador espaça o início dos GETs; o primeiro de cada thread ainda cria
+    a sessão e abre a conexão, o que atrasa a chegada. Aquece as threads e
+    zera o registro do servidor antes de medir.
+    """
+    list(fetcher.fetch_all(urls * 4))
+    server.hits.clear()
+
+
+def _record_releases(limiter):
+    """
+    Registra (host, instante) de cada liberação do limitador. O intervalo é
+    medido aqui e não na chegada ao servidor: a chegada soma o atraso de
+    agendamento de cada thread, que numa máquina carregada passa da folga.
+    """
+    releases = []
+    acquire = limiter.acquire
+
+    def recording(url):
+        acquire(url)
+        releases.append((urlparse(url).netloc, time.monotonic()))
+
+    limiter.acquire = recording
+    return releases
+
+
+def test_token_bucket_espaca_as_chamadas():
+    bucket = TokenBucket(rate=10)  # 1 token a cada 100 ms
+    t0 = time.monotonic()
+    stamps = []
+    for _ in range(4):
+        bucket.acquire()
+        stamps.append(time.monotonic() - t0)
+    # o primeiro token já está no balde; os outros esperam a recarga
+    assert stamps[0] < SLACK
+    assert all(gap >= 0.1 - SLACK for gap in _gaps(stamps))
+
+
+def test_token_bucket_burst_libera_capacidade_de_uma_vez():
+    bucket = TokenBucket(rate=10, capacity=3)
+    t0 = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - t0 < SLACK
+    bucket.acquire()
+    assert time.monotonic() - t0 >= 0.1 - SLACK
+
+
+def test_limiter_sem_intervalo_nao_cria_balde():
+    limiter = HostRateLimiter(rate_seconds=0)
+    limiter.acquire("http://exemplo.com/a")
+    assert limiter._buckets == {}
+
+
+def test_fetch_all_respeita_intervalo_por_host(server):
+    # dois hosts (netloc diferente) para o mesmo servidor: um balde cada
+    other = server.base.replace("127.0.0.1", "localhost")
+    urls = [f"{base}/p{i}/" for i in range(4) for base in (server.base, other)]
+    with Fetcher(rate_seconds=0, concurrency=4) as fetcher:
+        _warm_up(fetcher, server, urls)
+        fetcher.limiter = HostRateLimiter(rate_seconds=0.1)
+        releases = _record_releases(fetcher.limiter)
+        t0 = time.monotonic()
+        results = list(fetcher.fetch_all(urls))
+        elapsed = time.monotonic() - t0
+
+    assert [err for _, _, err in results] == [None] * len(urls)
+    # todos chegaram ao servidor, pelos dois nomes
+    assert sorted(host.split(":")[0] for host, _, _ in server.hits) == ["127.0.0.1"] * 4 + ["localhost"] * 4
+    by_host = {}
+    for host, at in releases:
+        by_host.setdefault(host.split(":")[0], []).append(at)
+    assert sorted(by_host) == ["127.0.0.1", "localhost"]
+    for times in by_host.values():
+        assert len(times) == 4
+        assert all(gap >= 0.1 - SLACK for gap in _gaps(times))
+    # os hosts andam em paralelo: 3 intervalos, não 7
+    assert elapsed < 0.7
+
+
+def test_set_rate_da_intervalo_proprio_ao_host(server):
+    urls = [f"{server.base}/p{i}/" for i in range(3)]
+    with Fetcher(rate_seconds=0, concurrency=4) as fetcher:
+        _warm_up(fetcher, server, urls)
+        fetcher.limiter.set_rate(server.base, 0.1)
+        releases = _record_releases(fetcher.limiter)
+        list(fetcher.fetch_all(urls))
+    assert len(server.hits) == 3
+    assert all(gap >= 0.1 - SLACK for gap in _gaps(at for _, at in releases))
+
+
+def test_fetch_all_limita_pendentes_a_duas_vezes_a_concorrencia(server):
+    concurrency = 2
+    pulled = []
+
+    def items():
+        for i in range(20):
+            pulled.append(i)
+            yield f"{server.base}/p{i % len(PAGES)}/"
+
+    delivered = 0
+    with Fetcher(rate_seconds=0, concurrency=concurrency) as fetcher:
+        for _, resp, err in fetcher.fetch_all(items()):
+            # tudo o que saiu do iterador e ainda não voltou está pendente
+            assert len(pulled) - delivered <= 2 * concurrency
+            assert err is None and resp.status_code == 200
+            delivered += 1
+    assert delivered == 20
+
+
+def test_fetch_all_devolve_erros_com_o_item(server):
+    items = [
+        {"id": "ok", "url": f"{server.base}/p0/"},
+        {"id": "404", "url": f"{server.base}/nao-existe/"},
+        # porta do servidor depois de fechado: conexão recusada
+        {"id": "recusada", "url": "http://127.0.0.1:9/"},
+    ]
+    with Fetcher(rate_seconds=0, concurrency=3, timeout=2) as fetcher:
+        results = {item["id"]: (resp, err) for item, resp, err in fetcher.fetch_all(items, url_of=lambda it: it["url"])}
+
+    assert set(results) == {"ok", "404", "recusada"}
+    resp, err = results["ok"]
+    assert err is None and b"post 0" in resp.content
+    resp, err = results["404"]
+    assert resp is None and isinstance(err, requests.HTTPError)
+    assert err.response.status_code == 404
+    resp, err = results["recusada"]
+    assert resp is None and isinstance(err, requests.ConnectionError)
+
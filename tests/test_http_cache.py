@@ -0,0 +1,45 @@
+# tests/test_http_cache.py
+# stage/commit/discard do HttpCache: validadores só vão para o disco depois
+# da gravação, e a resposta em stage não sobra na memória quando ela falha.
+import pytest
+
+from http_cache import HttpCache
+
+
+class Resp:
+    def __init__(self, body=b"corpo", etag='"v1"', status_code=200):
+        self.content = body
+        self.status_code = status_code
+        self.headers = {"ETag": etag}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = HttpCache(str(tmp_path / "cache.sqlite"))
+    yield c
+    c.close()
+
+
+def test_commit_grava_o_que_estava_em_stage(cache):
+    cache.stage("http://x/1", Resp())
+    assert cache.conditional_headers("http://x/1") == {}
+    cache.commit("http://x/1")
+    assert cache.conditional_headers("http://x/1") == {"If-None-Match": '"v1"'}
+    assert cache._staged == {}
+
+
+def test_discard_solta_a_resposta_sem_gravar(cache):
+    cache.stage("http://x/1", Resp())
+    cache.discard("http://x/1")
+    assert cache._staged == {}
+    # commit depois do discard não grava nada
+    cache.commit("http://x/1")
+    assert cache.conditional_headers("http://x/1") == {}
+
+
+def test_discard_mantem_validadores_antigos(cache):
+    cache.store("http://x/1", Resp(etag='"v1"'))
+    cache.stage("http://x/1", Resp(body=b"novo", etag='"v2"'))
+    cache.discard("http://x/1")
+    assert cache.conditional_headers("http://x/1") == {"If-None-Match": '"v1"'}
+    assert not cache.is_unchanged("http://x/1", Resp(body=b"novo", etag='"v2"'))
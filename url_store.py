@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# url_store.py
+# Imagens e links dos posts em tabelas normalizadas (migrate.py 0007) em vez
+# de images_json/links_json: cada URL é gravada uma vez em `urls` (com o
+# host calculado só nessa hora) e cada post guarda só os ids, em ordem, em
+# post_links/post_images. A flag internal depende do post (a mesma URL pode
+# ser interna num site e externa em outro): sai na leitura, comparando o
+# host da URL com o do post (migrate.py 0011). O GIN em url_ids responde "quais
+# promos linkam para tal parceiro" sem varrer JSONB.
+
+from urllib.parse import urlparse
+
+
+# -------- CONFIG --------
+URL_CACHE_MAX = 50_000  # ids de URL mantidos em memória
+# ------------------------
+
+# JSON no formato antigo (images_json/links_json) montado a partir das
+# tabelas pelas funções da migrate.py 0010/0011; `{t}` é o alias da linha
+# de promocoes. A API chama as mesmas funções (routers/promotions.py).
+IMAGES_JSON_SQL = "promocoes_images_json({t}.id, {t}.images_json)"
+LINKS_JSON_SQL = "promocoes_links_json({t}.id, {t}.url, {t}.links_json)"
+
+UPSERT_LINKS = """
+    INSERT INTO post_links (post_id, url_ids, texts) VALUES %s
+    ON CONFLICT (post_id) DO UPDATE SET url_ids = EXCLUDED.url_ids, texts = EXCLUDED.texts
+"""
+UPSERT_IMAGES = """
+    INSERT INTO post_images (post_id, url_ids, alts, titles) VALUES %s
+    ON CONFLICT (post_id) DO UPDATE SET url_ids = EXCLUDED.url_ids, alts = EXCLUDED.alts, titles = EXCLUDED.titles
+"""
+
+
+def url_host(url):
+    """Host em minúsculas, sem porta e sem "www." (chave das buscas por parceiro)."""
+    try:
+        host = urlparse(url).hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def is_internal(host, site_host):
+    return bool(site_host) and (host == site_host or host.endswith("." + site_host))
+
+
+class UrlStore:
+    """
+    Grava as referências de imagens/links dos posts. `write_refs` roda na
+    transação do upsert (BatchWriter.after_write); `rollback` esquece os ids
+    em cache, que podem ter vindo de um INSERT desfeito (BatchWriter.on_rollback).
+    """
+
+    def __init__(self):
+        self._ids = {}
+
+    def intern(self, cur, urls):
+        """{url: id} das URLs, inserindo as novas em `urls` (um INSERT + um SELECT por lote)."""
+        if len(self._ids) > URL_CACHE_MAX:
+            self._ids.clear()
+        missing = [u for u in set(urls) if u not in self._ids]
+        if missing:
+            from psycopg2.extras import execute_values
+
+            execute_values(
+                cur,
+                "INSERT INTO urls (url, host) VALUES %s ON CONFLICT (url) DO NOTHING",
+                [(u, url_host(u)) for u in missing],
+                page_size=len(missing),
+            )
+            cur.execute("SELECT url, id FROM urls WHERE url = ANY(%s)", (missing,))
+            self._ids.update(cur.fetchall())
+        return self._ids
+
+    def write_refs(self, cur, posts):
+        """Regrava post_images/post_links de `posts` (lista de (post_id, data) já gravados)."""
+        if not posts:
+            return
+        urls = []
+        for _, data in posts:
+            urls.extend(img["src"] for img in data.get("images", []))
+            urls.extend(link["href"] for link in data.get("links", []))
+        ids = self.intern(cur, urls)
+
+        images, links = [], []
+        for post_id, data in posts:
+            imgs = data.get("images", [])
+            images.append((
+                post_id,
+                [ids[img["src"]] for img in imgs],
+                [img.get("alt", "") for img in imgs],
+                [img.get("title", "") for img in imgs],
+            ))
+            lks = data.get("links", [])
+            links.append((post_id, [ids[link["href"]] for link in lks], [link.get("text", "") for link in lks]))
+
+        from psycopg2.extras import execute_values
+
+        # uma linha por post em cada tabela (lista vazia também: substitui a anterior)
+        execute_values(cur, UPSERT_IMAGES, images, template="(%s, %s::integer[], %s::text[], %s::text[])", page_size=len(images))
+        execute_values(cur, UPSERT_LINKS, links, template="(%s, %s::integer[], %s::text[])", page_size=len(links))
+
+    def after_write(self, cur, returned, written):
+        """Gancho do BatchWriter: `returned` são as linhas (id, url) do RETURNING do upsert."""
+        by_url = {d["url"]: d for d in written}
+        self.write_refs(cur, [(post_id, by_url[url]) for post_id, url in returned if url in by_url])
+
+    def rollback(self):
+        # raro (lote com erro): recomeçar o cache é mais simples que rastrear o que foi desfeito
+        self._ids.clear()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# valid_until.py
+# Detector de validade (valid_until) dos posts, com regexes pré-compiladas.
+
+import re
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Optional, List
+
+from scrape_metrics import timed
+
+TZ = ZoneInfo("America/Sao_Paulo")
+
+PT_MONTHS = {
+    "janeiro": 1,
+    "fevereiro": 2,
+    "março": 3,
+    "marco": 3,
+    "abril": 4,
+    "maio": 5,
+    "junho": 6,
+    "julho": 7,
+    "agosto": 8,
+    "setembro": 9,
+    "outubro": 10,
+    "novembro": 11,
+    "dezembro": 12,
+}
+PT_WEEKDAYS = {
+    "segunda": 0,
+    "segunda-feira": 0,
+    "terça": 1,
+    "terca": 1,
+    "terça-feira": 1,
+    "terca-feira": 1,
+    "quarta": 2,
+    "quarta-feira": 2,
+    "quinta": 3,
+    "quinta-feira": 3,
+    "sexta": 4,
+    "sexta-feira": 4,
+    "sábado": 5,
+    "sabado": 5,
+    "domingo": 6,
+}
+
+# palavras que tipicamente aparecem perto da validade
+PROMO_KEYWORDS = [
+    "promo", "promoção", "promoções", "válida", "válido", "válidos", "mecânica",
+    "oferta", "campanha", "últimas horas", "últimas", "só até", "até amanhã",
+    "até hoje", "somente até", "período de compra", "período de emissão", "oferta válida",
+    "reservas", "período de compra:"
+]
+
+HIGH_PRIORITY_PHRASES = [
+    "oferta válida", "promoção válida", "período de compra", "período de emissão",
+    "reserva", "reservas", "período de compra:", "oferta válida até", "oferta válida até"
+]
+
+# padrões de data, na ordem de prioridade em que são tentados
+_RE_SPACES = re.compile(r"\s+")
+_RE_UTC = re.compile(r"utc\s*([+-]\d{1,2})(?::?(\d{2}))?")
+_RE_AMANHA = re.compile(r"até\s+amanh[ãa]\s*(?:\((\d{1,2})\))?(?:.*?(?:às|a)\s*(\d{1,2})(?::(\d{2}))?)?")
+_RE_HOJE = re.compile(r"até\s+hoje\b(?:.*?(?:às|a)\s*(\d{1,2})(?::(\d{2}))?)?")
+_RE_DMY = re.compile(r"(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?(?:.*?(?:às|a)\s*(\d{1,2})(?::(\d{2}))?)?")
+_RE_DIA_MES = re.compile(
+    r"(?:v[aá]lid[ao]s?\s*)?até\s+(?:o\s+)?(?:dia\s+)?(\d{1,2})(?:\s+de\s+([a-zçãéôíóú]+)(?:\s+de\s+(\d{4}))?)?(?:.*?(?:às|a)\s*(\d{1,2})(?::(\d{2}))?)?"
+)
+_RE_WEEKDAY = re.compile(r"até\s+(?:o\s+|deste\s+)?([a-zçãéôíóú]+)(?:\s*\((\d{1,2})\))?")
+_RE_HORA_WEEKDAY = re.compile(
+    r"até\s+as?\s*(\d{1,2})(?::(\d{2}))?\s*(?:h)?\s*(?:deste|do|de|do dia)?\s*([a-zçãéôíóú]+)?(?:\s*\((\d{1,2})\))?"
+)
+
+
+def _to_int(s, default=None):
+    try:
+        return int(s)
+    except Exception:
+        return default
+
+
+def _mk_dt(base_date: datetime, day=None, month=None, year=None, hour=None, minute=None, second=0):
+    y = year if year else base_date.year
+    m = month if month else base_date.month
+    d = day if day else base_date.day
+
+    # sanitização de hora/minuto
+    h = 23 if hour is None else hour
+    mi = 59 if minute is None else minute
+    if h < 0 or h > 23:
+        h = 23
+    if mi < 0 or mi > 59:
+        mi = 59
+
+    s = 59 if (hour is None and minute is None and second == 0) else (second or 0)
+    return datetime(y, m, d, h, mi, s, tzinfo=TZ)
+
+
+def _next_weekday_on_or_after(base_date: datetime, target_wd: int):
+    delta = (target_wd - base_date.weekday()) % 7
+    return base_date if delta == 0 else (base_date + timedelta(days=delta))
+
+
+def _phrase_alternation(phrases):
+    # mais longas primeiro, para a alternância não parar num prefixo
+    uniq = sorted(set(phrases), key=len, reverse=True)
+    return "|".join(re.escape(p) for p in uniq)
+
+
+class ValidUntilDetector:
+    """
+    Detector de valid_until montado uma vez (no import): as palavras-chave
+    viram uma única regex de alternância e os padrões de data ficam
+    pré-compilados, então cada parágrafo é varrido uma vez para classificar
+    e, na maioria dos casos, descartado sem rodar nenhum padrão de data.
+    """
+
+    def __init__(self, promo_keywords=PROMO_KEYWORDS, high_priority_phrases=HIGH_PRIORITY_PHRASES):
+        # lookahead de largura zero: testa toda posição, mesmo dentro de outra
+        # palavra-chave já casada; "high" vem antes e vence na mesma posição
+        self._kw_re = re.compile(
+            "(?=(?P<high>%s)|(?P<promo>%s))"
+            % (_phrase_alternation(high_priority_phrases), _phrase_alternation(promo_keywords))
+        )
+
+    def candidate_paragraphs(self, content_text: str) -> List[str]:
+        """Retorna parágrafos candidatos, priorizando parágrafos com frases de alta prioridade."""
+        paras = [p.strip() for p in content_text.split("\n\n") if p.strip()]
+        priority = []
+        normal = []
+        for p in paras:
+            kind = None
+            for m in self._kw_re.finditer(p.lower()):
+                if m.lastgroup == "high":
+                    kind = "high"
+                    break
+                kind = "promo"
+            if kind == "high":
+                priority.append(p)
+            elif kind == "promo":
+                normal.append(p)
+        if priority:
+            return priority + normal
+        if normal:
+            return normal
+        # fallback: primeiros 8 parágrafos (para não perder nada)
+        return paras[:8]
+
+    def parse_snippet(self, txt: str, base_date: datetime) -> Optional[datetime]:
+        """
+        Tenta extrair uma data/hora de um snippet. Trata também UTC offsets se presentes.
+        Retorna datetime timezone-aware em TZ.
+        """
+        txt_low = _RE_SPACES.sub(" ", txt.lower()).strip()
+
+        # todos os padrões exigem "até" ou "/": sem eles não há o que procurar
+        has_ate = "até" in txt_low
+        if not has_ate and "/" not in txt_low:
+            return None
+
+        # detect tz in snippet like "utc+3" or "utc+03:00"
+        tz_offset_hours = None
+        if "utc" in txt_low:
+            tz_match = _RE_UTC.search(txt_low)
+            if tz_match:
+                tz_offset_hours = _to_int(tz_match.group(1))
+
+        # 1) patterns like "até amanhã (7)" or "até amanhã" with optional time
+        m = _RE_AMANHA.search(txt_low) if has_ate else None
+        if m:
+            paren_day = _to_int(m.group(1))
+            hh = _to_int(m.group(2))
+            mm = _to_int(m.group(3))
+            if paren_day:
+                # prefer the parenthetical day if provided
+                try:
+                    dt = datetime(base_date.year, base_date.month, paren_day, 0, 0, 0)
+                    dt = dt.replace(tzinfo=TZ)
+                except Exception:
+                    dt = _mk_dt(base_date + timedelta(days=1), hour=hh, minute=mm, second=0)
+            else:
+                dt = _mk_dt(base_date + timedelta(days=1), hour=hh, minute=mm, second=0)
+            # if snippet included UTC offset, convert
+            if tz_offset_hours is not None:
+                dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+            return dt
+
+        # 2) patterns like "até hoje [às HH[:MM]]"
+        m = _RE_HOJE.search(txt_low) if has_ate else None
+        if m:
+            hh = _to_int(m.group(1))
+            mm = _to_int(m.group(2))
+            dt = _mk_dt(base_date, hour=hh, minute=mm, second=0)
+            if tz_offset_hours is not None:
+                dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+            return dt
+
+        # 3) explicit dd/mm[/yyyy] optionally with time
+        m = _RE_DMY.search(txt_low)
+        if m:
+            d = _to_int(m.group(1))
+            mo = _to_int(m.group(2))
+            y = _to_int(m.group(3))
+            if y and y < 100:
+                y += 2000
+            y = y or base_date.year
+            hh = _to_int(m.group(4))
+            mm = _to_int(m.group(5))
+            if 1 <= d <= 31 and 1 <= mo <= 12:
+                dt = datetime(y, mo, d, hh or 23, mm or 59, 0, tzinfo=TZ)
+                if tz_offset_hours is not None:
+                    # dt currently in TZ local; convert from specified UTC offset to TZ
+                    # build dt in that UTC offset first:
+                    dt_offset = datetime(y, mo, d, hh or 23, mm or 59, 0, tzinfo=timezone(timedelta(hours=tz_offset_hours)))
+                    dt = dt_offset.astimezone(TZ)
+                return dt
+
+        if not has_ate:
+            return None
+
+        # 4) "até dia 17 de setembro [de 2025] [às HH:MM]" or "válida até dia 17 de setembro"
+        m = _RE_DIA_MES.search(txt_low)
+        if m:
+            d = _to_int(m.group(1))
+            mon_name = (m.group(2) or "").lower()
+            mo = PT_MONTHS.get(mon_name) if mon_name else base_date.month
+            y = _to_int(m.group(3)) or base_date.year
+            hh = _to_int(m.group(4))
+            mm = _to_int(m.group(5))
+            if d and 1 <= d <= 31 and 1 <= mo <= 12:
+                dt = datetime(y, mo, d, hh or 23, mm or 59, 0, tzinfo=TZ)
+                if tz_offset_hours is not None:
+                    dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+                return dt
+
+        # 5) "até domingo (7)" or "até o domingo (7)" or "até domingo"
+        m = _RE_WEEKDAY.search(txt_low)
+        if m:
+            wd_name = (m.group(1) or "").lower()
+            paren_day = _to_int(m.group(2))
+            if wd_name in PT_WEEKDAYS:
+                if paren_day:
+                    # use parenthetical day if present (e.g. domingo (7))
+                    try:
+                        dt = datetime(base_date.year, base_date.month, paren_day, 23, 59, 0, tzinfo=TZ)
+                        # check for valid date; if ValueError, fallback to next weekday
+                    except Exception:
+                        target = _next_weekday_on_or_after(base_date, PT_WEEKDAYS[wd_name])
+                        dt = _mk_dt(target, hour=None, minute=None, second=59)
+                else:
+                    target = _next_weekday_on_or_after(base_date, PT_WEEKDAYS[wd_name])
+                    dt = _mk_dt(target, hour=None, minute=None, second=59)
+                if tz_offset_hours is not None:
+                    dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+                return dt
+
+        # 6) catch "até HH:MM deste domingo (7)" or "até as 23h59 deste domingo (7)"
+        m = _RE_HORA_WEEKDAY.search(txt_low)
+        if m:
+            hh = _to_int(m.group(1))
+            mm = _to_int(m.group(2))
+            wd_name = (m.group(3) or "").lower()
+            paren_day = _to_int(m.group(4))
+            if wd_name in PT_WEEKDAYS:
+                if paren_day:
+                    try:
+                        dt = datetime(base_date.year, base_date.month, paren_day, hh or 23, mm or 59, 0, tzinfo=TZ)
+                    except Exception:
+                        target = _next_weekday_on_or_after(base_date, PT_WEEKDAYS[wd_name])
+                        dt = _mk_dt(target, hour=hh, minute=mm, second=0)
+                else:
+                    target = _next_weekday_on_or_after(base_date, PT_WEEKDAYS[wd_name])
+                    dt = _mk_dt(target, hour=hh, minute=mm, second=0)
+                if tz_offset_hours is not None:
+                    dt = dt.replace(tzinfo=timezone(timedelta(hours=tz_offset_hours))).astimezone(TZ)
+                return dt
+
+        # sem fallback para dateutil: a chamada antiga passava `settings=` (API do
+        # pacote dateparser) ao dateutil, levantava TypeError e nunca achava nada
+        return None
+
+    def detect(self, content_text: str, published_dt: Optional[datetime], debug: bool = False) -> Optional[datetime]:
+        """
+        Lógica:
+        - extrai parágrafos candidatos (prioritiza frases tipo 'Oferta válida / Período de compra')
+        - tenta parse em cada snippet
+        - aplica sanity checks e escolhe a data mais próxima >= published_dt
+        """
+        if not content_text or not published_dt:
+            return None
+
+        # ensure tz-aware published_dt
+        published_dt = published_dt if published_dt.tzinfo else published_dt.replace(tzinfo=TZ)
+
+        candidates = self.candidate_paragraphs(content_text)
+        parsed_dates: List[datetime] = []
+        lower_bound = published_dt - timedelta(days=3)
+        upper_bound = published_dt + timedelta(days=730)
+
+        for c in candidates:
+            dt = self.parse_snippet(c, published_dt)
+            if dt:
+                # sanity: dt not too far in the past relative to published_dt (allow small negative drift)
+                if dt < lower_bound:
+                    continue
+                # sanity: dt not ridiculously far in the future (e.g., > 2 years)
+                if dt > upper_bound:
+                    continue
+                parsed_dates.append(dt)
+
+        if debug:
+            print("DEBUG candidates:", len(candidates))
+            for i, c in enumerate(candidates[:6]):
+                print(f"DEBUG cand[{i}]:", c[:200])
+            print("DEBUG parsed_dates:", parsed_dates)
+
+        if not parsed_dates:
+            return None
+
+        # choose most appropriate: smallest dt >= published_dt; else smallest dt
+        ge = [d for d in parsed_dates if d >= published_dt]
+        if ge:
+            return min(ge)
+        return min(parsed_dates)
+
+
+DETECTOR = ValidUntilDetector()
+
+_candidate_paragraphs = DETECTOR.candidate_paragraphs
+_parse_date_from_text_snippet = DETECTOR.parse_snippet
+
+
+@timed("detect")
+def detect_valid_until(content_text: str, published_dt: Optional[datetime], debug: bool = False) -> Optional[datetime]:
+    return DETECTOR.detect(content_text, published_dt, debug=debug)